@@ -0,0 +1,128 @@
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+import numpy as np
+
+####################################################
+################ Region encryption #################
+####################################################
+#
+# Shared by Detection (encryption) and Decrypt (decryption).
+# Each region is encrypted with a single cipher call on the whole buffer.
+#
+# CBC : the historical format. Full 16-byte blocks are encrypted, the trailing
+#       remainder (region size % 16) is left in clear.
+# CTR : stream mode, every byte is encrypted and blocks are independent
+#       (the counter starts at the IV), so it is cheaper and parallelisable.
+
+MODES = ("CBC", "CTR")
+BLOCK_SIZE = 16
+
+
+def generate_iv():
+    return get_random_bytes(16) # AES 128 bits IV
+
+
+def new_cipher(key, iv, mode="CBC"):
+    if mode == "CTR":
+        return AES.new(key, AES.MODE_CTR, nonce=b"", initial_value=iv)
+    if mode == "CBC":
+        return AES.new(key, AES.MODE_CBC, iv)
+    raise ValueError(f"Unknown AES mode: {mode}")
+
+
+def _transform(data, output, cipher, encrypt, mode):
+    """
+    Run the cipher over data into output (flat uint8 arrays), without intermediate copies.
+    """
+    operation = cipher.encrypt if encrypt else cipher.decrypt
+    if mode == "CTR":
+        operation(memoryview(data), output=memoryview(output))
+        return
+    size = len(data) // BLOCK_SIZE * BLOCK_SIZE
+    if size > 0:
+        operation(memoryview(data[:size]), output=memoryview(output[:size]))
+    output[size:] = data[size:] # Remaining data is not encrypted
+
+
+def aes_encrypt(region, key, mode="CBC", iv=None):
+    """
+    AES encryption.
+    """
+    iv = generate_iv() if iv is None else iv
+    cipher = new_cipher(key, iv, mode)
+
+    region_bytes = np.ascontiguousarray(region, dtype=np.uint8).reshape(-1)
+    encrypted_array = np.empty_like(region_bytes)
+    _transform(region_bytes, encrypted_array, cipher, True, mode)
+
+    return encrypted_array.reshape(region.shape), iv
+
+
+def aes_decrypt(encrypted_region, key, iv, original_shape, mode="CBC"):
+    """
+    AES decryption.
+    """
+    cipher = new_cipher(key, iv, mode)
+
+    encrypted_bytes = np.ascontiguousarray(encrypted_region, dtype=np.uint8).reshape(-1)
+    decrypted_region = np.empty_like(encrypted_bytes)
+    _transform(encrypted_bytes, decrypted_region, cipher, False, mode)
+
+    return decrypted_region.reshape(original_shape)
+
+
+def selective_encrypt(region, key, mode="CBC", iv=None):
+    """
+    Chiffrement sélectif des 6 bits LSB d'une région.
+    The region may be a view of the frame, it is not modified.
+    """
+    iv = generate_iv() if iv is None else iv
+    cipher = new_cipher(key, iv, mode)
+
+    # Extract the 6 LSBs into a buffer padded for CBC (CBC only works on full blocks)
+    size = region.size
+    padding_length = (16 - size % 16) % 16 if mode == "CBC" else 0
+    lsb_bits = np.zeros(size + padding_length, dtype=np.uint8)
+    np.bitwise_and(region, 0x3F, out=lsb_bits[:size].reshape(region.shape))  # Mask
+
+    # Encrypt the padded LSBs in place
+    cipher.encrypt(memoryview(lsb_bits), output=memoryview(lsb_bits))
+    encrypted_lsb = lsb_bits[:size]
+    encrypted_msb = encrypted_lsb & 0xC0  # Extract the 2 MSBs needed to decrypt
+
+    # Replace the 6 LSBs with the encrypted LSBs
+    encrypted_region = np.bitwise_and(region, 0xC0)
+    encrypted_lsb &= 0x3F
+    encrypted_region |= encrypted_lsb.reshape(region.shape)  # Set the new 6 LSBs
+
+    return encrypted_region, iv, encrypted_msb
+
+
+def selective_decrypt(encrypted_region, key, iv, original_shape, encrypted_msb, mode="CBC"):
+    """
+    Déchiffrement sélectif des 6 bits LSB d'une région.
+    """
+    cipher = new_cipher(key, iv, mode)
+
+    flat_region = encrypted_region.flatten()
+
+    # Extract the 6 LSBs
+    encrypted_lsb = flat_region & 0x3F  # Mask
+    encrypted_lsb |= encrypted_msb  # Set the 2 MSBs
+
+    # Pad the LSBs (CBC only works on full blocks)
+    padding_length = (16 - len(encrypted_lsb) % 16) % 16 if mode == "CBC" else 0
+    padded_encrypted_lsb = np.pad(encrypted_lsb, (0, padding_length), mode='constant', constant_values=0)
+
+    # Decrypt the padded LSBs
+    decrypted_lsb = np.empty_like(padded_encrypted_lsb)
+    cipher.decrypt(memoryview(padded_encrypted_lsb), output=memoryview(decrypted_lsb))
+    decrypted_lsb = decrypted_lsb[:len(encrypted_lsb)]
+
+    # Replace the 6 LSBs with the decrypted LSBs
+    flat_region &= 0xC0
+    flat_region |= decrypted_lsb & 0x3F  # Set the new 6 LSBs
+
+    decrypted_region = flat_region.reshape(original_shape)
+
+    return decrypted_region
@@ -1,13 +1,15 @@
 import customtkinter as ctk
 from tkinter import filedialog
 from PIL import Image, ImageTk
-import cv2
 import time
+import threading
 from tkVideoPlayer import TkinterVideo
 from VideoReader import VideoReader
 from Detection import Detection
 from Decrypt import Decrypt
-import json
+from FrameData import FrameDataReader
+from ModelRegistry import warm_up
+from Preview import PreviewQueue
 
 class App:
     def __init__(self, root):
@@ -30,10 +32,19 @@ class App:
         # Video path
         self.video_path = ""
         self.output_path = ""
+        self.video = None
         self.decrypt_window = None
+
+        # Processing runs in a background thread, its progress and previews come through this queue
+        self.preview = None
+        self.preview_interval = 0.1 # seconds between two preview updates
+        self.poll_interval = 30 # ms between two reads of the queue
     
         self.create_widgets()
 
+        # Load and warm up the person model while the user picks the files
+        threading.Thread(target=warm_up, args=(Detection.model_path(False),), daemon=True).start()
+
     def create_widgets(self):
         # Video path
         video_frame = ctk.CTkFrame(self.root)
@@ -95,8 +106,8 @@ class App:
         button_frame.pack(pady=5)
 
         # Process button
-        process_button = ctk.CTkButton(button_frame, text="Process", command=self.process_video)
-        process_button.pack(side='left', padx=5)
+        self.process_button = ctk.CTkButton(button_frame, text="Process", command=self.process_video)
+        self.process_button.pack(side='left', padx=5)
 
         # Decrypt button
         decrypt_button = ctk.CTkButton(button_frame, text="Decrypt Window", command=self.open_decrypt_window)
@@ -168,32 +179,72 @@ class App:
     def toggle_blur_options(self):
         self.blur_options.configure(state="readonly" if self.blur_var.get() else "disabled")
 
-    def update_progress(self, value, index, outImage):
+    def update_progress(self, value, index):
         self.progress_label.configure(text=f"Progression: {value:.2%}")
         self.progress.set(value) #progress:.2%
-        self.progress.update_idletasks()
-        self.progress_slider.set(index / self.video.get_fps())
-        self.progress_slider.update_idletasks()
-        self.dynamic_label.update_idletasks()
-        self.root.update()
-        self.display_video_frame(outImage) # Work but is slow
+        if self.video is not None:
+            self.progress_slider.set(index / self.video.get_fps())
 
     def process_video(self):
         if not self.video_path or not self.output_path:
             self.dynamic_label.configure(text="Select a video and output path")
             return
-        start_time = time.time()
+        if self.preview is not None:
+            return # already processing
 
-        if self.video_path.endswith((".png", ".jpg")): # Image processing
-            self.dynamic_label.configure(text="Processing image...")
-            self.detection = Detection(self.video_path, self.output_path, self.blur_var.get(), self.blur_options.get(), self.face_detection_var.get(), callback=None)
-            self.detection.process_image()
-        else: # Video processing
-            self.video = VideoReader(self.video_path)
-            self.dynamic_label.configure(text="Processing video...")
-            self.detection = Detection(self.video, self.output_path, self.blur_var.get(), self.blur_options.get(), self.face_detection_var.get(), callback=self.update_progress)
-            self.detection.process()
-        self.dynamic_label.configure(text=f"Execution time: {round(time.time() - start_time, 2)} seconds")
+        self.vid_player.pause()
+        self.play_pause_btn.configure(text="Play ►")
+        self.process_button.configure(state="disabled")
+        is_image = self.video_path.endswith((".png", ".jpg"))
+        self.dynamic_label.configure(text="Processing image..." if is_image else "Processing video...")
+
+        # Widgets are only read here, in the Tk main thread
+        size = (self.video_panel.winfo_width(), self.video_panel.winfo_height())
+        self.preview = PreviewQueue(size, self.preview_interval)
+        options = (self.blur_var.get(), self.blur_options.get(), self.face_detection_var.get())
+        threading.Thread(target=self.run_processing, args=(self.preview, is_image) + options, daemon=True).start()
+        self.root.after(self.poll_interval, self.poll_preview)
+
+    def run_processing(self, preview, is_image, censored, censored_method, detect_face):
+        """
+        Background thread: loads the model if needed and processes the file, never touches the widgets.
+        """
+        start_time = time.time()
+        try:
+            if is_image: # Image processing
+                self.video = None
+                self.detection = Detection(self.video_path, self.output_path, censored, censored_method, detect_face, callback=None)
+                self.detection.process_image()
+            else: # Video processing
+                self.video = VideoReader(self.video_path)
+                self.detection = Detection(self.video, self.output_path, censored, censored_method, detect_face, callback=preview.callback)
+                self.detection.process()
+            preview.done(time.time() - start_time)
+        except Exception as e:
+            preview.fail(e)
+
+    def poll_preview(self):
+        """
+        Tk main thread: apply the messages of the processing thread, then poll again until it is done.
+        """
+        finished = False
+        for message in self.preview.messages():
+            if message[0] == "progress":
+                self.update_progress(message[1], message[2])
+            elif message[0] == "preview":
+                self.display_video_frame(message[1])
+            elif message[0] == "done":
+                self.dynamic_label.configure(text=f"Execution time: {round(message[1], 2)} seconds")
+                finished = True
+            elif message[0] == "error":
+                self.dynamic_label.configure(text=f"Error: {message[1]}")
+                print(f"Processing error: {message[1]}")
+                finished = True
+        if finished:
+            self.preview = None
+            self.process_button.configure(state="normal")
+        else:
+            self.root.after(self.poll_interval, self.poll_preview)
         
         # time.sleep(0.5)
         # if self.output_path :
@@ -207,10 +258,10 @@ class App:
         #         print("Unable to load the file")
 
     def display_video_frame(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(frame)
-        img = img.resize((self.video_panel.winfo_width(), self.video_panel.winfo_height()), Image.LANCZOS)
-        imgtk = ImageTk.PhotoImage(image=img)
+        """
+        Show an RGB preview, already downscaled by the processing thread (see Preview.py).
+        """
+        imgtk = ImageTk.PhotoImage(image=Image.fromarray(frame))
         self.vid_player.config(image=imgtk)
         self.vid_player.image = imgtk
     
@@ -252,7 +303,7 @@ class DecryptWindow:
         # Frame data file
         frame_data_frame = ctk.CTkFrame(self.root)
         frame_data_frame.pack(pady=5, padx=5)
-        ctk.CTkLabel(frame_data_frame, text="Frame Data (JSON):").pack(side="left", padx=5)
+        ctk.CTkLabel(frame_data_frame, text="Frame Data:").pack(side="left", padx=5)
         ctk.CTkButton(frame_data_frame, text="Select", command=self.select_frame_data).pack(side="left", padx=5)
         self.frame_data_label = ctk.CTkLabel(frame_data_frame, text="", width=300, anchor="w")
         self.frame_data_label.pack(side="left", padx=5)
@@ -289,32 +340,21 @@ class DecryptWindow:
 
     def select_frame_data(self):
         self.root.lower()
-        self.frame_data_path = filedialog.askopenfilename(title="Select Frame Data", filetypes=[("JSON files", "*.json")], parent=self.root)
+        self.frame_data_path = filedialog.askopenfilename(title="Select Frame Data", filetypes=[("Frame data files", "*.bin")], parent=self.root)
         if self.frame_data_path:
             self.frame_data_label.configure(text=self.frame_data_path)
-            self.load_frame_data(self.frame_data_path) # Load IDs from JSON file
+            self.load_frame_data(self.frame_data_path) # Load IDs from frame data file
         self.root.lift()
 
     def load_frame_data(self, path):
-        """Load Json File to show all IDs"""
+        """Load frame data file to show all IDs"""
         try:
-            with open(path, 'r') as f:
-                lines = f.readlines()
-
             self.ids.clear()
             self.id_checkbuttons.clear()
             self.id_vars.clear()
 
-            unique_ids = set() # Set to store IDs
-            for line in lines:
-                try:
-                    frame_data = json.loads(line)
-                    for bbox in frame_data.get("bboxes", []):
-                        unique_ids.add(bbox.get("id"))
-                except json.JSONDecodeError as e:
-                    print(f"Error loading JSON File : {e}")
-
-            self.ids = sorted(unique_ids)
+            with FrameDataReader(path) as reader:
+                self.ids = reader.ids() # Only box headers are read
 
             # Checkbox showing all IDs
             for widget in self.id_checkbuttons_frame.winfo_children():
@@ -0,0 +1,51 @@
+import os
+import sys
+import time
+import numpy as np
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import AESCipher
+
+# Micro-benchmark of one person box encryption: old block loop, bulk CBC and CTR.
+
+
+def legacy_aes_encrypt(region, key):
+    iv = get_random_bytes(16)
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    region_bytes = region.tobytes()
+    num_blocks = len(region_bytes) // 16
+    encrypted_bytes = b''
+    for i in range(num_blocks):
+        encrypted_bytes += cipher.encrypt(region_bytes[i * 16:(i + 1) * 16])
+    encrypted_bytes += region_bytes[num_blocks * 16:]
+    return np.frombuffer(encrypted_bytes, dtype=np.uint8).reshape(region.shape), iv
+
+
+def bench(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    key = get_random_bytes(16)
+    frame = np.random.randint(0, 256, (1080, 1920, 3), dtype=np.uint8)
+
+    print(f"{'box':>10} {'method':>16} {'ms/box':>10} {'MB/s':>10} {'speedup':>8}")
+    for height, width in [(100, 50), (400, 200), (800, 400)]:
+        region = frame[100:100 + height, 300:300 + width]
+        methods = [
+            ("loop CBC", lambda: legacy_aes_encrypt(region, key), 3 if height > 400 else 10),
+            ("bulk CBC", lambda: AESCipher.aes_encrypt(region, key, "CBC"), 200),
+            ("bulk CTR", lambda: AESCipher.aes_encrypt(region, key, "CTR"), 200),
+            ("selective CBC", lambda: AESCipher.selective_encrypt(region, key, "CBC"), 200),
+            ("selective CTR", lambda: AESCipher.selective_encrypt(region, key, "CTR"), 200),
+        ]
+        reference = None
+        for name, function, repeat in methods:
+            seconds = bench(function, repeat)
+            reference = reference or seconds
+            print(f"{f'{height}x{width}':>10} {name:>16} {seconds * 1000:>10.3f} {region.nbytes / seconds / 1e6:>10.1f} {reference / seconds:>7.1f}x")
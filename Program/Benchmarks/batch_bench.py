@@ -0,0 +1,37 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from Detection import Detection
+
+# Frames per second of detection + tracking for several batch sizes,
+# and check that every batch size gives the same boxes and track IDs as model.track.
+# Run from the Program folder (models are loaded from Models/): python Benchmarks/batch_bench.py ../Videos/small.mp4
+
+
+def run(video_path, batch_size):
+    detection = Detection(VideoReader(video_path), os.devnull)
+    tracked_frames = detection.track(detection.read_frames(), batch_size=batch_size, batch_tracker=batch_size > 1)
+    tracks = []
+    start = time.perf_counter()
+    for frame, results in tracked_frames:
+        boxes = results[0].boxes
+        ids = [] if boxes.id is None else boxes.id.int().tolist()
+        tracks.append(list(zip(ids, boxes.xyxy.round().int().tolist())))
+    seconds = time.perf_counter() - start
+    detection.video.release()
+    return len(tracks) / seconds, tracks
+
+
+if __name__ == "__main__":
+    video_path = sys.argv[1] if len(sys.argv) > 1 else "../Videos/small.mp4"
+    batch_sizes = [int(b) for b in sys.argv[2:]] or [1, 2, 4, 8, 16]
+
+    reference = None
+    print(f"{'batch':>6} {'fps':>8} {'same tracks':>12}")
+    for batch_size in batch_sizes:
+        fps, tracks = run(video_path, batch_size)
+        reference = reference or tracks
+        print(f"{batch_size:>6} {fps:>8.1f} {str(tracks == reference):>12}")
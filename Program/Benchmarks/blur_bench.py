@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+
+# Per-frame latency and memory of Detection.blur against the box count, for each method,
+# compared with the previous implementation (a frame copy, then one more per box).
+#   peak MB : peak of the memory allocated during the call (tracemalloc), a 1080p frame is 6.2 MB
+#   python Benchmarks/blur_bench.py
+
+
+def legacy_blur(detection, frame, results, frame_index):
+    """
+    Detection.blur before the copy-free rewrite.
+    """
+    frame_copy = frame.copy()
+    encrypted = detection.censored_method in ('AES', 'Selective')
+    if encrypted:
+        detection.assign_aes_key(results)
+        frame_data = {"frame_index": frame_index, "isSelective": detection.censored_method == 'Selective', "mode": detection.aes_mode, "bboxes": []}
+    for result in results:
+        for box in result.boxes:
+            frame_temp = frame_copy.copy()
+            track_id = int(box.id.item())
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            x1, y1, x2, y2 = x1 + 2, y1 + 2, x2 - 2, y2 - 2
+            person_region = frame_temp[y1:y2, x1:x2]
+            if detection.censored_method == 'Gaussian':
+                blurred_region = detection.gaussian_blur(person_region)
+            elif detection.censored_method == 'Pixelate':
+                blurred_region = detection.pixelate(person_region)
+            elif detection.censored_method == 'Selective':
+                key = detection.aes_keys[track_id]
+                blurred_region, iv, encrypted_msb = detection.selective_encrypt(person_region, key)
+                frame_data["bboxes"].append({"id": track_id, "coords": [x1, y1, x2, y2], "key": key, "iv": iv, "encrypted_msb": encrypted_msb, "region": blurred_region})
+            else:
+                key = detection.aes_keys[track_id]
+                blurred_region, iv = detection.aes_encrypt(person_region, key)
+                frame_data["bboxes"].append({"id": track_id, "coords": [x1, y1, x2, y2], "key": key, "iv": iv, "region": blurred_region})
+            frame[y1:y2, x1:x2] = blurred_region
+    return frame_data if encrypted else None
+
+
+def make_results(frame, box_count, rng):
+    """
+    box_count person-sized boxes (about 120x300) at random positions, some overlapping.
+    """
+    height, width = frame.shape[:2]
+    rows = []
+    for track_id in range(1, box_count + 1):
+        x1, y1 = rng.integers(0, width - 130), rng.integers(0, height - 310)
+        rows.append([x1, y1, x1 + 120, y1 + 300, track_id, 0.9, 0])
+    return [Results(frame, path="", names={0: "person"}, boxes=torch.tensor(rows, dtype=torch.float32))]
+
+
+def bench(blur, detection, original, box_count, repeat=10):
+    rng = np.random.default_rng(box_count)
+    frame = original.copy()
+    results = make_results(frame, box_count, rng)
+    blur(detection, frame, results, 0) # keys assigned, caches warm
+
+    tracemalloc.start()
+    blur(detection, frame, results, 0)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        blur(detection, frame, results, 0)
+    return (time.perf_counter() - start) / repeat, peak
+
+
+if __name__ == "__main__":
+    original = np.random.randint(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'method':>10} {'boxes':>6} {'old ms':>8} {'new ms':>8} {'speedup':>8} {'old peak MB':>12} {'new peak MB':>12}")
+        for method in ["Gaussian", "Pixelate", "AES", "Selective"]:
+            detection = Detection(None, os.devnull, True, method, model=object(),
+                                  frame_data_path=os.path.join(directory, "frame_data.bin"), keys_path=os.path.join(directory, "aes_keys.txt"))
+            for box_count in [1, 5, 10, 20]:
+                old_time, old_peak = bench(legacy_blur, detection, original, box_count)
+                new_time, new_peak = bench(Detection.blur, detection, original, box_count)
+                print(f"{method:>10} {box_count:>6} {old_time * 1000:>8.2f} {new_time * 1000:>8.2f} {old_time / new_time:>7.1f}x"
+                      f" {old_peak / 1e6:>12.1f} {new_peak / 1e6:>12.1f}")
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+
+# Decode throughput of VideoReader: read() with and without the prefetch thread, alone and
+# with some work per frame (a blur, standing for the detection), and get_frame random access.
+#   python Benchmarks/decode_bench.py [video]
+
+
+def read_fps(path, prefetch, work=None):
+    video = VideoReader(path)
+    if prefetch:
+        video.start_prefetch(prefetch)
+    frames = 0
+    start = time.perf_counter()
+    while True:
+        success, frame = video.read()
+        if not success:
+            break
+        if work is not None:
+            work(frame)
+        frames += 1
+    seconds = time.perf_counter() - start
+    video.release()
+    return frames / seconds
+
+
+def get_frame_fps(path, indices):
+    video = VideoReader(path, cache_size=64)
+    start = time.perf_counter()
+    for index in indices:
+        video.get_frame(index)
+    seconds = time.perf_counter() - start
+    hits = video.cache_hits / len(indices)
+    video.release()
+    return len(indices) / seconds, hits
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "../Videos/test3.mp4"
+    frame_count = VideoReader(path).frame_count
+    work = lambda frame: cv2.GaussianBlur(frame, (31, 31), 0)
+
+    print(f"{'read()':>28} {'fps':>8}")
+    for name, prefetch, function in [("decode only", 0, None), ("decode only + prefetch", 16, None),
+                                     ("decode + blur", 0, work), ("decode + blur + prefetch", 16, work)]:
+        print(f"{name:>28} {read_fps(path, prefetch, function):>8.1f}")
+
+    rng = np.random.default_rng(0)
+    print(f"\n{'get_frame()':>28} {'fps':>8} {'cache hits':>11}")
+    for name, indices in [("sequential", list(range(frame_count))),
+                          ("random", rng.integers(0, frame_count, 200).tolist()),
+                          ("window of 50, 4 passes", list(range(50)) * 4)]:
+        fps, hits = get_frame_fps(path, indices)
+        print(f"{name:>28} {fps:>8.1f} {hits:>11.1%}")
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+from Decrypt import Decrypt
+from VideoReader import VideoReader
+
+# Scaling of Decrypt.process with its workers (boxes of the frames in flight on a pool) and
+# segment processes, on a 1080p video with 12 encrypted boxes of 240x600 per frame.
+# Speedups are bounded by the number of cores: compare with the printed core count.
+#   python Benchmarks/decrypt_bench.py [frames]
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+class FakeModel:
+    names = {0: "person"}
+
+    def __init__(self, box_count=12):
+        rng = np.random.default_rng(0)
+        rows = []
+        for track_id in range(1, box_count + 1):
+            x1, y1 = rng.integers(0, WIDTH - 250), rng.integers(0, HEIGHT - 610)
+            rows.append([x1, y1, x1 + 240, y1 + 600, track_id, 0.9, 0])
+        self.boxes = torch.tensor(rows, dtype=torch.float32)
+
+    def track(self, frame, **options):
+        return [Results(frame, path="", names=self.names, boxes=self.boxes)]
+
+
+def build(directory, method, frames):
+    source = os.path.join(directory, "source.mp4")
+    if not os.path.exists(source):
+        background = np.tile(np.linspace(0, 255, WIDTH, dtype=np.uint8), (HEIGHT, 1))
+        out = cv2.VideoWriter(source, cv2.VideoWriter_fourcc(*'mp4v'), 25, (WIDTH, HEIGHT))
+        for i in range(frames):
+            out.write(cv2.cvtColor(np.roll(background, 8 * i, axis=1), cv2.COLOR_GRAY2BGR))
+        out.release()
+    encrypted = os.path.join(directory, f"encrypted_{method}.mp4")
+    frame_data = os.path.join(directory, f"frame_data_{method}.bin")
+    Detection(VideoReader(source), encrypted, True, method, model=FakeModel(), frame_data_path=frame_data, keys_path=os.devnull).process()
+    return encrypted, frame_data
+
+
+def bench(encrypted, frame_data, output, segment_workers=1, **options):
+    decrypt = Decrypt(encrypted, output, frame_data, **options)
+    start = time.perf_counter()
+    decrypt.process(segment_workers=segment_workers)
+    return decrypt.frames_written / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    configurations = [
+        ("serial", 1, {}),
+        ("2 threads", 1, {"workers": 2}),
+        ("4 threads", 1, {"workers": 4}),
+        ("2 processes", 1, {"workers": 2, "executor": "process"}),
+        ("2 segments", 2, {}),
+        ("2 segments x 2 threads", 2, {"workers": 2}),
+    ]
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "decrypted.mp4")
+        for method in ("AES", "Selective"):
+            encrypted, frame_data = build(directory, method, frames)
+            reference = None
+            for name, segment_workers, options in configurations:
+                fps = bench(encrypted, frame_data, output, segment_workers, **options)
+                reference = reference or fps
+                rows.append((method, name, fps, fps / reference))
+
+    print(f"\n\n{os.cpu_count()} cores")
+    print(f"{'method':>10} {'configuration':>24} {'fps':>8} {'speedup':>8}")
+    for method, name, fps, speedup in rows:
+        print(f"{method:>10} {name:>24} {fps:>8.1f} {speedup:>7.2f}x")
@@ -0,0 +1,60 @@
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Encoder import encode
+from VideoSegments import ffmpeg_path
+
+# Encode throughput and output size of the encoder backends (Encoder.py) on the same frames.
+# Frames are decoded once from the video and kept in memory, so only encoding is timed.
+#   python Benchmarks/encoder_bench.py [video] [frames]
+
+CONFIGURATIONS = [
+    ("opencv mp4v", {"backend": "opencv"}),
+    ("ffmpeg mpeg4", {"backend": "ffmpeg", "codec": "mpeg4"}),
+    ("ffmpeg x264 ultrafast", {"backend": "ffmpeg", "preset": "ultrafast"}),
+    ("ffmpeg x264 veryfast", {"backend": "ffmpeg", "preset": "veryfast"}),
+    ("ffmpeg x264 veryfast 1t", {"backend": "ffmpeg", "preset": "veryfast", "threads": 1}),
+    ("ffmpeg x264 medium", {"backend": "ffmpeg", "preset": "medium"}),
+    ("ffmpeg x264 4M", {"backend": "ffmpeg", "preset": "veryfast", "bitrate": "4M"}),
+]
+
+
+def load_frames(video_path, count):
+    video = cv2.VideoCapture(video_path)
+    fps = video.get(cv2.CAP_PROP_FPS)
+    frames = []
+    while len(frames) < count:
+        success, frame = video.read()
+        if not success:
+            break
+        frames.append(frame)
+    video.release()
+    return frames, fps
+
+
+if __name__ == "__main__":
+    video_path = sys.argv[1] if len(sys.argv) > 1 else "../Videos/test3.mp4"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    frames, fps = load_frames(video_path, count)
+    if ffmpeg_path() is None:
+        print("ffmpeg not found: only OpenCV is measured")
+        configurations = CONFIGURATIONS[:1]
+    else:
+        configurations = CONFIGURATIONS
+
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames of {width}x{height}, {os.cpu_count()} cores")
+    print(f"{'encoder':>24} {'fps':>8} {'size (MB)':>10} {'Mbit/s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for name, options in configurations:
+            path = os.path.join(directory, "output.mp4")
+            start = time.perf_counter()
+            encode(iter(frames), path, fps, **options)
+            seconds = time.perf_counter() - start
+            size = os.path.getsize(path)
+            print(f"{name:>24} {len(frames) / seconds:>8.1f} {size / 1e6:>10.2f} {size * 8 / 1e6 / (len(frames) / fps):>8.2f}")
@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+
+# Scaling of the region encryption pool (Detection.encrypt_regions) with the number of workers:
+# time per 1080p frame with 20 boxes of 240x600, for each method, mode and executor.
+#   python Benchmarks/encrypt_bench.py [max workers]
+
+
+def make_results(frame, box_count=20):
+    rng = np.random.default_rng(0)
+    rows = []
+    for track_id in range(1, box_count + 1):
+        x1, y1 = rng.integers(0, 1920 - 250), rng.integers(0, 1080 - 610)
+        rows.append([x1, y1, x1 + 240, y1 + 600, track_id, 0.9, 0])
+    return [Results(frame, path="", names={0: "person"}, boxes=torch.tensor(rows, dtype=torch.float32))]
+
+
+def bench(detection, frame, repeat=20):
+    results = make_results(frame)
+    detection.blur(frame, results, 0) # keys, pool start
+    start = time.perf_counter()
+    for i in range(repeat):
+        detection.blur(frame, results, i)
+    seconds = (time.perf_counter() - start) / repeat
+    detection.close_encrypt_pool()
+    return seconds
+
+
+if __name__ == "__main__":
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else max(os.cpu_count(), 4)
+    worker_counts = [1] + [n for n in (2, 4, 8, 16) if n <= max_workers]
+    frame = np.random.randint(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    print(f"{os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'method':>10} {'mode':>5} {'executor':>9} {'workers':>8} {'ms/frame':>9} {'speedup':>8}")
+        for method in ["AES", "Selective"]:
+            for mode in ["CBC", "CTR"]:
+                serial = None
+                for executor in ["thread", "process"]:
+                    for workers in worker_counts:
+                        if workers == 1 and executor == "process":
+                            continue
+                        detection = Detection(None, os.devnull, True, method, aes_mode=mode, model=object(),
+                                              frame_data_path=os.path.join(directory, "frame_data.bin"), keys_path=os.path.join(directory, "aes_keys.txt"),
+                                              encrypt_workers=workers, encrypt_executor=executor)
+                        seconds = bench(detection, frame.copy())
+                        serial = serial or seconds
+                        print(f"{method:>10} {mode:>5} {executor:>9} {workers:>8} {seconds * 1000:>9.2f} {serial / seconds:>7.2f}x")
@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+
+# Fixed 85x85 Gaussian kernel against the fast blur (Detection.fast_gaussian_blur), per box size.
+#   vs exact : mean absolute difference between the fast blur and cv2.GaussianBlur with the same sigma
+#   detail   : Laplacian energy left in the blurred region, relative to the original (lower hides more)
+#   python Benchmarks/gaussian_bench.py [video]
+
+
+def source_frame(video_path):
+    """
+    A frame of the video upscaled to 1080p, or a synthetic textured frame.
+    """
+    capture = cv2.VideoCapture(video_path)
+    success, frame = capture.read()
+    capture.release()
+    if success:
+        return cv2.resize(frame, (1920, 1080), interpolation=cv2.INTER_CUBIC)
+    rng = np.random.default_rng(0)
+    frame = cv2.resize(rng.integers(0, 256, (68, 120, 3), dtype=np.uint8), (1920, 1080), interpolation=cv2.INTER_CUBIC)
+    for _ in range(200):
+        x, y = rng.integers(0, 1900), rng.integers(0, 1060)
+        cv2.putText(frame, "ID", (int(x), int(y)), cv2.FONT_HERSHEY_SIMPLEX, 1.5, rng.integers(0, 256, 3).tolist(), 3)
+    return frame
+
+
+def detail(region):
+    return float(np.abs(cv2.Laplacian(cv2.cvtColor(region, cv2.COLOR_BGR2GRAY), cv2.CV_32F)).mean())
+
+
+def bench(function, region, repeat=20):
+    function(region)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(region)
+    return (time.perf_counter() - start) / repeat
+
+
+if __name__ == "__main__":
+    frame = source_frame(sys.argv[1] if len(sys.argv) > 1 else "../Videos/test3.mp4")
+    reference = Detection(None, os.devnull, True, "Gaussian", model=object())
+    fast = Detection(None, os.devnull, True, "Gaussian", model=object(), fast_blur=True)
+
+    print(f"{'box':>10} {'85x85 ms':>9} {'fast ms':>8} {'speedup':>8} {'sigma':>6} {'vs exact':>9} {'detail 85x85':>13} {'detail fast':>12}")
+    for width, height in [(40, 100), (120, 300), (240, 600), (400, 1000)]:
+        region = frame[40:40 + height, 500:500 + width]
+        reference_time = bench(reference.gaussian_blur, region)
+        fast_time = bench(fast.gaussian_blur, region)
+
+        sigma = max(fast.blur_strength * min(width, height), 2.0)
+        exact = cv2.GaussianBlur(region, (0, 0), sigma)
+        difference = np.abs(fast.gaussian_blur(region).astype(np.int16) - exact).mean() / 255
+        original_detail = detail(region)
+        print(f"{width:>4}x{height:<5} {reference_time * 1000:>9.2f} {fast_time * 1000:>8.2f} {reference_time / fast_time:>7.1f}x {sigma:>6.1f}"
+              f" {difference:>9.2%} {detail(reference.gaussian_blur(region)) / original_detail:>13.1%} {detail(fast.gaussian_blur(region)) / original_detail:>12.1%}")
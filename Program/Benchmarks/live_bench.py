@@ -0,0 +1,57 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import LiveReader
+from Detection import Detection
+
+# Live ingest (VideoReader.LiveReader): a video replayed at its frame rate as a camera stand-in,
+# anonymised with the Gaussian method under different latency bounds and inference sizes.
+#   fps     : frames written per second (the source sends 25)
+#   dropped : frames dropped as stale
+#   p50/p90/p99 : end-to-end latency, from the arrival of a frame to its output
+# A synthetic 720p video is measured unless one is given.
+# Run from the Program folder (models are loaded from Models/):
+#   python Benchmarks/live_bench.py ../Videos/small.mp4
+
+WIDTH, HEIGHT, FRAMES, FPS = 1280, 720, 250, 25
+SETTINGS = [(None, None), (1.0, None), (0.5, None), (0.25, None), (0.25, 320)]
+
+
+def build_video(path):
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), FPS, (WIDTH, HEIGHT))
+    for i in range(FRAMES):
+        frame = background.copy()
+        x = 100 + 4 * i
+        cv2.ellipse(frame, (x, 250), (30, 35), 0, 0, 360, (90, 120, 170), -1) # head
+        cv2.rectangle(frame, (x - 50, 285), (x + 50, 560), (60, 60, 140), -1) # body
+        out.write(frame)
+    out.release()
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        videos = sys.argv[1:]
+        if not videos:
+            videos = [os.path.join(directory, "synthetic.mp4")]
+            build_video(videos[0])
+        output_path = os.path.join(directory, "output.mp4")
+        Detection(LiveReader(videos[0], max_frames=5), output_path, True, "Gaussian").process() # warm-up
+
+        rows = []
+        for video_path in videos:
+            for max_latency, inference_size in SETTINGS:
+                detection = Detection(LiveReader(video_path, max_latency=max_latency), output_path, True, "Gaussian",
+                                      inference_size=inference_size)
+                detection.process()
+                rows.append((os.path.basename(video_path), max_latency, inference_size, detection.fps, detection.latency))
+
+        print(f"\n{'video':>16} {'bound s':>8} {'size':>6} {'fps':>7} {'dropped':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+        for name, max_latency, inference_size, fps, latency in rows:
+            print(f"{name:>16} {str(max_latency or '-'):>8} {str(inference_size or '-'):>6} {fps:>7.1f} {latency['drop_rate']:>8.1%} "
+                  f"{latency['p50_ms']:>8.0f} {latency['p90_ms']:>8.0f} {latency['p99_ms']:>8.0f}")
@@ -0,0 +1,69 @@
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+from Crypto.Random import get_random_bytes
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from FrameData import FrameDataWriter, KeyWriter
+
+# Writing the frame data and key table of a long video: files opened for every frame / new
+# track (as before), written record by record, and in chunks with and without fsync.
+#   python Benchmarks/metadata_bench.py [frames]
+
+BOXES = 10
+
+
+def make_records(frame_count):
+    key = get_random_bytes(16)
+    region = np.random.randint(0, 256, (50, 20, 3), dtype=np.uint8)
+    for frame_index in range(frame_count):
+        first_id = frame_index // 10 * BOXES # new tracks every 10 frames
+        yield frame_index, {"frame_index": frame_index, "isSelective": False, "mode": "CBC", "bboxes": [
+            {"id": first_id + i, "coords": [0, 0, 20, 50], "key": key, "iv": get_random_bytes(16), "region": region} for i in range(BOXES)]}
+
+
+def open_per_frame(directory, frame_count):
+    keys = set()
+    for frame_index, frame_data in make_records(frame_count):
+        with open(os.path.join(directory, "frame_data.bin"), "ab") as f:
+            for bbox in frame_data["bboxes"]: # payloads only, headers left out
+                f.write(bbox["iv"])
+                f.write(bbox["region"].data)
+        for bbox in frame_data["bboxes"]:
+            if bbox["id"] not in keys:
+                keys.add(bbox["id"])
+                with open(os.path.join(directory, "aes_keys.txt"), "a") as f:
+                    f.write(f"ID: {bbox['id']}, Key: {bbox['key'].hex()}\n")
+
+
+def chunked(directory, frame_count, **options):
+    keys = set()
+    with FrameDataWriter(os.path.join(directory, "frame_data.bin"), **options) as writer, \
+            KeyWriter(os.path.join(directory, "aes_keys.txt"), **options) as key_writer:
+        for frame_index, frame_data in make_records(frame_count):
+            for bbox in frame_data["bboxes"]:
+                if bbox["id"] not in keys:
+                    keys.add(bbox["id"])
+                    key_writer.write(bbox["id"], bbox["key"])
+            writer.write(frame_data)
+        return writer.file.chunks + key_writer.file.chunks
+
+
+if __name__ == "__main__":
+    frame_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    runs = [
+        ("open per frame", lambda d: open_per_frame(d, frame_count)),
+        ("record by record", lambda d: chunked(d, frame_count, chunk_size=0)),
+        ("chunks 4 MB", lambda d: chunked(d, frame_count)),
+        ("chunks 4 MB + fsync", lambda d: chunked(d, frame_count, fsync=True)),
+        ("record + fsync", lambda d: chunked(d, frame_count, chunk_size=0, fsync=True)),
+    ]
+    print(f"{'writer':>20} {'seconds':>8} {'frames/s':>9} {'chunks':>7}")
+    for name, run in runs:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            chunks = run(directory)
+            seconds = time.perf_counter() - start
+        print(f"{name:>20} {seconds:>8.2f} {frame_count / seconds:>9.0f} {chunks if chunks is not None else '-':>7}")
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from Detection import Detection
+from Regions import Regions
+from stride_bench import accuracy
+
+# Speed and accuracy of detection restricted to regions (Regions.py) against the whole frame.
+#   area    : share of the frame pixels given to the detector
+#   recall  : whole-frame boxes matched with IoU >= 0.5 (boxes in excluded areas count as missed)
+#   exposed : share of the whole-frame box area not covered by any box of the run
+# The region is the lower part of the frame (a fixed camera with sky or ceiling on top).
+# Run from the Program folder (models are loaded from Models/):
+#   python Benchmarks/regions_bench.py ../Videos/small.mp4 ../Videos/test3.mp4
+
+
+def run(video_path, regions=None, **options):
+    detection = Detection(VideoReader(video_path), os.devnull, regions=regions, **options)
+    boxes = []
+    start = time.perf_counter()
+    for frame, results in detection.track(detection.read_frames()):
+        boxes.append((frame.shape[:2], results[0].boxes.xyxy.cpu().numpy()))
+    seconds = time.perf_counter() - start
+    detection.video.release()
+    return len(boxes) / seconds, boxes
+
+
+def lower_part(width, height, fraction):
+    top = int(height * (1 - fraction))
+    return [[[0, top], [width - 1, top], [width - 1, height - 1], [0, height - 1]]]
+
+
+if __name__ == "__main__":
+    videos = sys.argv[1:] or ["../Videos/small.mp4", "../Videos/test3.mp4"]
+
+    print(f"{'video':>16} {'regions':>22} {'area':>6} {'fps':>8} {'speedup':>8} {'recall':>8} {'exposed':>8}")
+    for video_path in videos:
+        reader = VideoReader(video_path)
+        width, height = reader.width, reader.height
+        reader.release()
+        configurations = [
+            ("lower 60%", Regions(lower_part(width, height, 0.6)), {}),
+            ("lower 60%, 320 px", Regions(lower_part(width, height, 0.6)), {"inference_size": 320}),
+            ("tiles 640", Regions(tile_size=640), {"inference_size": 640}),
+            ("lower 60%, tiles 640", Regions(lower_part(width, height, 0.6), tile_size=640), {"inference_size": 640}),
+        ]
+        reference_fps, reference = run(video_path)
+        name = os.path.basename(video_path)
+        print(f"{name:>16} {'whole frame':>22} {1:>6.0%} {reference_fps:>8.1f} {1:>7.1f}x {1:>8.1%} {0:>8.1%}")
+        for label, regions, options in configurations:
+            fps, boxes = run(video_path, regions, **options)
+            recall, exposed = accuracy(reference, boxes)
+            print(f"{name:>16} {label:>22} {regions.active_fraction():>6.0%} {fps:>8.1f} {fps / reference_fps:>7.1f}x {recall:>8.1%} {exposed:>8.1%}")
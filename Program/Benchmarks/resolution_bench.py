@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from Detection import Detection
+from stride_bench import accuracy
+
+# Speed and accuracy of detection on downscaled frames (Detection inference_size) against
+# detection at native resolution. Boxes are compared in native coordinates.
+#   recall  : native boxes matched by a box of the downscaled run with IoU >= 0.5
+#   exposed : share of the native box area not covered by any box of the downscaled run
+# Run from the Program folder (models are loaded from Models/):
+#   python Benchmarks/resolution_bench.py ../Videos/small.mp4 ../Videos/test3.mp4
+
+SIZES = [1280, 960, 640, 480, 320]
+
+
+def run(video_path, inference_size, batch_size=1):
+    detection = Detection(VideoReader(video_path), os.devnull, inference_size=inference_size)
+    boxes = []
+    start = time.perf_counter()
+    for frame, results in detection.track(detection.read_frames(), batch_size=batch_size):
+        boxes.append((frame.shape[:2], results[0].boxes.xyxy.cpu().numpy()))
+    seconds = time.perf_counter() - start
+    detection.video.release()
+    return len(boxes) / seconds, boxes
+
+
+if __name__ == "__main__":
+    videos = sys.argv[1:] or ["../Videos/small.mp4", "../Videos/test3.mp4"]
+
+    print(f"{'video':>16} {'size':>8} {'fps':>8} {'speedup':>8} {'recall':>8} {'exposed':>8}")
+    for video_path in videos:
+        reader = VideoReader(video_path)
+        native = max(reader.width, reader.height)
+        reader.release()
+        reference_fps, reference = run(video_path, None)
+        print(f"{os.path.basename(video_path):>16} {native:>8} {reference_fps:>8.1f} {1:>7.1f}x {1:>8.1%} {0:>8.1%}")
+        for size in SIZES:
+            if size >= native:
+                continue
+            fps, boxes = run(video_path, size)
+            recall, exposed = accuracy(reference, boxes)
+            print(f"{os.path.basename(video_path):>16} {size:>8} {fps:>8.1f} {fps / reference_fps:>7.1f}x {recall:>8.1%} {exposed:>8.1%}")
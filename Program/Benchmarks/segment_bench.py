@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from Detection import Detection
+from FrameData import FrameDataReader
+
+# Wall-clock time of one video processed sequentially and split in segments on 2..N processes
+# (Detection.process(segment_workers=N), see ParallelSegments.py), with the number of track IDs.
+# Run from the Program folder (models are loaded from Models/):
+#   python Benchmarks/segment_bench.py ../Videos/test3.mp4 [max workers]
+
+
+def run(video_path, directory, workers):
+    output_path = os.path.join(directory, f"out_{workers}.mp4")
+    frame_data_path = os.path.join(directory, f"frame_data_{workers}.bin")
+    detection = Detection(VideoReader(video_path), output_path, True, "AES", frame_data_path=frame_data_path,
+                          keys_path=os.path.join(directory, f"keys_{workers}.txt"))
+    start = time.perf_counter()
+    detection.process(segment_workers=workers)
+    seconds = time.perf_counter() - start
+    with FrameDataReader(frame_data_path) as reader:
+        track_ids = len(reader.ids())
+    return seconds, track_ids
+
+
+if __name__ == "__main__":
+    video_path = sys.argv[1] if len(sys.argv) > 1 else "../Videos/test3.mp4"
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    print(f"{os.cpu_count()} CPUs")
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = [(workers,) + run(video_path, directory, workers) for workers in range(1, max(max_workers, 2) + 1)]
+
+    print(f"{'workers':>8} {'seconds':>8} {'speedup':>8} {'track IDs':>10}")
+    for workers, seconds, track_ids in results:
+        print(f"{workers:>8} {seconds:>8.2f} {results[0][1] / seconds:>7.2f}x {track_ids:>10}")
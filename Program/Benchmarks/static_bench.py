@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from Detection import Detection
+from stride_bench import accuracy
+
+# Speed of the static gate (Detection static_threshold) against detection on every frame,
+# full processing (detection, drawing, encoding) with the Gaussian method.
+#   skipped : frames that reused the last detection
+#   recall  : boxes of the ungated run matched with IoU >= 0.5
+# A synthetic surveillance-like video is always measured: a still noisy scene, empty
+# except for one person crossing it during a sixth of the frames. Other videos can be given.
+# Run from the Program folder (models are loaded from Models/):
+#   python Benchmarks/static_bench.py ../Videos/small.mp4
+
+WIDTH, HEIGHT, FRAMES = 1280, 720, 300
+THRESHOLDS = [0.001, 0.002, 0.005]
+
+
+def build_video(path):
+    rng = np.random.default_rng(0)
+    background = cv2.cvtColor(np.tile(np.linspace(30, 200, WIDTH, dtype=np.uint8), (HEIGHT, 1)), cv2.COLOR_GRAY2BGR)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (WIDTH, HEIGHT))
+    for i in range(FRAMES):
+        frame = np.clip(background.astype(np.int16) + rng.integers(-4, 5, background.shape), 0, 255).astype(np.uint8)
+        if 100 <= i < 150:
+            x = 200 + 16 * (i - 100)
+            cv2.ellipse(frame, (x, 250), (30, 35), 0, 0, 360, (90, 120, 170), -1) # head
+            cv2.rectangle(frame, (x - 50, 285), (x + 50, 560), (60, 60, 140), -1) # body
+        out.write(frame)
+    out.release()
+
+
+def run(video_path, output_path, **options):
+    detection = Detection(VideoReader(video_path), output_path, True, "Gaussian", **options)
+    boxes = []
+    # process() without its prints: the same loop as the sequential path
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), detection.video.fps, (detection.video.width, detection.video.height))
+    start = time.perf_counter()
+    for i, (frame, results) in enumerate(detection.track(detection.read_frames())):
+        boxes.append((frame.shape[:2], results[0].boxes.xyxy.cpu().numpy()))
+        output_frame, _ = detection.anonymise(frame, results, i)
+        out.write(output_frame)
+    seconds = time.perf_counter() - start
+    out.release()
+    detection.video.release()
+    return len(boxes) / seconds, detection.frames_skipped / max(len(boxes), 1), boxes
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        synthetic = os.path.join(directory, "static.mp4")
+        build_video(synthetic)
+        output_path = os.path.join(directory, "output.mp4")
+
+        print(f"{'video':>16} {'threshold':>10} {'fps':>8} {'skipped':>8} {'speedup':>8} {'recall':>8}")
+        for video_path in [synthetic] + sys.argv[1:]:
+            name = os.path.basename(video_path)
+            reference_fps, _, reference = run(video_path, output_path)
+            print(f"{name:>16} {'-':>10} {reference_fps:>8.1f} {0:>8.1%} {1:>7.1f}x {1:>8.1%}")
+            for threshold in THRESHOLDS:
+                fps, skipped, boxes = run(video_path, output_path, static_threshold=threshold, max_gap=30)
+                recall, _ = accuracy(reference, boxes)
+                print(f"{name:>16} {threshold:>10} {fps:>8.1f} {skipped:>8.1%} {fps / reference_fps:>7.1f}x {recall:>8.1%}")
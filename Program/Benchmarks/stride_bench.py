@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from Detection import Detection
+
+# Speed and accuracy of stride detection (Detection.track_strided) against detection on every frame.
+#   recall  : reference boxes matched by a box of the strided run with IoU >= 0.5
+#   exposed : share of the reference box area not covered by any box of the strided run
+# Run from the Program folder (models are loaded from Models/):
+#   python Benchmarks/stride_bench.py ../Videos/small.mp4 ../Videos/test3.mp4
+
+
+def run(video_path, stride, **stride_options):
+    detection = Detection(VideoReader(video_path), os.devnull)
+    boxes = []
+    start = time.perf_counter()
+    for frame, results in detection.track(detection.read_frames(), stride=stride, **stride_options):
+        boxes.append((frame.shape[:2], results[0].boxes.xyxy.cpu().numpy()))
+    seconds = time.perf_counter() - start
+    detection.video.release()
+    return len(boxes) / seconds, boxes
+
+
+def iou(a, b):
+    x1, y1 = np.maximum(a[:2], b[:2])
+    x2, y2 = np.minimum(a[2:], b[2:])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0
+
+
+def accuracy(reference, boxes):
+    matched, total, exposed_area, total_area = 0, 0, 0, 0
+    for (shape, ref_boxes), (_, run_boxes) in zip(reference, boxes):
+        covered = np.zeros(shape, dtype=bool)
+        for x1, y1, x2, y2 in run_boxes.astype(int):
+            covered[y1:y2, x1:x2] = True
+        for ref in ref_boxes:
+            total += 1
+            matched += any(iou(ref, box) >= 0.5 for box in run_boxes)
+            x1, y1, x2, y2 = ref.astype(int)
+            exposed_area += np.count_nonzero(~covered[y1:y2, x1:x2])
+            total_area += covered[y1:y2, x1:x2].size
+    if total == 0:
+        return 1.0, 0.0
+    return matched / total, exposed_area / max(total_area, 1)
+
+
+if __name__ == "__main__":
+    videos = sys.argv[1:] or ["../Videos/small.mp4", "../Videos/test3.mp4"]
+    configurations = [(2, {}), (3, {}), (5, {}), (10, {}), (10, {"adaptive_stride": True})]
+
+    print(f"{'video':>16} {'stride':>14} {'fps':>8} {'speedup':>8} {'recall':>8} {'exposed':>8}")
+    for video_path in videos:
+        reference_fps, reference = run(video_path, 1)
+        print(f"{os.path.basename(video_path):>16} {1:>14} {reference_fps:>8.1f} {1:>7.1f}x {1:>8.1%} {0:>8.1%}")
+        for stride, options in configurations:
+            fps, boxes = run(video_path, stride, **options)
+            recall, exposed = accuracy(reference, boxes)
+            name = f"{stride}{' adaptive' if options else ''}"
+            print(f"{os.path.basename(video_path):>16} {name:>14} {fps:>8.1f} {fps / reference_fps:>7.1f}x {recall:>8.1%} {exposed:>8.1%}")
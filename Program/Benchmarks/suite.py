@@ -0,0 +1,365 @@
+import os
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "") # CPU only, comparable between machines
+os.environ.setdefault("YOLO_OFFLINE", "1") # no download, no online check
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from Detection import Detection
+from Decrypt import Decrypt
+from FrameData import FrameDataWriter
+from Tracking import BatchTracker, set_track_count
+import AESCipher
+
+# Reproducible benchmark suite of the whole pipeline, CPU only and offline.
+# Synthetic videos (resolution, length, people per frame) are generated from a fixed seed,
+# then every stage is timed on its own and end to end:
+#   decode           VideoReader.read
+#   track            Detection.track (model.track and ByteTrack)
+#   blur/<method>    Detection.blur on the tracked boxes (Gaussian, fast Gaussian, Pixelate, AES, Selective)
+#   cipher/<method>  AESCipher.aes_encrypt / selective_encrypt on a 240x600 region
+#   metadata         FrameDataWriter on the AES records
+#   process/<method> Detection.process, decode to encode
+#   decrypt          Decrypt.process on the AES output
+# Each measure is the median of --repeat runs. The model is a stub: people are found by their
+# color (the same boxes on every machine), while the cost of a real inference comes from
+# Models/yolo11n.pt, or from a network with random weights (yolo11n.yaml) when the weights are
+# missing, or is left out with --no-network.
+# Run from the Program folder:
+#   python Benchmarks/suite.py run --output Benchmarks/baselines/my_machine.json
+#   python Benchmarks/suite.py run --baseline Benchmarks/baselines/my_machine.json   (run, then compare)
+#   python Benchmarks/suite.py compare baseline.json current.json --threshold 0.15
+# compare exits with 1 when a measure is slower than the baseline by more than the threshold.
+
+SCENARIOS = {
+    "360p-2p": {"width": 640, "height": 360, "frames": 60, "people": 2},
+    "720p-6p": {"width": 1280, "height": 720, "frames": 60, "people": 6},
+    "1080p-15p": {"width": 1920, "height": 1080, "frames": 30, "people": 15},
+}
+BLUR_METHODS = {"Gaussian": {}, "Gaussian-fast": {"fast_blur": True}, "Pixelate": {}, "AES": {}, "Selective": {}}
+PROCESS_METHODS = ["Gaussian", "AES"]
+SEED = 0
+
+
+####################################################
+################## Synthetic data ##################
+####################################################
+
+def build_video(path, width, height, frames, people, seed=SEED):
+    """
+    Still textured background, people as saturated shapes walking and bouncing on the borders.
+    """
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(60, 200, (height, width), dtype=np.uint8), (0, 0), 8)
+    background = cv2.cvtColor(background, cv2.COLOR_GRAY2BGR)
+    sizes = rng.uniform(0.25, 0.5, people) * height / np.sqrt(max(people, 2) / 2) # smaller in crowds
+    positions = rng.uniform(0, 1, (people, 2)) * [width, height]
+    velocities = rng.uniform(-1, 1, (people, 2)) * width / 150
+    colors = [tuple(int(c) for c in cv2.cvtColor(np.uint8([[[hue, 255, 200]]]), cv2.COLOR_HSV2BGR)[0, 0])
+              for hue in rng.integers(0, 180, people)]
+
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (width, height))
+    for _ in range(frames):
+        frame = background.copy()
+        for k in range(people):
+            h = sizes[k]
+            w = h * 0.4
+            x, y = positions[k]
+            x, y = min(max(x, 0), width - w), min(max(y, 0), height - h)
+            cv2.ellipse(frame, (int(x + w / 2), int(y + h * 0.1)), (int(w * 0.25), int(h * 0.1)), 0, 0, 360, colors[k], -1)
+            cv2.rectangle(frame, (int(x), int(y + h * 0.2)), (int(x + w), int(y + h)), colors[k], -1)
+            positions[k] += velocities[k]
+            for axis, limit in ((0, width - w), (1, height - h)):
+                if not 0 <= positions[k][axis] <= limit:
+                    velocities[k][axis] *= -1
+        out.write(frame)
+    out.release()
+
+
+class StubModel:
+    """
+    Finds the synthetic people by their saturation, so every machine tracks the same boxes.
+    With a network, a real inference runs on each frame for its cost (its boxes are unused).
+    """
+    names = {0: "person"}
+
+    def __init__(self, network=None):
+        self.network = network
+        self.tracker = BatchTracker("bytetrack.yaml")
+        set_track_count(0)
+
+    def detect(self, frame):
+        if self.network is not None:
+            self.network.predict(frame, classes=0, conf=0.1, verbose=False)
+        saturation = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)[:, :, 1]
+        mask = (saturation > 100).astype(np.uint8)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+        rows = [[x, y, x + w, y + h, 0.9, 0] for x, y, w, h, area in stats[1:count] if area > 200]
+        return Results(frame, path="", names=self.names, boxes=torch.tensor(rows, dtype=torch.float32).reshape(-1, 6))
+
+    def predict(self, frames, **options):
+        return [self.detect(frame) for frame in frames]
+
+    def track(self, frame, **options):
+        return [self.tracker.update(self.detect(frame))]
+
+
+def load_network(enabled=True):
+    """
+    (network, description): the real weights if there are any, else random weights.
+    """
+    if not enabled:
+        return None, "none"
+    from ultralytics import YOLO
+    path = Detection.model_path()
+    if os.path.exists(path):
+        return YOLO(path).to("cpu"), path
+    return YOLO("yolo11n.yaml").to("cpu"), "yolo11n.yaml (random weights)"
+
+
+####################################################
+###################### Measures ####################
+####################################################
+
+def read_all(video_path):
+    video = VideoReader(video_path)
+    frames = []
+    while True:
+        success, frame = video.read()
+        if not success:
+            break
+        frames.append(frame)
+    video.release()
+    return frames
+
+
+def bench_decode(context):
+    start = time.perf_counter()
+    frames = read_all(context["video"])
+    return time.perf_counter() - start, len(frames)
+
+
+def bench_track(context):
+    detection = Detection(VideoReader(context["video"]), os.devnull, model=StubModel(context["network"]))
+    detection.model.detect(context["frames"][0]) # warm-up, outside of the timing
+    detection.model.tracker.reset()
+    set_track_count(0)
+    start = time.perf_counter()
+    results = [results for _, results in detection.track(iter(context["frames"]))]
+    seconds = time.perf_counter() - start
+    context["results"] = results
+    return seconds, len(results)
+
+
+def bench_blur(context, method, options):
+    directory = context["directory"]
+    detection = Detection(VideoReader(context["video"]), os.devnull, True, method.split("-")[0], model=StubModel(),
+                          frame_data_path=os.path.join(directory, "blur_frame_data.bin"), keys_path=os.devnull, **options)
+    detection.video.release()
+    frames = [frame.copy() for frame in context["frames"]]
+    records = []
+    start = time.perf_counter()
+    for i, (frame, results) in enumerate(zip(frames, context["results"])):
+        records.append(detection.blur(frame, results, i))
+    seconds = time.perf_counter() - start
+    detection.close_frame_data()
+    if method == "AES":
+        context["records"] = records
+    return seconds, len(frames)
+
+
+def bench_cipher(context, method, repeat=20):
+    region = np.random.default_rng(SEED).integers(0, 256, (600, 240, 3), dtype=np.uint8)
+    key = os.urandom(16)
+    encrypt = AESCipher.aes_encrypt if method == "AES" else AESCipher.selective_encrypt
+    encrypt(region, key)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encrypt(region, key)
+    return time.perf_counter() - start, repeat * region.nbytes / 1e6
+
+
+def bench_metadata(context):
+    path = os.path.join(context["directory"], "metadata.bin")
+    start = time.perf_counter()
+    writer = FrameDataWriter(path)
+    for record in context["records"]:
+        writer.write(record)
+    writer.close()
+    seconds = time.perf_counter() - start
+    return seconds, os.path.getsize(path) / 1e6
+
+
+def bench_process(context, method):
+    directory = context["directory"]
+    output = os.path.join(directory, f"process_{method}.mp4")
+    detection = Detection(VideoReader(context["video"]), output, True, method, model=StubModel(context["network"]),
+                          frame_data_path=os.path.join(directory, f"frame_data_{method}.bin"),
+                          keys_path=os.path.join(directory, f"keys_{method}.txt"))
+    start = time.perf_counter()
+    detection.process()
+    return time.perf_counter() - start, detection.frames_processed
+
+
+def bench_decrypt(context):
+    directory = context["directory"]
+    decrypt = Decrypt(os.path.join(directory, "process_AES.mp4"), os.path.join(directory, "decrypted.mp4"),
+                      os.path.join(directory, "frame_data_AES.bin"))
+    start = time.perf_counter()
+    decrypt.process()
+    return time.perf_counter() - start, decrypt.frames_written
+
+
+def measures():
+    """
+    (name, function, unit of the work it returns), in order: later measures use what earlier ones left in the context.
+    """
+    yield "decode", bench_decode, "frames"
+    yield "track", bench_track, "frames"
+    for method, options in BLUR_METHODS.items():
+        yield f"blur/{method}", lambda context, m=method, o=options: bench_blur(context, m, o), "frames"
+    for method in ("AES", "Selective"):
+        yield f"cipher/{method}", lambda context, m=method: bench_cipher(context, m), "MB"
+    yield "metadata", bench_metadata, "MB"
+    for method in PROCESS_METHODS:
+        yield f"process/{method}", lambda context, m=method: bench_process(context, m), "frames"
+    yield "decrypt", bench_decrypt, "frames"
+
+
+####################################################
+####################### Runner #####################
+####################################################
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(scenarios, repeat=3, network_enabled=True):
+    torch.set_num_threads(max(1, os.cpu_count() or 1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        network, network_name = load_network(network_enabled)
+    report = {
+        "meta": {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": git_commit(), "python": platform.python_version(),
+                 "platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count(),
+                 "torch": torch.__version__, "opencv": cv2.__version__, "network": network_name, "repeat": repeat, "seed": SEED},
+        "scenarios": {name: SCENARIOS[name] for name in scenarios},
+        "results": {},
+    }
+    for scenario in scenarios:
+        with tempfile.TemporaryDirectory() as directory:
+            video = os.path.join(directory, "video.mp4")
+            build_video(video, **SCENARIOS[scenario])
+            context = {"directory": directory, "video": video, "network": network, "frames": read_all(video)}
+            for name, function, unit in measures():
+                times = []
+                for _ in range(repeat):
+                    with contextlib.redirect_stdout(io.StringIO()): # progress prints
+                        seconds, work = function(context)
+                    times.append(seconds)
+                seconds = statistics.median(times)
+                key = f"{scenario}/{name}"
+                report["results"][key] = {"seconds": seconds, "work": work, "unit": unit, "rate": work / max(seconds, 1e-12),
+                                          "spread": (max(times) - min(times)) / max(seconds, 1e-12)}
+                print(f"{key:>30} {seconds * 1000:>10.1f} ms {work / max(seconds, 1e-12):>10.1f} {unit}/s")
+    return report
+
+
+def compare(baseline, current, threshold=0.1):
+    """
+    Measures of current slower (regression) or faster (improvement) than baseline by more than
+    threshold (relative time). Returns (rows, regressions), rows = (key, baseline s, current s, change, status).
+    """
+    rows = []
+    regressions = []
+    for key, result in current["results"].items():
+        reference = baseline["results"].get(key)
+        if reference is None:
+            rows.append((key, None, result["seconds"], None, "new"))
+            continue
+        change = result["seconds"] / max(reference["seconds"], 1e-12) - 1
+        status = "ok"
+        if change > threshold:
+            status = "REGRESSION"
+            regressions.append(key)
+        elif change < -threshold:
+            status = "faster"
+        rows.append((key, reference["seconds"], result["seconds"], change, status))
+    for key in baseline["results"]:
+        if key not in current["results"]:
+            rows.append((key, baseline["results"][key]["seconds"], None, None, "missing"))
+    return rows, regressions
+
+
+def print_comparison(baseline, current, threshold):
+    for field in ("cpu_count", "processor", "network", "torch", "opencv"):
+        if baseline["meta"].get(field) != current["meta"].get(field):
+            print(f"Warning: {field} differs ({baseline['meta'].get(field)} -> {current['meta'].get(field)})")
+    rows, regressions = compare(baseline, current, threshold)
+    print(f"{'measure':>30} {'baseline':>12} {'current':>12} {'change':>8}  status")
+    for key, reference, seconds, change, status in rows:
+        reference = f"{reference * 1000:.1f} ms" if reference is not None else "-"
+        seconds = f"{seconds * 1000:.1f} ms" if seconds is not None else "-"
+        change = f"{change:+.1%}" if change is not None else "-"
+        print(f"{key:>30} {reference:>12} {seconds:>12} {change:>8}  {status}")
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark suite of the pipeline (see the header of this file).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_run = commands.add_parser("run", help="Run the suite")
+    parser_run.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser_run.add_argument("--repeat", type=int, default=3, help="Runs per measure, the median is kept")
+    parser_run.add_argument("--quick", action="store_true", help="Smallest scenario, one run per measure")
+    parser_run.add_argument("--no-network", action="store_true", help="Stub detection only, without the cost of an inference")
+    parser_run.add_argument("--output", default=None, help="JSON results (a baseline for later runs)")
+    parser_run.add_argument("--baseline", default=None, help="Compare the results with this JSON baseline")
+    parser_run.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown counted as a regression")
+
+    parser_compare = commands.add_parser("compare", help="Compare two JSON results")
+    parser_compare.add_argument("baseline")
+    parser_compare.add_argument("current")
+    parser_compare.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        return 1 if print_comparison(baseline, current, args.threshold) else 0
+
+    scenarios = args.scenarios[:1] if args.quick else args.scenarios
+    report = run_suite(scenarios, 1 if args.quick else args.repeat, not args.no_network)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results saved to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if print_comparison(baseline, report, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
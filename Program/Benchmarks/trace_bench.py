@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Trace import Tracer, tracer
+from VideoReader import VideoReader
+from Detection import Detection
+
+# Cost of the tracing (Trace.py):
+#   span    : one "with span(...)" and count(...) pair, tracing disabled and enabled
+#   process : Detection.process with the Gaussian method, without and with tracing
+#             (and with the sampling profiler on every frame)
+# A synthetic video is measured unless one is given.
+# Run from the Program folder (models are loaded from Models/):
+#   python Benchmarks/trace_bench.py ../Videos/small.mp4
+
+WIDTH, HEIGHT, FRAMES = 640, 360, 150
+CALLS = 200000
+
+
+def span_cost(enabled):
+    t = Tracer()
+    if enabled:
+        t.enable()
+    start = time.perf_counter()
+    for i in range(CALLS):
+        with t.span("stage"):
+            t.count("boxes", 2)
+    return (time.perf_counter() - start) / CALLS
+
+
+def build_video(path):
+    rng = np.random.default_rng(0)
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), 25, (WIDTH, HEIGHT))
+    for i in range(FRAMES):
+        frame = rng.integers(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (100 + 2 * i, 80), (180 + 2 * i, 300), (60, 60, 140), -1)
+        out.write(frame)
+    out.release()
+
+
+def run(video_path, directory, trace=False, profile=False):
+    if trace:
+        tracer.enable()
+    if profile:
+        tracer.profile(0, 10**9, os.path.join(directory, "profile.txt"))
+    detection = Detection(VideoReader(video_path), os.path.join(directory, "output.mp4"), True, "Gaussian")
+    start = time.perf_counter()
+    detection.process()
+    seconds = time.perf_counter() - start
+    tracer.disable()
+    return detection.video.frame_count / seconds
+
+
+if __name__ == "__main__":
+    print(f"{'span':>10} {'ns/call':>10}")
+    for enabled in (False, True):
+        print(f"{'enabled' if enabled else 'disabled':>10} {span_cost(enabled) * 1e9:>10.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        videos = sys.argv[1:]
+        if not videos:
+            videos = [os.path.join(directory, "synthetic.mp4")]
+            build_video(videos[0])
+        rows = []
+        for video_path in videos:
+            run(video_path, directory) # warm-up: model loading, first inference
+            reference = run(video_path, directory)
+            rows.append((os.path.basename(video_path), "off", reference, 1.0))
+            for name, options in (("trace", {"trace": True}), ("profile", {"trace": True, "profile": True})):
+                fps = run(video_path, directory, **options)
+                rows.append((os.path.basename(video_path), name, fps, fps / reference))
+        print(f"\n{'video':>16} {'tracing':>8} {'fps':>8} {'relative':>9}")
+        for name, mode, fps, relative in rows:
+            print(f"{name:>16} {mode:>8} {fps:>8.1f} {relative:>8.1%}")
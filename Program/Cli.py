@@ -0,0 +1,312 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+####################################################
+################# Command line tool ################
+####################################################
+#
+# Headless entry point, without the customtkinter App:
+#   python Cli.py anonymise ../Videos/*.mp4 videos_dir/ --output-dir out --method AES --workers 2
+#   python Cli.py decrypt out/small.mp4 out/small_frame_data.bin out/small_decrypted.mp4 --ids 1 2
+#   python Cli.py anonymise rtsp://camera/stream --live --max-latency 0.3 --output-dir out --method Gaussian
+#
+# anonymise runs the jobs on a pool of worker processes, each loading the model once (ModelRegistry),
+# and writes a JSON summary (fps, wall time, boxes per frame...) for every job.
+
+VIDEO_EXTS = (".mp4",)
+IMAGE_EXTS = (".png", ".jpg")
+METHODS = ["Gaussian", "Pixelate", "AES", "Selective"]
+
+def expand_inputs(inputs):
+    """
+    Files, directories (videos and images directly inside) and glob patterns, without duplicates.
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(os.path.join(item, name) for name in os.listdir(item))
+        elif os.path.exists(item):
+            matches = [item]
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+        for path in matches:
+            if path.lower().endswith(VIDEO_EXTS + IMAGE_EXTS) and os.path.isfile(path) and path not in paths:
+                paths.append(path)
+    return paths
+
+
+def init_worker(detect_face):
+    """
+    Load and warm up the model of a worker process before its first job,
+    its jobs then get it from the model registry.
+    """
+    from Detection import Detection
+    from ModelRegistry import warm_up
+    warm_up(Detection.model_path(detect_face))
+
+
+def run_job(job):
+    """
+    Anonymise one video or image with the model of the worker, return its summary.
+    """
+    from Detection import Detection
+    from VideoReader import VideoReader, LiveReader
+    from ModelRegistry import registry
+    from Regions import Regions
+    from Trace import tracer
+
+    summary = {"input": job["input"], "output": job["output"], "status": "ok"}
+    start_time = time.time()
+    saved_time = registry.saved_time
+    if job["trace"]:
+        tracer.enable()
+    if job["profile"]:
+        tracer.profile(*job["profile"])
+    try:
+        is_image = job["input"].lower().endswith(IMAGE_EXTS)
+        if job["live"]:
+            is_image = False
+            video = LiveReader(job["input"], **job["live"])
+        else:
+            video = job["input"] if is_image else VideoReader(job["input"])
+        detection = Detection(video, job["output"], job["method"] is not None, job["method"], job["detect_face"],
+                              aes_mode=job["aes_mode"], fast_blur=job["fast_blur"], inference_size=job["inference_size"],
+                              regions=Regions.load(job["regions"]) if job["regions"] else None,
+                              static_threshold=job["static_threshold"], max_gap=job["max_gap"], encoder=job["encoder"],
+                              encrypt_workers=job["encrypt_workers"], encrypt_executor=job["encrypt_executor"], metadata_fsync=job["fsync"],
+                              frame_data_path=job["frame_data"], keys_path=job["keys"])
+        if is_image:
+            detection.process_image()
+        else:
+            detection.process(**job["options"])
+            summary.update({
+                "frames": detection.frames_processed,
+                "fps": detection.fps,
+                "frames_skipped": detection.frames_skipped,
+                "boxes": detection.box_count,
+                "boxes_per_frame": detection.box_count / max(detection.frames_processed, 1),
+            })
+            if detection.latency is not None:
+                summary["latency"] = detection.latency
+        if job["method"] in ("AES", "Selective"):
+            summary.update({"frame_data": job["frame_data"], "keys": job["keys"]})
+    except Exception as e:
+        summary.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    if job["trace"]:
+        tracer.disable()
+        tracer.export_chrome(job["trace"])
+        tracer.print_summary()
+        summary.update({"trace": job["trace"], "trace_summary": tracer.summary()})
+    summary["wall_time"] = time.time() - start_time
+    summary["model_load_saved"] = registry.saved_time - saved_time
+    return summary
+
+
+def live_name(source, index):
+    """
+    Output name of a live source: the file name of a replayed video or pipe, else live_INDEX.
+    """
+    if "://" in source or source.isdigit():
+        return f"live_{index}", ".mp4"
+    return os.path.splitext(os.path.basename(source))[0], ".mp4"
+
+
+def job_names(paths, live=False):
+    """
+    (name, extension) of the outputs of every input, unique: the name prefixes the output video,
+    frame data, keys and trace files. Inputs with the same file name get their path relative to
+    the inputs' common folder ("a/x.mp4" -> "a_x"), then their extension ("x.mp4", "x.png" -> "x_mp4", "x_png").
+    """
+    names = [live_name(path, index) if live else os.path.splitext(os.path.basename(path)) for index, path in enumerate(paths)]
+    folders = [os.path.dirname(os.path.abspath(path)) for path in paths]
+    common = os.path.commonpath(folders) if paths else ""
+
+    def duplicates(names):
+        keys = [name.lower() for name, _ in names] # case-insensitive file systems
+        return [keys.count(key) > 1 for key in keys]
+
+    names = [(os.path.relpath(os.path.join(folder, name), common).replace(os.sep, "_"), ext) if duplicate else (name, ext)
+             for (name, ext), folder, duplicate in zip(names, folders, duplicates(names))]
+    names = [(f"{name}_{ext.lstrip('.').lower()}", ext) if duplicate else (name, ext)
+             for (name, ext), duplicate in zip(names, duplicates(names))]
+    return [(f"{name}_{index}", ext) if duplicate else (name, ext)
+            for index, ((name, ext), duplicate) in enumerate(zip(names, duplicates(names)))]
+
+
+def anonymise(args):
+    if args.live and (args.threaded or args.checkpoint_every or args.segment_workers > 1):
+        print("Live sources run the sequential detection: no --threaded, --checkpoint-every or --segment-workers")
+        return 1
+    paths = args.inputs if args.live else expand_inputs(args.inputs) # live sources are used as given
+    if not paths:
+        print("No video or image found")
+        return 1
+    if args.segment_workers > 1 and min(args.workers, len(paths)) > 1:
+        # jobs run in daemonic pool processes, which can't start the segment processes
+        print("--segment-workers runs each job in its own processes: use it with --workers 1")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    jobs = []
+    for path, (name, ext) in zip(paths, job_names(paths, args.live)):
+        output = os.path.join(args.output_dir, name + ext)
+        if os.path.abspath(output) == os.path.abspath(path):
+            output = os.path.join(args.output_dir, f"{name}_anonymised{ext}")
+        jobs.append({
+            "input": path,
+            "output": output,
+            "method": args.method,
+            "detect_face": args.face,
+            "aes_mode": args.aes_mode,
+            "fast_blur": args.fast_blur,
+            "inference_size": args.inference_size,
+            "regions": args.regions,
+            "static_threshold": args.static_threshold,
+            "max_gap": args.max_gap,
+            "encoder": encoder_options(args),
+            "live": {"max_latency": args.max_latency or None, "max_frames": args.max_frames, "duration": args.duration} if args.live else None,
+            "trace": os.path.join(args.output_dir, f"{name}_trace.json") if args.trace else None,
+            "profile": (*args.profile_frames, os.path.join(args.output_dir, f"{name}_profile.txt")) if args.profile_frames else None,
+            "encrypt_workers": args.encrypt_workers,
+            "encrypt_executor": args.encrypt_executor,
+            "fsync": args.fsync,
+            "frame_data": os.path.join(args.output_dir, f"{name}_frame_data.bin"),
+            "keys": os.path.join(args.output_dir, f"{name}_aes_keys.txt"),
+            "options": {"batch_size": args.batch_size, "stride": args.stride, "threaded": args.threaded,
+                        "checkpoint_every": args.checkpoint_every, "resume": args.resume,
+                        "segment_workers": args.segment_workers, "segment_overlap": args.segment_overlap},
+        })
+
+    start_time = time.time()
+    summaries = []
+    workers = max(1, min(args.workers, len(jobs)))
+    if workers == 1:
+        init_worker(args.face)
+        for job in jobs:
+            summaries.append(run_job(job))
+            print(f"\n[{len(summaries)}/{len(jobs)}] {job['input']}: {summaries[-1]['status']}")
+    else:
+        # spawn: workers don't inherit torch / CUDA state from this process
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(workers, initializer=init_worker, initargs=(args.face,)) as pool:
+            for summary in pool.imap_unordered(run_job, jobs):
+                summaries.append(summary)
+                print(f"\n[{len(summaries)}/{len(jobs)}] {summary['input']}: {summary['status']}")
+
+    order = {job["input"]: i for i, job in enumerate(jobs)}
+    summaries.sort(key=lambda summary: order[summary["input"]])
+    report = {"workers": workers, "wall_time": time.time() - start_time, "jobs": summaries}
+    summary_path = args.summary or os.path.join(args.output_dir, "summary.json")
+    with open(summary_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Summary saved to {summary_path}")
+    return 0 if all(summary["status"] == "ok" for summary in summaries) else 1
+
+
+def decrypt(args):
+    from Decrypt import Decrypt
+    from Trace import tracer
+    start_time = time.time()
+    if args.trace:
+        tracer.enable()
+    if args.profile_frames:
+        tracer.profile(*args.profile_frames, args.output + ".profile.txt")
+    decrypt = Decrypt(args.video, args.output, args.frame_data, args.ids, args.ids is None,
+                      workers=args.workers, executor=args.executor, encoder=encoder_options(args))
+    decrypt.process(start_frame=args.start_frame, end_frame=args.end_frame, start_time=args.start_time, end_time=args.end_time,
+                    segment_workers=args.segment_workers)
+    print(f"\nDecryption complete in {time.time() - start_time:.2f} seconds ({decrypt.fps:.1f} fps)")
+    if args.trace:
+        tracer.disable()
+        tracer.export_chrome(args.trace)
+        tracer.print_summary()
+        print(f"Trace saved to {args.trace}")
+    return 0
+
+
+def add_encoder_arguments(parser):
+    parser.add_argument("--encoder", choices=["opencv", "ffmpeg"], default="opencv", help="Output video encoder (see Encoder.py)")
+    parser.add_argument("--codec", default=None, help="OpenCV fourcc (default mp4v) or ffmpeg encoder (default libx264)")
+    parser.add_argument("--preset", default=None, help="ffmpeg: speed preset, e.g. ultrafast, veryfast, medium")
+    parser.add_argument("--encoder-threads", type=int, default=None, help="ffmpeg: encoder threads")
+    parser.add_argument("--bitrate", default=None, help="ffmpeg: target bitrate, e.g. 4M")
+
+
+def add_trace_arguments(parser, trace_help):
+    parser.add_argument("--trace", **trace_help)
+    parser.add_argument("--profile-frames", type=int, nargs=2, metavar=("START", "END"), default=None,
+                        help="Sample the Python stacks while these frames are processed (collapsed stacks file)")
+
+
+def encoder_options(args):
+    return {"backend": args.encoder, "codec": args.codec, "preset": args.preset, "threads": args.encoder_threads, "bitrate": args.bitrate}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Person detection, tracking and anonymisation without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_anonymise = commands.add_parser("anonymise", help="Detect and anonymise people in videos and images")
+    parser_anonymise.add_argument("inputs", nargs="+", help="Files, directories or glob patterns")
+    parser_anonymise.add_argument("--output-dir", required=True)
+    parser_anonymise.add_argument("--method", choices=METHODS, default=None, help="Anonymisation method (none: only draw the boxes)")
+    parser_anonymise.add_argument("--aes-mode", choices=["CBC", "CTR"], default="CBC")
+    parser_anonymise.add_argument("--encrypt-workers", type=int, default=1, help="AES / Selective: regions encrypted in parallel")
+    parser_anonymise.add_argument("--encrypt-executor", choices=["thread", "process"], default="thread")
+    parser_anonymise.add_argument("--fsync", action="store_true", help="Sync the frame data and keys to the disk chunk by chunk")
+    parser_anonymise.add_argument("--fast-blur", action="store_true", help="Gaussian method: fast blur scaled to the box size")
+    parser_anonymise.add_argument("--inference-size", type=int, default=None, help="Detect on frames downscaled to this longest side (pixels)")
+    parser_anonymise.add_argument("--regions", default=None, help="JSON file of the polygons to detect in / to exclude, and tile size (see Regions.py)")
+    parser_anonymise.add_argument("--static-threshold", type=float, default=None,
+                                  help="Skip detection on frames changed on less than this share of their area (e.g. 0.002), "
+                                       "not with --stride or --batch-size")
+    parser_anonymise.add_argument("--max-gap", type=int, default=30, help="Static frames in a row before a detection is forced")
+    parser_anonymise.add_argument("--live", action="store_true",
+                                  help="Inputs are live sources: URLs, named pipes, camera indices, or files replayed at their frame rate "
+                                       "(sequential detection only)")
+    parser_anonymise.add_argument("--max-latency", type=float, default=0.5,
+                                  help="Live: seconds from arrival to output, older frames are dropped (0: never drop)")
+    parser_anonymise.add_argument("--max-frames", type=int, default=None, help="Live: stop after this many frames received")
+    parser_anonymise.add_argument("--duration", type=float, default=None, help="Live: stop after this many seconds")
+    parser_anonymise.add_argument("--face", action="store_true", help="Detect faces only")
+    parser_anonymise.add_argument("--workers", type=int, default=1, help="Worker processes, one model each")
+    parser_anonymise.add_argument("--batch-size", type=int, default=1)
+    parser_anonymise.add_argument("--stride", type=int, default=1)
+    parser_anonymise.add_argument("--threaded", action="store_true", help="Run each job as a staged pipeline")
+    parser_anonymise.add_argument("--segment-workers", type=int, default=1, help="Split each video in time segments processed by N processes (with --workers 1)")
+    parser_anonymise.add_argument("--segment-overlap", type=int, default=30, help="Frames tracked twice to join the IDs of consecutive segments")
+    parser_anonymise.add_argument("--checkpoint-every", type=int, default=None, help="Write the output in segments of N frames, with a checkpoint after each")
+    parser_anonymise.add_argument("--resume", action="store_true", help="Carry on from the last checkpoint of an interrupted run")
+    parser_anonymise.add_argument("--summary", default=None, help="JSON summary path (default: OUTPUT_DIR/summary.json)")
+    add_encoder_arguments(parser_anonymise)
+    add_trace_arguments(parser_anonymise, {"action": "store_true", "help": "Trace the stages: OUTPUT_DIR/NAME_trace.json (Chrome / Perfetto) and a summary"})
+    parser_anonymise.set_defaults(run=anonymise)
+
+    parser_decrypt = commands.add_parser("decrypt", help="Decrypt the AES / Selective regions of a video")
+    parser_decrypt.add_argument("video")
+    parser_decrypt.add_argument("frame_data")
+    parser_decrypt.add_argument("output")
+    parser_decrypt.add_argument("--ids", type=int, nargs="+", default=None, help="Track IDs to decrypt (default: all)")
+    parser_decrypt.add_argument("--start-frame", type=int, default=None)
+    parser_decrypt.add_argument("--end-frame", type=int, default=None)
+    parser_decrypt.add_argument("--start-time", type=float, default=None, help="Seconds")
+    parser_decrypt.add_argument("--end-time", type=float, default=None, help="Seconds")
+    parser_decrypt.add_argument("--workers", type=int, default=1, help="Boxes decrypted in parallel")
+    parser_decrypt.add_argument("--executor", choices=["thread", "process"], default="thread",
+                                help="Pool of the box workers (segment workers always use threads)")
+    parser_decrypt.add_argument("--segment-workers", type=int, default=1, help="Split the video in time segments decrypted by N processes")
+    add_encoder_arguments(parser_decrypt)
+    add_trace_arguments(parser_decrypt, {"default": None, "help": "Chrome / Perfetto trace of the stages, written to this path"})
+    parser_decrypt.set_defaults(run=decrypt)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,63 @@
-import cv2
-import json
-from Crypto.Cipher import AES
-import numpy as np
+import multiprocessing
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import AESCipher
 from VideoReader import VideoReader
+from FrameData import FrameDataReader
+from VideoSegments import segment_paths, concat_videos
+from Encoder import open_encoder
+from Trace import tracer, span
+
+
+def decrypt_region(bbox, mode="CBC", is_selective=True):
+    """
+    Decrypted pixels of one box of a frame data record (runs on the worker pool).
+    """
+    encrypted_region = bbox["region"]
+    if is_selective:
+        return AESCipher.selective_decrypt(encrypted_region, bbox["key"], bbox["iv"], encrypted_region.shape, bbox["encrypted_msb"], mode)
+    return AESCipher.aes_decrypt(encrypted_region, bbox["key"], bbox["iv"], encrypted_region.shape, mode)
+
+
+def decrypt_segment(job):
+    """
+    Decrypt the frames [start, end) of a video into a segment file, in a worker process.
+    Its boxes are decrypted on threads: a pool process can't start processes of its own.
+    """
+    decrypt = Decrypt(job["video_path"], job["output_path"], job["frame_path"], job["decrypt_ids"], True,
+                      job["buffer_size"], job["workers"], "thread", job["encoder"])
+    decrypt.process(start_frame=job["start"], end_frame=job["end"])
+    return job["index"]
+
 
 class Decrypt:
-    def __init__(self, video_path, output_path, frame_path, decrypt_ids=None, allIdSelected=False):
+    def __init__(self, video_path, output_path, frame_path, decrypt_ids=None, allIdSelected=False, buffer_size=8,
+                 workers=1, executor="thread", encoder=None):
         self.video_path = video_path
         self.output_path = output_path
+        self.frame_path = frame_path
         self.frame_data = self.load_frame_data(frame_path)
         self.decrypt_ids = decrypt_ids
         self.allIdSelected = allIdSelected
+        self.buffer_size = buffer_size # Frames read ahead of the decryption, and frames in flight on the pool
+        # Boxes decrypted in parallel: "thread" (pycryptodome releases the GIL) or "process"
+        self.workers = workers
+        self.executor = executor
+        self.pool = None
+        self.encoder = encoder or {} # output video encoder options (see Encoder.py)
+        self.frames_written = 0
+        self.fps = 0.0
 
     def load_frame_data(self, file_path):
         """
-        Load frame metadata from a JSON file.
+        Load frame metadata from a frame data file.
         """
-        with open(file_path, "r") as f:
-            frame_data = [json.loads(line) for line in f]
-        return frame_data
+        return FrameDataReader(file_path) # Only the frame index is loaded
 
     def process_frame(self, frame, frame_data, decrypt_ids=None):
         """
@@ -28,108 +67,190 @@ class Decrypt:
         for bbox in frame_data.get("bboxes", []):
             if decrypt_ids is None or bbox["id"] in decrypt_ids:
                 x1, y1, x2, y2 = bbox["coords"]
-                key = bytes.fromhex(bbox["key"])
-                iv = bytes.fromhex(bbox["iv"])
+                frame[y1:y2, x1:x2] = decrypt_region(bbox, frame_data.get("mode", "CBC"), frame_data.get("isSelective", True))
+        return frame
 
-                encrypted_region = np.array(bbox["region"], dtype=np.uint8)
+    def submit_frame(self, pool, frame_data, decrypt_ids=None):
+        """
+        Start decrypting the boxes of a frame on the pool, returns [(coords, future)].
+        """
+        mode = frame_data.get("mode", "CBC")
+        is_selective = frame_data.get("isSelective", True)
+        return [(bbox["coords"], pool.submit(decrypt_region, bbox, mode, is_selective))
+                for bbox in frame_data.get("bboxes", []) if decrypt_ids is None or bbox["id"] in decrypt_ids]
 
-                if frame_data.get("isSelective", True):
-                    encrypted_msb = np.array(bbox["encrypted_msb"], dtype=np.uint8)
-                    decrypted_region = self.selective_decrypt(encrypted_region, key, iv, encrypted_region.shape, encrypted_msb)
-                else:
-                    decrypted_region = self.aes_decrypt(encrypted_region, key, iv, encrypted_region.shape)
-                frame[y1:y2, x1:x2] = decrypted_region
+    @staticmethod
+    def finish_frame(frame, regions):
+        """
+        Write the decrypted boxes of a frame back, in record order (the last box wins on overlap, as in process_frame).
+        """
+        with span("decrypt"): # waiting for the pool
+            for (x1, y1, x2, y2), future in regions:
+                frame[y1:y2, x1:x2] = future.result()
         return frame
 
-    def process(self):
+    def get_pool(self):
+        """
+        Pool shared by the frames in flight, None with a single worker.
+        """
+        if self.workers <= 1:
+            return None
+        if self.pool is None:
+            if self.executor == "process":
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix="decrypt")
+        return self.pool
+
+    def close_pool(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def frame_range(self, video_reader, start_frame=None, end_frame=None, start_time=None, end_time=None):
+        """
+        Frames to decrypt, as [start, end). Times are in seconds and override frame numbers.
+        """
+        if start_time is not None:
+            start_frame = int(round(start_time * video_reader.fps))
+        if end_time is not None:
+            end_frame = int(round(end_time * video_reader.fps))
+        start_frame = max(0, start_frame or 0)
+        end_frame = video_reader.frame_count if end_frame is None else min(end_frame, video_reader.frame_count)
+        return start_frame, end_frame
+
+    def read_frames(self, video_reader, start_frame, end_frame, buffer, stop):
+        """
+        Producer: decode frames and read their metadata together, in order.
+        Both files are read forward only, one frame / record at a time.
+        """
+        try:
+            records = self.frame_data.iter_range(start_frame, end_frame)
+            record = next(records, None)
+            for frame_index in range(start_frame, end_frame):
+                tracer.frame(frame_index)
+                with span("decode"):
+                    success, frame = video_reader.read()
+                if not success or stop.is_set():
+                    break
+                while record is not None and record["frame_index"] < frame_index:
+                    record = next(records, None)
+                current_frame_data = record if record is not None and record["frame_index"] == frame_index else None
+                buffer.put((frame_index, frame, current_frame_data))
+            buffer.put(None)
+        except Exception as e:
+            buffer.put(e)
+
+    def stream(self, video_reader, start_frame, end_frame):
+        """
+        Decrypted frames, in order. A background thread keeps at most buffer_size frames ahead,
+        so memory use doesn't depend on the length of the video. With several workers, the boxes
+        of up to buffer_size frames are decrypted on the pool at the same time.
+        """
+        buffer = queue.Queue(maxsize=self.buffer_size)
+        stop = threading.Event()
+        reader = threading.Thread(target=self.read_frames, args=(video_reader, start_frame, end_frame, buffer, stop), daemon=True)
+        reader.start()
+        pool = self.get_pool()
+        in_flight = deque() # (frame index, frame, [(coords, future)])
+        try:
+            while True:
+                item = buffer.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                frame_index, frame, current_frame_data = item
+                if pool is None:
+                    if current_frame_data:
+                        with span("decrypt"):
+                            frame = self.process_frame(frame, current_frame_data, self.decrypt_ids)
+                    yield frame_index, frame
+                    continue
+                regions = self.submit_frame(pool, current_frame_data, self.decrypt_ids) if current_frame_data else []
+                in_flight.append((frame_index, frame, regions))
+                if len(in_flight) > self.buffer_size:
+                    frame_index, frame, regions = in_flight.popleft()
+                    yield frame_index, self.finish_frame(frame, regions)
+            while in_flight:
+                frame_index, frame, regions = in_flight.popleft()
+                yield frame_index, self.finish_frame(frame, regions)
+        finally:
+            # Unblock the reader if the consumer stopped early
+            stop.set()
+            while reader.is_alive():
+                try:
+                    buffer.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            reader.join()
+
+    def process(self, start_frame=None, end_frame=None, start_time=None, end_time=None, segment_workers=1):
         """
         Decrypt encrypted regions in the video for multiple IDs.
+        Only the frames in [start, end) are decrypted and written when a range or a time window is given.
+        With segment_workers > 1 the range is split in that many segments, each decrypted by its
+        own process (with its own pool of workers), then joined (see VideoSegments.py).
         """
+        run_start = time.time()
         video_reader = VideoReader(self.video_path)
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        start_frame, end_frame = self.frame_range(video_reader, start_frame, end_frame, start_time, end_time)
         if self.decrypt_ids is None or self.allIdSelected:
             output_file = self.output_path
         else:
             output_file = f"{self.output_path.rsplit('.', 1)[0]}_ids_{'_'.join(map(str, self.decrypt_ids))}.mp4"
-        out = cv2.VideoWriter(output_file, fourcc, video_reader.fps, (video_reader.width, video_reader.height))
 
-        for frame_index in range(video_reader.frame_count):
-            success, frame = video_reader.read()
-            print(f"\rProcessing frame {frame_index}/{video_reader.frame_count}", end="")
-            if not success:
-                break
+        if segment_workers > 1:
+            video_reader.release()
+            self.process_segments(output_file, start_frame, end_frame, segment_workers)
+        else:
+            if start_frame > 0:
+                video_reader.seek(start_frame)
+            out = open_encoder(output_file, video_reader.fps, (video_reader.width, video_reader.height), **self.encoder)
 
-            # Get metadata for the current frame
-            current_frame_data = next((fd for fd in self.frame_data if fd["frame_index"] == frame_index), None)
-            if current_frame_data:
-                frame = self.process_frame(frame, current_frame_data, self.decrypt_ids)
+            self.frames_written = 0
+            for frame_index, frame in self.stream(video_reader, start_frame, end_frame):
+                print(f"\rProcessing frame {frame_index}/{video_reader.frame_count}", end="")
+                with span("encode"):
+                    out.write(frame)
+                self.frames_written += 1
 
-            out.write(frame)
+            video_reader.release()
+            out.release()
+            self.close_pool()
+            tracer.stop_profile()
+        self.frame_data.close()
+        self.fps = self.frames_written / max(time.time() - run_start, 1e-9)
 
-        video_reader.release()
-        out.release()
+    def process_segments(self, output_file, start_frame, end_frame, segment_workers):
+        """
+        Decrypt [start_frame, end_frame) in segment_workers processes, one segment each.
+        """
+        from ParallelSegments import split_segments # torch stays out of the worker processes
+        directory = output_file + ".segments"
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        segments = [(start_frame + start, start_frame + end) for start, end in split_segments(end_frame - start_frame, segment_workers)]
+        jobs = [{"index": k, "video_path": self.video_path, "frame_path": self.frame_path, "decrypt_ids": self.decrypt_ids,
+                 "output_path": segment_paths(directory, k)[0], "start": start, "end": end,
+                 "buffer_size": self.buffer_size, "workers": self.workers, "encoder": self.encoder}
+                for k, (start, end) in enumerate(segments)]
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(segment_workers) as pool:
+            for done, _ in enumerate(pool.imap_unordered(decrypt_segment, jobs), 1):
+                print(f"\rDecrypted segments: {done}/{len(jobs)}", end="")
+        concat_videos([job["output_path"] for job in jobs], output_file)
+        shutil.rmtree(directory)
+        self.frames_written = end_frame - start_frame
     
-    def aes_decrypt(self, encrypted_region, key, iv, original_shape):
+    def aes_decrypt(self, encrypted_region, key, iv, original_shape, mode="CBC"):
         """
-        AES decryption.
+        AES decryption (see AESCipher.py).
         """
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-
-        # Convert encrypted region to bytes
-        encrypted_bytes = encrypted_region.tobytes()
-
-        # Block size for AES decryption
-        block_size = 16
-        num_blocks = len(encrypted_bytes) // block_size  
-
-        
-        decrypted_bytes = b'' # Store the decrypted data
-
-        for i in range(num_blocks):
-            block = encrypted_bytes[i * block_size:(i + 1) * block_size]
-            decrypted_block = cipher.decrypt(block)
-            decrypted_bytes += decrypted_block
-
-        # Get the remaining data
-        remaining_data = encrypted_bytes[num_blocks * block_size:]
-
-        # Concatenate the remaining data to the decrypted data
-        decrypted_bytes += remaining_data
-
-        # Convert the decrypted bytes to a numpy array
-        decrypted_region = np.frombuffer(decrypted_bytes, dtype=np.uint8)
+        return AESCipher.aes_decrypt(encrypted_region, key, iv, original_shape, mode)
 
-        # Reshape the decrypted data to the original shape
-        decrypted_region = decrypted_region.reshape(original_shape)
-
-        return decrypted_region
-
-    def selective_decrypt(self, encrypted_region, key, iv, original_shape, encrypted_msb):
+    def selective_decrypt(self, encrypted_region, key, iv, original_shape, encrypted_msb, mode="CBC"):
         """
-        Déchiffrement sélectif des 6 bits LSB d'une région.
+        Déchiffrement sélectif des 6 bits LSB d'une région (see AESCipher.py).
         """
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-
-        flat_region = encrypted_region.flatten()
-
-        # Extract the 6 LSBs
-        encrypted_lsb = flat_region & 0x3F  # Mask
-        encrypted_lsb |= encrypted_msb  # Set the 2 MSBs
-
-        # Pad the LSBs
-        padding_length = (16 - len(encrypted_lsb) % 16) % 16
-        padded_encrypted_lsb = np.pad(encrypted_lsb, (0, padding_length), mode='constant', constant_values=0)
-
-        # Decrypt the padded LSBs
-        decrypted_lsb_bytes = cipher.decrypt(padded_encrypted_lsb.tobytes())
-
-        decrypted_lsb = np.frombuffer(decrypted_lsb_bytes, dtype=np.uint8)[:len(encrypted_lsb)]
-
-        # Replace the 6 LSBs with the decrypted LSBs
-        flat_region &= 0xC0
-        flat_region |= decrypted_lsb & 0x3F  # Set the new 6 LSBs
-
-        decrypted_region = flat_region.reshape(original_shape)
-
-        return decrypted_region
-
+        return AESCipher.selective_decrypt(encrypted_region, key, iv, original_shape, encrypted_msb, mode)
@@ -1,147 +1,607 @@
-from ultralytics import YOLO
 import cv2
 import torch
-from Crypto.Cipher import AES
+from ultralytics.engine.results import Results
 from Crypto.Random import get_random_bytes
 import numpy as np
-import json
 import os
+import pickle
+import shutil
+import time
+import threading
+from itertools import islice, count as count_from
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import AESCipher
+from FrameData import FrameDataWriter, KeyWriter, concat_frame_data
+from Tracking import BatchTracker, MotionPredictor, frame_signature, scene_change, reset_trackers, track_count, set_track_count, \
+    downscale, rescale_result, changed_area, unconfirmed_tracks
+from Pipeline import Pipeline, Stage
+from ModelRegistry import get_model
+from VideoSegments import segment_paths, concat_videos
+from Encoder import open_encoder
+from Trace import tracer, span, count
+from ParallelSegments import process_parallel
 
 class Detection:
-    def __init__(self, video, output_path, censored=False, censored_method=None, detect_face=False, callback=None):
-        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        model_path = "Models/yolov11n-face.pt" if detect_face else "Models/yolo11n.pt"
-        self.model = YOLO(model_path).to(device)
+    def __init__(self, video, output_path, censored=False, censored_method=None, detect_face=False, callback=None, aes_mode="CBC",
+                 model=None, frame_data_path="frame_data.bin", keys_path="aes_keys.txt", fast_blur=False, blur_strength=0.1,
+                 encrypt_workers=1, encrypt_executor="thread", metadata_fsync=False, inference_size=None,
+                 regions=None, static_threshold=None, max_gap=30, encoder=None):
+        self.detect_face = detect_face
+        self._model = model
+        if model is not None:
+            reset_trackers(model) # the model may have tracked another video: start from fresh tracks
         
         print("GPU : " + str(torch.cuda.is_available()))
         
         self.video = video
         self.output_path = output_path
+        self.frame_data_path = frame_data_path
+        self.keys_path = keys_path
 
         self.callback = callback
         self.censored = censored
         self.censored_method = censored_method
-        
-        if self.censored_method == 'AES' or self.censored_method == 'Selective':
-            if os.path.exists("aes_keys.txt"):
-                os.remove("aes_keys.txt")
-            if os.path.exists("frame_data.json"):
-                os.remove("frame_data.json")
-            
+        # Gaussian method: fast blur scaled to the box size instead of the fixed 85x85 kernel
+        self.fast_blur = fast_blur
+        self.blur_strength = blur_strength # sigma of the fast blur, as a fraction of the box smaller side
 
         # AES dictionary
         self.aes_keys = {}
+        self.aes_mode = aes_mode # CBC (default format) or CTR, stored in the frame data
+        # Region encryption pool ("thread" or "process"), created on first use
+        self.encrypt_workers = encrypt_workers
+        self.encrypt_executor = encrypt_executor
+        self.encrypt_pool = None
+        self.encrypt_pool_lock = threading.Lock()
+        # Encrypted regions metadata and key table, files kept open and written in chunks (see FrameData.py)
+        self.frame_data_writer = None
+        self.key_writer = None
+        self.metadata_fsync = metadata_fsync # sync every chunk: a crash loses at most one chunk
+        # Longest side of the frames given to the detector (None: native resolution),
+        # boxes are mapped back to the native frame
+        self.inference_size = inference_size
+        # Areas the detector runs on, crops or tiles of the frame (see Regions.py), None: whole frame
+        self.regions = regions
+        # Output video encoder options (see Encoder.py), default: OpenCV with mp4v
+        self.encoder = encoder or {}
+        # Static gate: frames that changed on less than static_threshold of their area since the
+        # last detection reuse its boxes, at most max_gap frames in a row (None: detect every frame)
+        self.static_threshold = static_threshold
+        self.max_gap = max_gap
+        # Tracker used when detection runs outside of model.track (see Tracking.py)
+        self.tracker = None
+        self.pipeline = None
+        self.fps = None
+        # Statistics of the last run
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.box_count = 0
+        self.wall_time = None
+        self.latency = None # live sources: latency percentiles and drop rate (see VideoReader.LiveReader)
     
-    def process(self):
-        # fourcc = cv2.VideoWriter_fourcc(*'FFV1')  # FFV1 is a lossless codec
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(self.output_path, fourcc, self.video.fps, (self.video.width, self.video.height))
+    @property
+    def model(self):
+        """
+        Loaded on first use, once per process and shared between jobs (see ModelRegistry.py).
+        """
+        if self._model is None:
+            self._model = get_model(self.model_path(self.detect_face))
+            reset_trackers(self._model)
+        return self._model
+
+    @staticmethod
+    def model_path(detect_face=False):
+        return "Models/yolov11n-face.pt" if detect_face else "Models/yolo11n.pt"
 
-        for i in range(self.video.frame_count):
-            success, frame = self.video.read()
+    def reset_metadata(self):
+        """
+        Remove the keys and frame data of a previous run (AES / Selective).
+        """
+        if self.censored_method == 'AES' or self.censored_method == 'Selective':
+            if os.path.exists(self.keys_path):
+                os.remove(self.keys_path)
+            if os.path.exists(self.frame_data_path):
+                os.remove(self.frame_data_path)
+
+    def read_frames(self, start=0):
+        """
+        Decode the video frame by frame, from frame start (the video must be positioned there).
+        Live sources (frame_count None) are read until they end.
+        """
+        indices = count_from(start) if self.video.frame_count is None else range(start, self.video.frame_count)
+        for i in indices:
+            tracer.frame(i)
+            with span("decode"):
+                success, frame = self.video.read()
             if not success:
                 break
-            
-            results = self.model.track(frame, classes=0, verbose=False, show=False, persist=True, tracker="bytetrack.yaml")
+            yield frame
+
+    def inference_options(self):
+        """
+        Network input size matching inference_size (a multiple of 32), otherwise the model
+        letterboxes the small frames back to its default 640.
+        """
+        if self.inference_size is None:
+            return {}
+        return {"imgsz": max(32, -(-self.inference_size // 32) * 32)}
+
+    def track_frame(self, frame):
+        """
+        model.track on one frame, downscaled to inference_size if set. Boxes are in frame coordinates.
+        With regions, detection runs on the crops of the frame and BatchTracker associates the boxes.
+        """
+        if self.regions is not None:
+            if self.tracker is None:
+                self.tracker = BatchTracker("bytetrack.yaml")
+            with span("inference"):
+                result = self.regions.detect(self.model, frame, self.inference_size, classes=0, conf=0.1, verbose=False,
+                                             **self.inference_options())
+            with span("tracking"):
+                return [self.tracker.update(result)]
+        small, scale = downscale(frame, self.inference_size)
+        with span("inference"): # model.track: detection and ByteTrack
+            results = self.model.track(small, classes=0, verbose=False, show=False, persist=True, tracker="bytetrack.yaml", **self.inference_options())
+        if small is not frame:
+            results = [rescale_result(results[0], frame, scale)]
+        return results
+
+    def track_frames(self, frames):
+        """
+        Track frames one by one, yield (frame, results).
+        """
+        for frame in frames:
+            yield frame, self.track_frame(frame)
+
+    def track_batches(self, frames, batch_size):
+        """
+        Take batch_size frames, detect on the whole batch, then associate the detections
+        frame by frame in order, so track IDs are the same as with track_frames.
+        """
+        if self.tracker is None:
+            self.tracker = BatchTracker("bytetrack.yaml")
+        frames = iter(frames)
+        while True:
+            batch = [frame for _, frame in zip(range(batch_size), frames)]
+            if not batch:
+                break
 
-            if self.censored:
-                self.blur(frame, results, i)
+            smalls = [downscale(frame, self.inference_size) for frame in batch]
+            # conf=0.1 as in model.track, the tracker needs the low confidence detections
+            with span("inference", frames=len(batch)):
+                batch_results = self.model.predict([small for small, _ in smalls], classes=0, conf=0.1, verbose=False, batch=len(batch),
+                                                   **self.inference_options())
+            for frame, (small, scale), result in zip(batch, smalls, batch_results):
+                with span("tracking"):
+                    result = self.tracker.update(result)
+                if small is not frame:
+                    result = rescale_result(result, frame, scale)
+                yield frame, [result]
+
+    def track_strided(self, frames, stride, adaptive_stride=False, scene_threshold=0.03, margin=0.1):
+        """
+        Detect every stride frames only (or sooner with adaptive_stride, when the scene changed
+        by more than scene_threshold since the last detection). In between, boxes are predicted
+        from the motion of each track and enlarged by margin, so every frame is still anonymised.
+        A person first seen on a detection frame is only confirmed (and given to the predictor)
+        by the next detection, so the next frame is detected too.
+        """
+        predictor = MotionPredictor(margin)
+        last_detection = -stride
+        reference = None
+        unconfirmed = False
+        for i, frame in enumerate(frames):
+            detect = unconfirmed or i - last_detection >= stride
+            if not detect and adaptive_stride:
+                detect = scene_change(reference, frame_signature(frame)) > scene_threshold
+            if detect:
+                results = self.track_frame(frame)
+                predictor.update(results[0], i)
+                last_detection = i
+                unconfirmed = unconfirmed_tracks(self._model, self.tracker) > 0
+                if adaptive_stride:
+                    reference = frame_signature(frame)
+            else:
+                results = [predictor.predict(frame, i, self.model.names)]
+            yield frame, results
+
+    def track_gated(self, frames, batch_tracker=False):
+        """
+        Detect only when the frame changed since the last detection (see changed_area), or
+        after max_gap frames without detection. Other frames get the boxes of the last detection,
+        an empty detection certifies the frame as empty.
+        """
+        if batch_tracker:
+            detect = lambda frame: next(self.track_batches([frame], 1))[1]
+        else:
+            detect = self.track_frame
+        reference, last, gap = None, None, 0
+        for frame in frames:
+            with span("gate"):
+                signature = frame_signature(frame)
+                static = last is not None and gap < self.max_gap and changed_area(reference, signature) <= self.static_threshold
+            if static:
+                results = [Results(frame, path=last.path, names=last.names, boxes=last.boxes.data)]
+                self.frames_skipped += 1
+                gap += 1
+            else:
+                results = detect(frame)
+                reference, last, gap = signature, results[0], 0
+            yield frame, results
+
+    def track(self, frames, batch_size=1, stride=1, batch_tracker=False, **stride_options):
+        """
+        Tracked frames, with the detection mode given by the options. batch_tracker=True
+        uses BatchTracker even for single frames (its state can be saved, see process_segments).
+        With regions, frames are detected one by one, each on a batch of its crops.
+        With static_threshold, frames are detected one by one behind the static gate (see track_gated),
+        without stride or batches.
+        """
+        if self.static_threshold is not None and (stride > 1 or batch_size > 1):
+            raise ValueError("The static gate detects frames one by one (stride=1, batch_size=1)")
+        if stride > 1:
+            tracked_frames = self.track_strided(frames, stride, **stride_options)
+        elif self.static_threshold is not None:
+            tracked_frames = self.track_gated(frames, batch_tracker)
+        elif self.regions is not None:
+            tracked_frames = self.track_frames(frames)
+        elif batch_size > 1 or batch_tracker:
+            tracked_frames = self.track_batches(frames, batch_size)
+        else:
+            tracked_frames = self.track_frames(frames)
+        return self.count_boxes(tracked_frames)
+
+    def count_boxes(self, tracked_frames):
+        """
+        Pass the tracked frames through, counting frames and boxes.
+        """
+        for frame, results in tracked_frames:
+            self.frames_processed += 1
+            self.box_count += len(results[0].boxes)
+            count("boxes", len(results[0].boxes))
+            yield frame, results
+
+    def anonymise(self, frame, results, frame_index):
+        """
+        Anonymise and draw one frame, return (output frame, frame data record or None).
+        """
+        frame_data = None
+        if self.censored:
+            with span(f"anonymise/{self.censored_method}"):
+                frame_data = self.blur(frame, results, frame_index)
+        if len(results[0].boxes) == 0:
+            return frame, frame_data # nothing to draw
+        with span("plot"):
+            return results[0].plot(), frame_data
+
+    def open_encoder(self, path):
+        """
+        Encoder for a video with the size and frame rate of the input (see Encoder.py).
+        """
+        return open_encoder(path, self.video.fps, (self.video.width, self.video.height), **self.encoder)
 
-            out.write(results[0].plot())  # write the frame to the output video
-            
-            # progress bar
-            progress = (i + 1) / self.video.frame_count
+    def write_frame(self, out, frame_index, output_frame, frame_data):
+        """
+        Write one anonymised frame and its metadata, report the progress. Frames must come in order.
+        """
+        with span("encode"):
+            out.write(output_frame)  # write the frame to the output video
+        if frame_data is not None:
+            with span("metadata"):
+                self.write_frame_data(frame_data)
+
+        # progress bar
+        if self.video.live:
+            self.video.frame_written() # end-to-end latency of the frame
+            progress = 0.0
+            print(f'\rFrames: {frame_index + 1}', end='')
+        else:
+            progress = (frame_index + 1) / self.video.frame_count
             print(f'\rProgress: {progress:.2%}', end='')
-            
-            if self.callback:
-                self.callback(progress, i, results[0].plot())
+        
+        if self.callback:
+            self.callback(progress, frame_index, output_frame)
+
+    def process(self, batch_size=1, threaded=False, anonymise_workers=2, queue_size=8, stride=1,
+                checkpoint_every=None, resume=False, segment_workers=1, segment_overlap=30, prefetch=16, **stride_options):
+        """
+        Detect, track and anonymise the video. With batch_size > 1 the detector runs on
+        batches of frames (see track_batches). With threaded=True decoding, inference,
+        anonymisation (anonymise_workers threads) and encoding run as a pipeline (see Pipeline.py).
+        With stride > 1 the detector only runs every stride frames (see track_strided, which
+        takes the stride_options: adaptive_stride, scene_threshold, margin).
+        With checkpoint_every=N the output is written in segments of N frames followed by a
+        checkpoint, and resume=True carries on an interrupted run (see process_segments).
+        With segment_workers > 1 the video is split in time segments processed by that many
+        processes, overlapping by segment_overlap frames (see ParallelSegments.py).
+        Without pipeline, up to prefetch frames are decoded ahead by the VideoReader.
+        Live sources (see VideoReader.LiveReader) run until the stream ends or Ctrl+C
+        (sequential detection), then report their latency.
+        """
+        if checkpoint_every and (threaded or stride > 1):
+            raise ValueError("Checkpoints need the sequential detection (threaded=False, stride=1)")
+        if self.video.live and (threaded or checkpoint_every or segment_workers > 1):
+            # the pipeline queues would hold frames outside of the latency bound
+            raise ValueError("Live sources run the sequential detection (threaded=False, no checkpoints or segments)")
+        if segment_workers > 1:
+            if threaded or stride > 1 or checkpoint_every:
+                raise ValueError("Segment workers run the sequential detection (threaded=False, stride=1, no checkpoints)")
+            return process_parallel(self, segment_workers, segment_overlap, batch_size)
+        start_time = time.time()
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.box_count = 0
+        if prefetch and not threaded: # the pipeline has its own decode thread
+            self.video.start_prefetch(prefetch)
+
+        if checkpoint_every:
+            self.process_segments(batch_size, checkpoint_every, resume)
+        else:
+            self.reset_metadata()
+            out = self.open_encoder(self.output_path)
+            if threaded:
+                self.pipeline = self.build_pipeline(out, batch_size, anonymise_workers, queue_size, stride, **stride_options)
+                self.pipeline.run()
+            else:
+                try:
+                    for i, (frame, results) in enumerate(self.track(self.read_frames(), batch_size, stride, **stride_options)):
+                        output_frame, frame_data = self.anonymise(frame, results, i)
+                        self.write_frame(out, i, output_frame, frame_data)
+                except KeyboardInterrupt:
+                    if not self.video.live:
+                        raise
+                    print("\nStream stopped") # the output written so far is kept
+            out.release()
         
         self.video.release()
-        out.release()
-        print(f"\nProcessing complete. Video saved to {self.output_path}")
+        self.close_frame_data()
+        self.close_encrypt_pool()
+        tracer.stop_profile()
+        self.wall_time = time.time() - start_time
+        self.fps = self.frames_processed / max(self.wall_time, 1e-9)
+        print(f"\nProcessing complete ({self.fps:.1f} fps). Video saved to {self.output_path}")
+        if self.static_threshold is not None:
+            print(f"Static frames: {self.frames_skipped}/{self.frames_processed} without detection")
+        if threaded:
+            self.pipeline.report()
+        if self.video.live:
+            self.latency = self.video.latency_stats()
+            self.video.print_latency()
+
+    def process_segments(self, batch_size, segment_length, resume=False):
+        """
+        Write the output video and frame data in segments of segment_length frames, in
+        output_path.segments/. After each segment, a checkpoint records the next frame, the
+        tracker state and the key table: a run restarted with resume=True loads it, seeks the
+        video to the end of the last complete segment and goes on (the work of the incomplete
+        segment is redone). Segments are joined at the end (see VideoSegments.py).
+        """
+        directory = self.output_path + ".segments"
+        checkpoint_path = os.path.join(directory, "checkpoint.pkl")
+        checkpoint = self.load_checkpoint(checkpoint_path) if resume else None
+        if checkpoint is None:
+            shutil.rmtree(directory, ignore_errors=True)
+            os.makedirs(directory)
+            self.reset_metadata()
+            self.tracker = BatchTracker("bytetrack.yaml")
+            set_track_count(0)
+            segment, frame_index = 0, 0
+        else:
+            segment, frame_index = checkpoint["segment"], checkpoint["next_frame"]
+            self.tracker = checkpoint["tracker"]
+            set_track_count(checkpoint["track_count"])
+            self.aes_keys = checkpoint["aes_keys"]
+            # Keys written after the checkpoint belong to tracks that will be created again
+            if os.path.exists(self.keys_path):
+                os.remove(self.keys_path)
+            for track_id, key in self.aes_keys.items():
+                self.write_key(track_id, key)
+            self.video.seek(frame_index)
+            print(f"Resuming from frame {frame_index} (segment {segment})")
+
+        frames = self.read_frames(frame_index)
+        while True:
+            video_path, frame_data_path = segment_paths(directory, segment)
+            out = self.open_encoder(video_path)
+            self.frame_data_writer = FrameDataWriter(frame_data_path, fsync=self.metadata_fsync)
+            written = 0
+            for frame, results in self.track(islice(frames, segment_length), batch_size, batch_tracker=True):
+                output_frame, frame_data = self.anonymise(frame, results, frame_index)
+                self.write_frame(out, frame_index, output_frame, frame_data)
+                frame_index += 1
+                written += 1
+            out.release()
+            self.close_frame_data()
+            if written == 0:
+                os.remove(video_path)
+                os.remove(frame_data_path)
+                break
+            segment += 1
+            self.save_checkpoint(checkpoint_path, segment, frame_index, [video_path, frame_data_path])
+            if written < segment_length:
+                break
+
+        if segment > 0:
+            concat_videos([segment_paths(directory, i)[0] for i in range(segment)], self.output_path)
+            if self.censored_method == 'AES' or self.censored_method == 'Selective':
+                concat_frame_data([segment_paths(directory, i)[1] for i in range(segment)], self.frame_data_path)
+        shutil.rmtree(directory)
+
+    def save_checkpoint(self, path, segment, next_frame, segment_files):
+        """
+        Sync the files of the segment, then replace the checkpoint atomically.
+        """
+        for segment_file in segment_files:
+            with open(segment_file, "rb") as f:
+                os.fsync(f.fileno())
+        checkpoint = {
+            "segment": segment,
+            "next_frame": next_frame,
+            "tracker": self.tracker,
+            "track_count": track_count(),
+            "aes_keys": dict(self.aes_keys),
+        }
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def load_checkpoint(self, path):
+        if not os.path.exists(path):
+            print("No checkpoint found, starting from the first frame")
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def build_pipeline(self, out, batch_size=1, anonymise_workers=2, queue_size=8, stride=1, **stride_options):
+        """
+        decode -> inference (in order) -> anonymise (worker pool) -> encode (in order)
+        """
+        def inference(frames):
+            for i, (frame, results) in enumerate(self.track(frames, batch_size, stride, **stride_options)):
+                if self.censored_method == 'AES' or self.censored_method == 'Selective':
+                    self.assign_aes_key(results) # keys are created in frame order, not by the workers
+                yield i, frame, results
+
+        def anonymise(item):
+            i, frame, results = item
+            return (i,) + self.anonymise(frame, results, i)
+
+        def encode(item):
+            self.write_frame(out, *item)
+
+        return Pipeline(self.read_frames(), [
+            Stage("inference", inference, queue_size=queue_size, stream=True),
+            Stage("anonymise", anonymise, workers=anonymise_workers, queue_size=queue_size),
+            Stage("encode", encode, queue_size=queue_size),
+        ])
         
         
     def process_image(self):
+        self.reset_metadata()
         frame = cv2.imread(self.video)
-        results = self.model.track(frame, classes=0, verbose=False, persist=True, tracker="bytetrack.yaml")
-        if self.censored:
-            self.blur(frame, results)
-        out = results[0].plot()
+        results = self.track_frame(frame)
+        out, frame_data = self.anonymise(frame, results, 0)
+        if frame_data is not None:
+            self.write_frame_data(frame_data)
         cv2.imwrite(self.output_path, out)
+        self.close_frame_data()
+        self.close_encrypt_pool()
+
+    def write_frame_data(self, frame_data):
+        if self.frame_data_writer is None:
+            self.frame_data_writer = FrameDataWriter(self.frame_data_path, fsync=self.metadata_fsync)
+        self.frame_data_writer.write(frame_data)
+        if tracer.enabled:
+            count("metadata_bytes", sum(bbox["region"].nbytes for bbox in frame_data["bboxes"]))
+
+    def write_key(self, track_id, key):
+        if self.key_writer is None:
+            self.key_writer = KeyWriter(self.keys_path, fsync=self.metadata_fsync)
+        self.key_writer.write(track_id, key)
+
+    def close_frame_data(self):
+        if self.frame_data_writer is not None:
+            self.frame_data_writer.close()
+            self.frame_data_writer = None
+        if self.key_writer is not None:
+            self.key_writer.close()
+            self.key_writer = None
         
         
     def blur(self, frame, results, frame_index):
-        frame_copy = frame.copy()
-        if self.censored_method == 'AES' or self.censored_method == 'Selective':
+        """
+        Anonymise the tracked boxes in place, return the frame data record (AES / Selective).
+        Regions are views of the frame: every box is computed from the original pixels before
+        any is written back, so overlapping boxes don't depend on each other. Where boxes
+        overlap, the box coming last in the results wins.
+        """
+        encrypted = self.censored_method == 'AES' or self.censored_method == 'Selective'
+        if encrypted:
             self.assign_aes_key(results) # Generate AES keys for all track IDs
-            # JSON file to store the AES keys
             frame_data = {
                 "frame_index": frame_index,
                 "isSelective": self.censored_method == 'Selective',
+                "mode": self.aes_mode,
                 "bboxes": []
             }
         line_width = 2
-        
+        height, width = frame.shape[:2]
+
+        boxes_to_blur = []
         for result in results:
-            for box in result.boxes:
-                frame_temp = frame_copy.copy()
-                track_id = int(box.id.item())
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
+            boxes = result.boxes
+            if boxes.id is None:
+                continue # untracked boxes
+            for track_id, xyxy in zip(boxes.id.int().tolist(), boxes.xyxy.int().tolist()):
+                x1, y1, x2, y2 = xyxy
                 x1, y1, x2, y2 = x1 + line_width, y1 + line_width, x2 - line_width, y2 - line_width
-                if x1 < 0 or y1 < 0 or x2 > frame_temp.shape[1] or y2 > frame_temp.shape[0]:
+                if x1 < 0 or y1 < 0 or x2 > width or y2 > height:
                     continue  # Ignore regions out of bounds
-                person_region = frame_temp[y1:y2, x1:x2]
-                if person_region.size == 0 or person_region.shape[0] == 0 or person_region.shape[1] == 0:
+                if x2 <= x1 or y2 <= y1:
                     print("Invalid region detected. Skipping.")
                     continue  # Ignore empty or invalid regions
-                if self.censored_method == 'Gaussian':
-                    blurred_region = self.gaussian_blur(person_region)
-                elif self.censored_method == 'Pixelate':
-                    blurred_region = self.pixelate(person_region)
-                elif self.censored_method == 'Selective':
-                    key = self.aes_keys.get(track_id)
-                    
-                    if key is None:
-                        break
-                    blurred_region, iv, encrypted_msb = self.selective_encrypt(person_region, key)
-                    bbox_data = {
-                        "id": track_id,
-                        "coords": [x1, y1, x2, y2],
-                        "key": key.hex(),
-                        "iv": iv.hex(),
-                        "encrypted_msb": encrypted_msb.tolist(),
-                        "region": blurred_region.tolist()
-                    }
-                    frame_data["bboxes"].append(bbox_data)
-                elif self.censored_method == 'AES':
-
-                    key = self.aes_keys.get(track_id)
-                    if key == None:
-                        break
-                    blurred_region, iv = self.aes_encrypt(person_region, key)
-                    # print(f"ID {track_id}: Key: {key.hex()}, IV: {iv.hex()}")
-                    bbox_data = {
-                        "id": track_id,
-                        "coords": [x1, y1, x2, y2],
-                        "key": key.hex(),
-                        "iv": iv.hex(),
-                        "region": blurred_region.tolist()
-                    }
-                    frame_data["bboxes"].append(bbox_data)
-                                        
-                frame[y1:y2, x1:x2] = blurred_region
-            
-            if self.censored_method == 'AES' or self.censored_method == 'Selective':  
-                with open("frame_data.json", "a") as f:
-                    f.write(json.dumps(frame_data) + "\n")
+                boxes_to_blur.append((track_id, (x1, y1, x2, y2)))
+        # Views, not copies
+        person_regions = [frame[y1:y2, x1:x2] for _, (x1, y1, x2, y2) in boxes_to_blur]
+
+        if self.censored_method == 'Gaussian':
+            blurred_regions = [self.gaussian_blur(region) for region in person_regions]
+        elif self.censored_method == 'Pixelate':
+            blurred_regions = [self.pixelate(region) for region in person_regions]
+        elif encrypted:
+            keys = [self.aes_keys[track_id] for track_id, _ in boxes_to_blur]
+            encrypted_regions = self.encrypt_regions(person_regions, keys)
+            blurred_regions = []
+            for (track_id, coords), key, encrypted_region in zip(boxes_to_blur, keys, encrypted_regions):
+                bbox_data = {
+                    "id": track_id,
+                    "coords": list(coords),
+                    "key": key,
+                    "iv": encrypted_region[1],
+                    "region": encrypted_region[0]
+                }
+                if self.censored_method == 'Selective':
+                    bbox_data["encrypted_msb"] = encrypted_region[2]
+                frame_data["bboxes"].append(bbox_data)
+                blurred_regions.append(encrypted_region[0])
+        else:
+            blurred_regions = []
+
+        # Write back once every region has been read
+        for (_, (x1, y1, x2, y2)), blurred_region in zip(boxes_to_blur, blurred_regions):
+            frame[y1:y2, x1:x2] = blurred_region
+
+        if encrypted:
+            return frame_data
+        return None
 
     def gaussian_blur(self, region):
         """
         Apply Gaussian blur to a region
         """
+        if self.fast_blur:
+            return self.fast_gaussian_blur(region)
         kernel_size = (85, 85)
         return cv2.GaussianBlur(region, kernel_size, 0)
 
+    def fast_gaussian_blur(self, region, min_sigma=2.0):
+        """
+        Gaussian blur with a sigma proportional to the region size (blur_strength), so close-up
+        people are blurred as much as distant ones. The blur runs on a downscaled region, where
+        the sigma is only a couple of pixels, and the result is upscaled back.
+        """
+        region_height, region_width = region.shape[:2]
+        sigma = max(self.blur_strength * min(region_height, region_width), min_sigma)
+        scale = sigma / min_sigma
+        small_size = (max(1, round(region_width / scale)), max(1, round(region_height / scale)))
+
+        small_region = cv2.resize(region, small_size, interpolation=cv2.INTER_AREA)
+        small_region = cv2.GaussianBlur(small_region, (0, 0), min_sigma)
+        return cv2.resize(small_region, (region_width, region_height), interpolation=cv2.INTER_LINEAR)
+
     def pixelate(self, region):
         """
         Pixelate a region
@@ -171,80 +631,63 @@ class Detection:
                 if track_id not in self.aes_keys:
                     # Generate a new AES key for this track ID
                     self.aes_keys[track_id] = self.generate_aes_key()
-                    with open("aes_keys.txt", "a") as f:
-                        f.write(f"ID: {track_id}, Key: {self.aes_keys[track_id].hex()}\n")
+                    self.write_key(track_id, self.aes_keys[track_id])
 
     def generate_aes_key(self):
         return get_random_bytes(16) #AES 128 bits key
     
 
 
-    def aes_encrypt(self, region, key):
+    def aes_encrypt(self, region, key, iv=None):
         """
-        AES encryption.
+        AES encryption (see AESCipher.py).
         """
-        iv = get_random_bytes(16)  # AES 128 bits IV
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-
-        # Convert region to bytes
-        region_bytes = region.tobytes()
-
-        # Block size for AES encryption
-        block_size = 16
-        num_blocks = len(region_bytes) // block_size  
-
-        encrypted_bytes = b''  # Store the encrypted data
-
-        for i in range(num_blocks):
-            block = region_bytes[i * block_size:(i + 1) * block_size]
-            encrypted_block = cipher.encrypt(block)
-            encrypted_bytes += encrypted_block
-
-        # Get the remaining data
-        remaining_data = region_bytes[num_blocks * block_size:]
-
-        # Concatenate the remaining data to the encrypted data
-        encrypted_bytes += remaining_data
-
-        # Convert the encrypted bytes to a numpy array
-        encrypted_array = np.frombuffer(encrypted_bytes, dtype=np.uint8)
-
-        # Reshape the encrypted data to the original shape
-        encrypted_array = encrypted_array.reshape(region.shape)
-
-        return encrypted_array, iv
+        return AESCipher.aes_encrypt(region, key, self.aes_mode, iv)
     
-    def selective_encrypt(self, region, key):
+    def selective_encrypt(self, region, key, iv=None):
         """
-        Chiffrement sélectif des 6 bits LSB d'une région.
+        Chiffrement sélectif des 6 bits LSB d'une région (see AESCipher.py).
         """
-        iv = get_random_bytes(16) 
-        cipher = AES.new(key, AES.MODE_CBC, iv)
-
-        flat_region = region.flatten()
-
-        # Extract the 6 LSBs
-        lsb_bits = flat_region & 0x3F  # Mask
+        return AESCipher.selective_encrypt(region, key, self.aes_mode, iv)
 
-        # Pad the LSBs
-        padding_length = (16 - len(lsb_bits) % 16) % 16
-        padded_lsb_bits = np.pad(lsb_bits, (0, padding_length), mode='constant', constant_values=0)
-
-        # Encrypt the padded LSBs
-        encrypted_lsb_bytes = cipher.encrypt(padded_lsb_bits.tobytes())
-        
-
-        encrypted_lsb = np.frombuffer(encrypted_lsb_bytes, dtype=np.uint8)[:len(lsb_bits)]
-        encrypted_msb = encrypted_lsb & 0xC0  # Extract the 2 MSBs needed to decrypt
-        
-        
-        # Replace the 6 LSBs with the encrypted LSBs
-        flat_region &= 0xC0
-        flat_region |= encrypted_lsb & 0x3F  # Set the new 6 LSBs
-
-        encrypted_region = flat_region.reshape(region.shape)
-
-        return encrypted_region, iv, encrypted_msb
+    def encrypt_regions(self, regions, keys):
+        """
+        Encrypt the regions of a frame, in order. The IVs are drawn here, one by one, so the
+        output only depends on them: the encryption pool gives the same result as the serial path.
+        """
+        ivs = [AESCipher.generate_iv() for _ in regions]
+        if tracer.enabled:
+            count("cipher_bytes", sum(region.nbytes for region in regions))
+        pool = self.get_encrypt_pool() if len(regions) > 1 else None
+        with span("cipher", regions=len(regions)):
+            if pool is None:
+                encrypt = self.selective_encrypt if self.censored_method == 'Selective' else self.aes_encrypt
+                return [encrypt(region, key, iv) for region, key, iv in zip(regions, keys, ivs)]
+            encrypt = AESCipher.selective_encrypt if self.censored_method == 'Selective' else AESCipher.aes_encrypt
+            return list(pool.map(encrypt, regions, keys, [self.aes_mode] * len(regions), ivs))
+
+    def get_encrypt_pool(self):
+        """
+        Pool shared by the frames in flight, None with a single encryption worker.
+        Threads are enough: pycryptodome releases the GIL in its cipher calls.
+        In a pool process (Cli --workers, segment workers) the process executor falls back to
+        threads: daemonic processes can't start processes of their own.
+        """
+        if self.encrypt_workers <= 1:
+            return None
+        with self.encrypt_pool_lock:
+            if self.encrypt_pool is None:
+                if self.encrypt_executor == "process" and not multiprocessing.current_process().daemon:
+                    context = multiprocessing.get_context("spawn")
+                    self.encrypt_pool = ProcessPoolExecutor(self.encrypt_workers, mp_context=context)
+                else:
+                    self.encrypt_pool = ThreadPoolExecutor(self.encrypt_workers, thread_name_prefix="encrypt")
+            return self.encrypt_pool
+
+    def close_encrypt_pool(self):
+        if self.encrypt_pool is not None:
+            self.encrypt_pool.shutdown()
+            self.encrypt_pool = None
 
 
     
@@ -0,0 +1,112 @@
+import subprocess
+import tempfile
+import cv2
+import numpy as np
+from VideoSegments import ffmpeg_path
+
+####################################################
+##################### Encoders #####################
+####################################################
+#
+# Output videos are written through an encoder with the cv2.VideoWriter interface
+# (write(frame), release()), chosen by open_encoder:
+#   "opencv": cv2.VideoWriter, codec is a fourcc ("mp4v", "avc1"...), the other options are ignored
+#   "ffmpeg": an ffmpeg subprocess reading raw BGR frames on its stdin, codec is an ffmpeg
+#             encoder ("libx264", "libx265", "mpeg4"...), with preset, threads and bitrate
+# Encoder options are passed around as a dict, e.g. {"backend": "ffmpeg", "preset": "veryfast"}.
+# Without ffmpeg (see VideoSegments.ffmpeg_path) the ffmpeg backend falls back to OpenCV.
+
+DEFAULT_CODECS = {"opencv": "mp4v", "ffmpeg": "libx264"}
+
+
+class OpenCVEncoder:
+    def __init__(self, path, fps, size, codec="mp4v"):
+        self.path = path
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, size)
+        if not self.writer.isOpened():
+            raise RuntimeError(f"OpenCV can't write {path} with the {codec} codec")
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def release(self):
+        self.writer.release()
+
+
+class FFmpegEncoder:
+    def __init__(self, path, fps, size, codec="libx264", preset=None, threads=None, bitrate=None, executable=None):
+        self.path = path
+        self.size = size
+        command = [executable or ffmpeg_path(), "-y", "-loglevel", "error",
+                   "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+                   "-an", "-c:v", codec]
+        if size[0] % 2 or size[1] % 2:
+            # yuv420p needs even dimensions: one black row/column is added
+            command += ["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"]
+        command += ["-pix_fmt", "yuv420p"]
+        if preset is not None:
+            command += ["-preset", preset]
+        if threads is not None:
+            command += ["-threads", str(threads)]
+        if bitrate is not None:
+            command += ["-b:v", str(bitrate)]
+        command.append(path)
+        self.log = tempfile.TemporaryFile() # ffmpeg's errors, not a pipe: it could fill up and block ffmpeg
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self.log)
+
+    def write(self, frame):
+        """
+        Send one frame to ffmpeg. The frame's buffer goes to the pipe as it is (no copy
+        unless it isn't contiguous), the call blocks while ffmpeg is behind.
+        """
+        if frame.shape[1::-1] != self.size:
+            raise ValueError(f"Frame of {frame.shape[1]}x{frame.shape[0]} for a {self.size[0]}x{self.size[1]} video")
+        try:
+            self.process.stdin.write(memoryview(np.ascontiguousarray(frame)))
+        except BrokenPipeError:
+            self.release() # raises with ffmpeg's message
+
+    def release(self):
+        if self.process.stdin.closed:
+            return
+        self.process.stdin.close()
+        code = self.process.wait()
+        self.log.seek(0)
+        message = self.log.read().decode(errors="replace").strip()
+        self.log.close()
+        if code != 0:
+            raise RuntimeError(f"ffmpeg failed to write {self.path} ({code}): {message}")
+
+
+def open_encoder(path, fps, size, backend="opencv", codec=None, preset=None, threads=None, bitrate=None):
+    """
+    Encoder writing a video of size (width, height) at fps to path.
+    """
+    if backend == "ffmpeg":
+        executable = ffmpeg_path()
+        if executable is not None:
+            return FFmpegEncoder(path, fps, size, codec or DEFAULT_CODECS["ffmpeg"], preset, threads, bitrate, executable)
+        print("ffmpeg not found: the video is encoded with OpenCV")
+        codec = None # ffmpeg encoder names aren't fourccs
+    elif backend != "opencv":
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    return OpenCVEncoder(path, fps, size, codec or DEFAULT_CODECS["opencv"])
+
+
+def encode(frames, path, fps, size=None, **encoder):
+    """
+    Write the frames of any iterable to path, one at a time (size defaults to the first frame's).
+    Returns the number of frames written.
+    """
+    out = None
+    count = 0
+    try:
+        for frame in frames:
+            if out is None:
+                out = open_encoder(path, fps, size or frame.shape[1::-1], **encoder)
+            out.write(frame)
+            count += 1
+    finally:
+        if out is not None:
+            out.release()
+    return count
@@ -0,0 +1,488 @@
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+import numpy as np
+
+####################################################
+############### Frame metadata format ##############
+####################################################
+#
+# Binary replacement for the old frame_data.json (one JSON object per line).
+#
+#   file header   : FILE_HEADER
+#   frame record  : FRAME_HEADER
+#                   BOX_HEADER * box_count
+#                   payloads, box by box: region bytes, then encrypted_msb bytes (Selective only)
+#   ...
+#   index         : INDEX_ENTRY * frame count (frame index -> byte offset of the frame record)
+#   trailer       : TRAILER
+#
+# FRAME_HEADER["size"] is the number of bytes following the frame header, so a
+# reader can skip a frame without looking at its boxes. Every header is a numpy
+# structured dtype: box headers and payloads are read with np.frombuffer, no parsing.
+# The index is written when the writer is closed; if it is missing (interrupted run)
+# the reader rebuilds it by hopping from frame header to frame header.
+#
+# Writers keep their file open and write whole records in chunks (see ChunkedFile):
+# a crash loses at most the records of the last chunk, never part of a record.
+
+MAGIC = b"PTFD"
+INDEX_MAGIC = b"PTFI"
+# Bumped when the format gains flags or sections older readers would misread, they refuse newer files:
+#   1: frame records
+#   2: index and trailer, FLAG_CTR (read as CBC by a version 1 reader)
+# Version 1 files are still read: no CTR flag, and the missing index is rebuilt.
+VERSION = 2
+
+FLAG_SELECTIVE = 0x01
+FLAG_CTR = 0x02 # AES mode of the frame, CBC when not set
+
+FILE_HEADER = np.dtype([("magic", "S4"), ("version", "<u2"), ("reserved", "<u2")])
+FRAME_HEADER = np.dtype([("frame_index", "<u4"), ("flags", "u1"), ("reserved", "u1"), ("box_count", "<u2"), ("size", "<u8")])
+BOX_HEADER = np.dtype([("id", "<i4"), ("coords", "<i4", (4,)), ("key", "u1", (16,)), ("iv", "u1", (16,)), ("shape", "<u4", (3,))])
+INDEX_ENTRY = np.dtype([("frame_index", "<u4"), ("reserved", "<u4"), ("offset", "<u8")])
+TRAILER = np.dtype([("index_offset", "<u8"), ("count", "<u8"), ("magic", "S4"), ("reserved", "<u4")])
+
+
+def _region_shape(shape):
+    """
+    Shape stored in a box header (0 as third dimension for 2D regions)
+    """
+    return tuple(int(s) for s in shape if s != 0)
+
+
+class ChunkedFile:
+    """
+    File kept open, whose writes are buffered and written in chunks of whole records:
+    when chunk_size bytes are pending, when flush_interval seconds passed since the last
+    chunk, and on close. With fsync=True every chunk is synced to the disk.
+    A timer thread writes the complete records left waiting, so even a writer that gets
+    no new record (stalled stream, key table between two new tracks) loses at most
+    flush_interval seconds of data.
+    """
+    def __init__(self, path, mode="wb", chunk_size=4 << 20, flush_interval=1.0, fsync=False):
+        self.path = path
+        self.file = open(path, mode)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.buffer = []
+        self.pending = 0 # bytes in the buffer
+        self.complete = 0 # buffer items up to the end of the last whole record
+        self.last_flush = time.monotonic()
+        self.chunks = 0
+        self.lock = threading.Lock() # the timer thread flushes too
+        self.stop = threading.Event()
+        self.timer = None
+        if flush_interval is not None:
+            self.timer = threading.Thread(target=self.flush_on_time, name=f"flush {os.path.basename(path)}", daemon=True)
+            self.timer.start()
+
+    def write(self, data):
+        with self.lock:
+            self.buffer.append(data)
+            self.pending += memoryview(data).nbytes
+
+    def end_record(self):
+        """
+        Called after the last write of a record: chunks only end on record boundaries.
+        """
+        with self.lock:
+            self.complete = len(self.buffer)
+            if self.pending >= self.chunk_size or (self.flush_interval is not None and
+                                                   time.monotonic() - self.last_flush >= self.flush_interval):
+                self.write_chunk(self.complete)
+
+    def flush(self):
+        """
+        Write everything pending (called on record boundaries).
+        """
+        with self.lock:
+            self.write_chunk(len(self.buffer))
+
+    def flush_on_time(self):
+        """
+        Timer thread: write the complete records once they waited flush_interval seconds.
+        """
+        while not self.stop.wait(self.flush_interval / 4):
+            with self.lock:
+                if self.complete and time.monotonic() - self.last_flush >= self.flush_interval:
+                    self.write_chunk(self.complete)
+
+    def write_chunk(self, items):
+        """
+        Write the first items of the buffer (lock held).
+        """
+        if items:
+            chunk = self.buffer[:items]
+            self.file.writelines(chunk)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            del self.buffer[:items]
+            self.pending -= sum(memoryview(data).nbytes for data in chunk)
+            self.chunks += 1
+        self.complete = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        if self.file is not None:
+            if self.timer is not None:
+                self.stop.set()
+                self.timer.join()
+            self.flush()
+            self.file.close()
+            self.file = None
+
+
+class FrameDataWriter:
+    def __init__(self, path, chunk_size=4 << 20, flush_interval=1.0, fsync=False):
+        self.path = path
+        self.file = ChunkedFile(path, "wb", chunk_size, flush_interval, fsync)
+        header = np.zeros(1, dtype=FILE_HEADER)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        self.file.write(header.tobytes())
+        self.file.flush() # a valid, empty frame data file from the start
+
+        self.offset = FILE_HEADER.itemsize
+        self.index_frames = array("I")
+        self.index_offsets = array("Q")
+
+    def write(self, frame_data):
+        """
+        Write one frame record. frame_data has the same layout as the old JSON lines,
+        with bytes for key/iv, numpy arrays for region/encrypted_msb and the AES "mode".
+        """
+        bboxes = frame_data.get("bboxes", [])
+        is_selective = frame_data.get("isSelective", False)
+
+        payloads = []
+        for bbox in bboxes:
+            payloads.append(np.ascontiguousarray(bbox["region"], dtype=np.uint8))
+            if is_selective:
+                payloads.append(np.ascontiguousarray(bbox["encrypted_msb"], dtype=np.uint8))
+        regions = payloads[::2] if is_selective else payloads
+
+        # Filled column by column, not box by box
+        box_headers = np.zeros(len(bboxes), dtype=BOX_HEADER)
+        if bboxes:
+            box_headers["id"] = [bbox["id"] for bbox in bboxes]
+            box_headers["coords"] = [bbox["coords"] for bbox in bboxes]
+            box_headers["key"] = np.frombuffer(b"".join(bbox["key"] for bbox in bboxes), dtype=np.uint8).reshape(-1, 16)
+            box_headers["iv"] = np.frombuffer(b"".join(bbox["iv"] for bbox in bboxes), dtype=np.uint8).reshape(-1, 16)
+            box_headers["shape"] = [(region.shape + (0, 0))[:3] for region in regions]
+
+        frame_header = np.zeros(1, dtype=FRAME_HEADER)
+        frame_header["frame_index"] = frame_data["frame_index"]
+        frame_header["flags"] = (FLAG_SELECTIVE if is_selective else 0) | (FLAG_CTR if frame_data.get("mode") == "CTR" else 0)
+        frame_header["box_count"] = len(bboxes)
+        frame_header["size"] = box_headers.nbytes + sum(p.nbytes for p in payloads)
+
+        self.index_frames.append(int(frame_data["frame_index"]))
+        self.index_offsets.append(self.offset)
+        self.offset += FRAME_HEADER.itemsize + int(frame_header["size"][0])
+
+        self.file.write(frame_header.tobytes())
+        self.file.write(box_headers.tobytes())
+        for payload in payloads:
+            self.file.write(payload.data)
+        self.file.end_record()
+
+    def write_index(self):
+        index = np.zeros(len(self.index_frames), dtype=INDEX_ENTRY)
+        index["frame_index"] = self.index_frames
+        index["offset"] = self.index_offsets
+        trailer = np.zeros(1, dtype=TRAILER)
+        trailer["index_offset"] = self.offset
+        trailer["count"] = len(index)
+        trailer["magic"] = INDEX_MAGIC
+        self.file.write(index.tobytes())
+        self.file.write(trailer.tobytes())
+
+    def flush(self):
+        """
+        Write the pending records now (the index is only written on close).
+        """
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.write_index()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class KeyWriter:
+    """
+    Track ID -> AES key table (aes_keys.txt), one "ID: id, Key: hex" line per track,
+    written in chunks like the frame data.
+    """
+    def __init__(self, path, chunk_size=64 << 10, flush_interval=1.0, fsync=False):
+        self.path = path
+        self.file = ChunkedFile(path, "ab", chunk_size, flush_interval, fsync)
+
+    def write(self, track_id, key):
+        self.file.write(f"ID: {track_id}, Key: {key.hex()}\n".encode())
+        self.file.end_record()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameDataReader:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        header = np.frombuffer(self.file.read(FILE_HEADER.itemsize), dtype=FILE_HEADER)
+        if len(header) != 1 or header[0]["magic"] != MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} is not a frame data file (convert old JSON files with FrameData.convert_json)")
+        if header[0]["version"] > VERSION:
+            self.file.close()
+            raise ValueError(f"{path} uses an unsupported frame data version ({header[0]['version']})")
+
+        # The index is only loaded on first random access, sequential reads don't need it
+        self._index = None
+        self.index_lookup = None
+        self.file_size = os.fstat(self.file.fileno()).st_size
+        self.data_end = self.file_size
+        self.index_count = None
+        if self.file_size >= FILE_HEADER.itemsize + TRAILER.itemsize:
+            self.file.seek(self.file_size - TRAILER.itemsize)
+            trailer = np.frombuffer(self.file.read(TRAILER.itemsize), dtype=TRAILER)[0]
+            index_size = int(trailer["count"]) * INDEX_ENTRY.itemsize
+            if trailer["magic"] == INDEX_MAGIC and int(trailer["index_offset"]) + index_size + TRAILER.itemsize == self.file_size:
+                self.data_end = int(trailer["index_offset"])
+                self.index_count = int(trailer["count"])
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = self.load_index()
+            if len(self._index) > 0 and not np.all(np.diff(self._index["frame_index"].astype(np.int64)) == 1):
+                self.index_lookup = {int(f): i for i, f in enumerate(self._index["frame_index"])}
+            # otherwise frame i is at position i - first frame index
+        return self._index
+
+    def load_index(self):
+        """
+        Load the index stored at the end of the file, or rebuild it by scanning the frame headers.
+        """
+        if self.index_count is not None:
+            self.file.seek(self.data_end)
+            return np.frombuffer(self.file.read(self.index_count * INDEX_ENTRY.itemsize), dtype=INDEX_ENTRY)
+
+        # No index: hop over the frame records, a truncated last record is ignored
+        frames, offsets = array("I"), array("Q")
+        offset = FILE_HEADER.itemsize
+        self.file.seek(offset)
+        while True:
+            data = self.file.read(FRAME_HEADER.itemsize)
+            if len(data) < FRAME_HEADER.itemsize:
+                break
+            frame_header = np.frombuffer(data, dtype=FRAME_HEADER)[0]
+            end = offset + FRAME_HEADER.itemsize + int(frame_header["size"])
+            if end > self.file_size:
+                break
+            frames.append(int(frame_header["frame_index"]))
+            offsets.append(offset)
+            offset = end
+            self.file.seek(offset)
+        self.data_end = offset
+
+        index = np.zeros(len(frames), dtype=INDEX_ENTRY)
+        index["frame_index"] = frames
+        index["offset"] = offsets
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def find(self, frame_index):
+        """
+        Position of a frame in the index, None if the frame has no record.
+        """
+        index = self.index
+        if self.index_lookup is not None:
+            return self.index_lookup.get(frame_index)
+        if len(index) == 0:
+            return None
+        position = frame_index - int(index[0]["frame_index"])
+        if 0 <= position < len(index):
+            return position
+        return None
+
+    def get(self, frame_index):
+        """
+        Record of a single frame (random access), None if the frame has no record.
+        """
+        position = self.find(frame_index)
+        if position is None:
+            return None
+        self.file.seek(int(self.index[position]["offset"]))
+        return self.read_record(self.read_header())
+
+    def read_header(self):
+        """
+        Read the next frame header, None at the end of the frame records.
+        """
+        if self.file.tell() + FRAME_HEADER.itemsize > self.data_end:
+            return None
+        data = self.file.read(FRAME_HEADER.itemsize)
+        return np.frombuffer(data, dtype=FRAME_HEADER)[0]
+
+    def read_record(self, frame_header):
+        """
+        Read the body of a frame whose header was just read.
+        Regions are views on the bytes read from the file.
+        """
+        box_count = int(frame_header["box_count"])
+        is_selective = bool(frame_header["flags"] & FLAG_SELECTIVE)
+        body = self.file.read(int(frame_header["size"]))
+        if len(body) < int(frame_header["size"]):
+            return None  # Truncated record (interrupted run)
+        box_headers = np.frombuffer(body, dtype=BOX_HEADER, count=box_count)
+
+        bboxes = []
+        offset = box_headers.nbytes
+        for box in box_headers:
+            shape = _region_shape(box["shape"])
+            size = int(np.prod(shape))
+            bbox = {
+                "id": int(box["id"]),
+                "coords": [int(c) for c in box["coords"]],
+                "key": box["key"].tobytes(),
+                "iv": box["iv"].tobytes(),
+                "region": np.frombuffer(body, dtype=np.uint8, count=size, offset=offset).reshape(shape),
+            }
+            offset += size
+            if is_selective:
+                bbox["encrypted_msb"] = np.frombuffer(body, dtype=np.uint8, count=size, offset=offset)
+                offset += size
+            bboxes.append(bbox)
+
+        return {
+            "frame_index": int(frame_header["frame_index"]),
+            "isSelective": is_selective,
+            "mode": "CTR" if frame_header["flags"] & FLAG_CTR else "CBC",
+            "bboxes": bboxes,
+        }
+
+    def __iter__(self):
+        return self.iter_range()
+
+    def iter_range(self, start=None, end=None):
+        """
+        Records of the frames in [start, end), reading only that part of the file.
+        Records are read one at a time, so memory use doesn't depend on the file length.
+        """
+        offset = FILE_HEADER.itemsize
+        if start is not None:
+            positions = np.flatnonzero(self.index["frame_index"] >= start)
+            if len(positions) == 0:
+                return
+            offset = int(self.index[positions[0]]["offset"])
+        self.file.seek(offset)
+        while True:
+            frame_header = self.read_header()
+            if frame_header is None:
+                return
+            if end is not None and frame_header["frame_index"] >= end:
+                return
+            record = self.read_record(frame_header)
+            if record is None:
+                return
+            if start is None or record["frame_index"] >= start:
+                yield record
+
+    def ids(self):
+        """
+        All track IDs present in the file (payloads are skipped, not read).
+        """
+        unique_ids = set()
+        self.file.seek(FILE_HEADER.itemsize)
+        while True:
+            frame_header = self.read_header()
+            if frame_header is None:
+                break
+            box_count = int(frame_header["box_count"])
+            data = self.file.read(box_count * BOX_HEADER.itemsize)
+            if len(data) < box_count * BOX_HEADER.itemsize:
+                break  # Truncated record (interrupted run)
+            box_headers = np.frombuffer(data, dtype=BOX_HEADER)
+            unique_ids.update(int(i) for i in box_headers["id"])
+            self.file.seek(int(frame_header["size"]) - box_headers.nbytes, 1)
+        return sorted(unique_ids)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def concat_frame_data(paths, output_path):
+    """
+    Join frame data files (e.g. the segments of a run) into one. Frame records are
+    copied as they are, only the index is rebuilt.
+    """
+    with FrameDataWriter(output_path) as writer:
+        for path in paths:
+            with FrameDataReader(path) as reader:
+                index = reader.index # rebuilt if the file has no index
+                reader.file.seek(FILE_HEADER.itemsize)
+                data = reader.file.read(reader.data_end - FILE_HEADER.itemsize)
+            writer.file.write(data)
+            writer.index_frames.extend(int(f) for f in index["frame_index"])
+            writer.index_offsets.extend(int(o) - FILE_HEADER.itemsize + writer.offset for o in index["offset"])
+            writer.offset += len(data)
+            writer.file.end_record()
+
+
+def convert_json(json_path, output_path):
+    """
+    Convert an old frame_data.json (JSON lines) to the binary format.
+    """
+    with open(json_path, "r") as f, FrameDataWriter(output_path) as writer:
+        for line in f:
+            if not line.strip():
+                continue
+            frame_data = json.loads(line)
+            is_selective = frame_data.get("isSelective", False)
+            for bbox in frame_data.get("bboxes", []):
+                bbox["key"] = bytes.fromhex(bbox["key"])
+                bbox["iv"] = bytes.fromhex(bbox["iv"])
+                bbox["region"] = np.array(bbox["region"], dtype=np.uint8)
+                if is_selective:
+                    bbox["encrypted_msb"] = np.array(bbox["encrypted_msb"], dtype=np.uint8)
+            writer.write(frame_data)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python FrameData.py frame_data.json frame_data.bin")
+        sys.exit(1)
+    convert_json(sys.argv[1], sys.argv[2])
+    print(f"Frame data converted to {sys.argv[2]}")
@@ -0,0 +1,92 @@
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import torch
+from ultralytics import YOLO
+
+####################################################
+############### ModelRegistry Class ################
+####################################################
+#
+# Process-wide cache of loaded YOLO models, keyed by (model path, device).
+# A model is loaded and warmed up (first inference, which builds the predictor)
+# once, then reused by every Detection of the process.
+
+def default_device():
+    return torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+
+
+def load_yolo(model_path, device):
+    return YOLO(model_path).to(device)
+
+
+class ModelRegistry:
+    def __init__(self, capacity=2, loader=load_yolo):
+        self.capacity = capacity
+        self.loader = loader # (model path, device name) -> model
+        self.models = OrderedDict() # (path, device) -> model, least recently used first
+        self.load_times = {} # (path, device) -> seconds spent loading and warming up
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.saved_time = 0.0
+
+    def key(self, model_path, device):
+        return (model_path, str(device if device is not None else default_device()))
+
+    def get(self, model_path, device=None, warm_up=True):
+        """
+        Cached model for model_path on device, loaded (and warmed up) on first use.
+        """
+        key = self.key(model_path, device)
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                self.hits += 1
+                self.saved_time += self.load_times[key]
+                print(f"Model {model_path} ({key[1]}) reused, {self.load_times[key]:.2f} s saved ({self.saved_time:.2f} s in total)")
+                return self.models[key]
+
+            start_time = time.time()
+            model = self.loader(model_path, key[1])
+            if warm_up:
+                self.warm_up_model(model)
+            self.load_times[key] = time.time() - start_time
+            self.misses += 1
+            print(f"Model {model_path} ({key[1]}) loaded in {self.load_times[key]:.2f} s")
+
+            self.models[key] = model
+            while len(self.models) > self.capacity:
+                evicted, _ = self.models.popitem(last=False)
+                print(f"Model {evicted[0]} ({evicted[1]}) evicted")
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+            return model
+
+    def warm_up_model(self, model, size=(640, 640)):
+        """
+        Run one inference on a black frame: builds the predictor and the inference graph.
+        """
+        model.predict(np.zeros((size[1], size[0], 3), dtype=np.uint8), verbose=False)
+
+    def warm_up(self, model_path, device=None):
+        """
+        Load and warm up a model ahead of its first use (e.g. on startup).
+        """
+        return self.get(model_path, device)
+
+    def clear(self):
+        with self.lock:
+            self.models.clear()
+
+
+registry = ModelRegistry()
+
+
+def get_model(model_path, device=None):
+    return registry.get(model_path, device)
+
+
+def warm_up(model_path, device=None):
+    return registry.warm_up(model_path, device)
@@ -0,0 +1,240 @@
+import multiprocessing
+import os
+import shutil
+import time
+from collections import Counter
+from itertools import islice
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+from FrameData import concat_frame_data
+from VideoSegments import segment_paths, concat_videos
+
+####################################################
+############ Segment-parallel processing ###########
+####################################################
+#
+# One video split into time segments, each processed by its own worker process
+# (one model per process, see ModelRegistry.py), in two passes:
+#   1. track   : each worker tracks its segment, starting `overlap` frames early,
+#                and sends back the boxes of every frame.
+#   2. anonymise: the parent joins the track IDs across segment boundaries using the
+#                overlap frames, creates one key per joined track, then each worker
+#                anonymises its segment with the joined boxes and writes it to a file.
+# The segments are then joined without re-encoding (see VideoSegments.py).
+# Track IDs and keys are consistent across the whole video: a person crossing a
+# segment boundary keeps its ID and key.
+
+
+def split_segments(frame_count, segment_count):
+    """
+    [start, end) of segment_count segments of (nearly) equal length.
+    """
+    bounds = np.linspace(0, frame_count, segment_count + 1).astype(int)
+    return [(int(start), int(end)) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def box_iou(a, b):
+    """
+    IoU of every box of a (N x 4) with every box of b (M x 4).
+    """
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def join_tracks(segments, min_iou=0.5, min_frames=2):
+    """
+    Map the local track IDs of every segment to IDs unique over the video.
+    segments: in order, dicts with "start" (first frame of the segment), "track_start"
+    (first tracked frame, start - overlap) and "boxes" (one N x 7 array per tracked frame,
+    track ID in column 4). A track of a segment takes the ID of the track of the previous
+    segment it overlaps with IoU >= min_iou on the most overlap frames (at least min_frames).
+    Returns one {local ID: joined ID} dict per segment.
+    """
+    mappings = []
+    next_id = 1
+    for k, segment in enumerate(segments):
+        mapping = {}
+        if k > 0:
+            previous = segments[k - 1]
+            votes = Counter()
+            for frame_index in range(segment["track_start"], segment["start"]):
+                current_boxes = segment["boxes"][frame_index - segment["track_start"]]
+                previous_boxes = previous["boxes"][frame_index - previous["track_start"]]
+                if len(current_boxes) == 0 or len(previous_boxes) == 0:
+                    continue
+                iou = box_iou(current_boxes[:, :4], previous_boxes[:, :4])
+                for i, j in enumerate(iou.argmax(axis=1)):
+                    if iou[i, j] >= min_iou:
+                        votes[(int(current_boxes[i, 4]), int(previous_boxes[j, 4]))] += 1
+            used = set()
+            for (local_id, previous_id), count in votes.most_common():
+                if count < min_frames or local_id in mapping or previous_id in used:
+                    continue
+                mapping[local_id] = mappings[k - 1][previous_id]
+                used.add(previous_id)
+
+        # Tracks starting in the segment, in order of first appearance
+        for boxes in segment["boxes"][segment["start"] - segment["track_start"]:]:
+            for local_id in boxes[:, 4].astype(int):
+                if local_id not in mapping:
+                    mapping[int(local_id)] = next_id
+                    next_id += 1
+        # Tracks only seen in the overlap frames keep an ID too (never drawn)
+        for boxes in segment["boxes"]:
+            for local_id in boxes[:, 4].astype(int):
+                if local_id not in mapping:
+                    mapping[int(local_id)] = next_id
+                    next_id += 1
+        mappings.append(mapping)
+    return mappings
+
+
+####################################################
+################## Worker processes ################
+####################################################
+
+def init_worker(model_path):
+    """
+    Load and warm up the model of the worker before its first segment.
+    """
+    from ModelRegistry import warm_up
+    warm_up(model_path)
+
+
+def track_segment(job):
+    """
+    Pass 1: boxes of the frames [track_start, end) with local track IDs.
+    """
+    from Detection import Detection
+    from VideoReader import VideoReader
+    from ModelRegistry import get_model
+    from Tracking import BatchTracker, set_track_count
+
+    start_time = time.time()
+    video = VideoReader(job["video_path"])
+    video.seek(job["track_start"])
+    detection = Detection(video, os.devnull, model=get_model(job["model_path"]),
+                          inference_size=job["inference_size"], regions=job["regions"],
+                          static_threshold=job["static_threshold"], max_gap=job["max_gap"])
+    detection.tracker = BatchTracker("bytetrack.yaml")
+    set_track_count(0)
+    frames = islice(detection.read_frames(job["track_start"]), job["end"] - job["track_start"])
+    boxes = [results[0].boxes.data.cpu().numpy() for _, results in detection.track(frames, job["batch_size"], batch_tracker=True)]
+    video.release()
+    return {"index": job["index"], "start": job["start"], "track_start": job["track_start"], "boxes": boxes,
+            "skipped": detection.frames_skipped, "seconds": time.time() - start_time}
+
+
+def anonymise_segment(job):
+    """
+    Pass 2: anonymise the frames [start, end) with the joined boxes, write the segment files.
+    """
+    from Detection import Detection
+    from VideoReader import VideoReader
+    from ModelRegistry import get_model
+
+    start_time = time.time()
+    video = VideoReader(job["video_path"])
+    video.seek(job["start"])
+    detection = Detection(video, job["output_path"], job["censored"], job["censored_method"], model=get_model(job["model_path"]),
+                          frame_data_path=job["frame_data_path"], keys_path=os.devnull, **job["options"])
+    detection.aes_keys = job["keys"] # created by the parent: no new key here
+
+    out = detection.open_encoder(job["output_path"])
+    frames = islice(detection.read_frames(job["start"]), job["end"] - job["start"])
+    for frame_index, (frame, data) in enumerate(zip(frames, job["boxes"]), job["start"]):
+        results = [Results(frame, path="", names=detection.model.names, boxes=torch.from_numpy(data))]
+        output_frame, frame_data = detection.anonymise(frame, results, frame_index)
+        out.write(output_frame)
+        if frame_data is not None:
+            detection.write_frame_data(frame_data)
+    out.release()
+    video.release()
+    detection.close_frame_data()
+    detection.close_encrypt_pool()
+    return {"index": job["index"], "seconds": time.time() - start_time}
+
+
+####################################################
+##################### Parent #######################
+####################################################
+
+def process_parallel(detection, workers=2, overlap=30, batch_size=1, segment_count=None):
+    """
+    Process the video of a Detection in segment_count segments (default: one per worker)
+    on `workers` processes. Returns the timings of the run.
+    """
+    start_time = time.time()
+    video = detection.video
+    model_path = detection.model_path(detection.detect_face)
+    segments = split_segments(video.frame_count, segment_count or workers)
+    directory = detection.output_path + ".segments"
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    detection.reset_metadata()
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=init_worker, initargs=(model_path,)) as pool:
+        # Pass 1: tracking
+        jobs = [{"index": k, "video_path": video.path, "model_path": model_path, "batch_size": batch_size,
+                 "inference_size": detection.inference_size, "regions": detection.regions,
+                 "static_threshold": detection.static_threshold, "max_gap": detection.max_gap, "start": start, "track_start": max(0, start - overlap), "end": end} for k, (start, end) in enumerate(segments)]
+        tracked = sorted(pool.imap_unordered(track_segment, jobs), key=lambda segment: segment["index"])
+        track_time = time.time() - start_time
+        print(f"Tracked {len(tracked)} segments in {track_time:.2f} s")
+
+        # Joined IDs, one key per joined track
+        mappings = join_tracks(tracked)
+        encrypted = detection.censored and detection.censored_method in ('AES', 'Selective')
+        keys = {}
+        jobs = []
+        for segment, mapping, (start, end) in zip(tracked, mappings, segments):
+            boxes = []
+            segment_keys = {}
+            for data in segment["boxes"][start - segment["track_start"]:]:
+                data = data.copy()
+                data[:, 4] = [mapping[int(local_id)] for local_id in data[:, 4]]
+                boxes.append(data)
+                if encrypted:
+                    for track_id in data[:, 4].astype(int).tolist():
+                        if track_id not in keys: # keys are created in frame order, like in Detection
+                            keys[track_id] = detection.generate_aes_key()
+                            detection.write_key(track_id, keys[track_id])
+                        segment_keys[track_id] = keys[track_id]
+            video_path, frame_data_path = segment_paths(directory, segment["index"])
+            jobs.append({"index": segment["index"], "video_path": video.path, "model_path": model_path, "start": start, "end": end,
+                         "boxes": boxes, "keys": segment_keys, "censored": detection.censored, "censored_method": detection.censored_method,
+                         "output_path": video_path, "frame_data_path": frame_data_path,
+                         "options": {"aes_mode": detection.aes_mode, "fast_blur": detection.fast_blur, "blur_strength": detection.blur_strength,
+                                     "encoder": detection.encoder}})
+        detection.close_frame_data()
+        detection.aes_keys = keys
+
+        # Pass 2: anonymisation
+        anonymise_start = time.time()
+        for done, _ in enumerate(pool.imap_unordered(anonymise_segment, jobs), 1):
+            print(f"\rAnonymised segments: {done}/{len(jobs)}", end="")
+        anonymise_time = time.time() - anonymise_start
+
+    concat_start = time.time()
+    concat_videos([segment_paths(directory, k)[0] for k in range(len(segments))], detection.output_path)
+    if encrypted:
+        concat_frame_data([segment_paths(directory, k)[1] for k in range(len(segments))], detection.frame_data_path)
+    shutil.rmtree(directory)
+    video.release()
+
+    detection.frames_processed = sum(end - start for start, end in segments)
+    detection.frames_skipped = sum(segment["skipped"] for segment in tracked) # overlap frames included
+    detection.box_count = sum(len(data) for job in jobs for data in job["boxes"])
+    detection.wall_time = time.time() - start_time
+    detection.fps = detection.frames_processed / max(detection.wall_time, 1e-9)
+    print(f"\nProcessing complete ({detection.fps:.1f} fps, {workers} workers). Video saved to {detection.output_path}")
+    return {"segments": len(segments), "workers": workers, "track_time": track_time, "anonymise_time": anonymise_time,
+            "concat_time": time.time() - concat_start, "wall_time": detection.wall_time}
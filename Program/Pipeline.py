@@ -0,0 +1,218 @@
+import queue
+import threading
+import time
+
+####################################################
+################## Pipeline Class ##################
+####################################################
+#
+# Stages running in their own threads, connected by bounded queues.
+# Every item carries its sequence number: stages with several workers may finish
+# out of order, the following stage gets the items back in order.
+
+_END = object()
+
+
+class _Inputs:
+    """
+    Ordered input iterator of a stage, with the lock its workers take to advance it.
+    """
+    def __init__(self, generator, wait_time):
+        self.generator = generator
+        self.wait_time = wait_time
+        self.lock = threading.Lock()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.generator)
+
+
+class Stage:
+    def __init__(self, name, function, workers=1, queue_size=8, stream=False):
+        """
+        function is called on every item (by `workers` threads). With stream=True it is called
+        once with an iterator over the input items and yields its outputs (single worker).
+        """
+        self.name = name
+        self.function = function
+        self.workers = 1 if stream else max(1, workers)
+        self.queue_size = queue_size
+        self.stream = stream
+
+        # Statistics
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy_time = 0.0
+        self.depth_sum = 0
+        self.depth_max = 0
+
+    def record(self, busy_time, depth):
+        with self.lock:
+            self.items += 1
+            self.busy_time += busy_time
+            self.depth_sum += depth
+            self.depth_max = max(self.depth_max, depth)
+
+
+class Pipeline:
+    def __init__(self, source, stages, source_name="decode"):
+        """
+        source is an iterable read by its own thread, stages are run in order on its items.
+        Each stage reads from a queue of its queue_size. The output of the last stage is dropped (it is the sink).
+        """
+        self.source_stage = Stage(source_name, None)
+        self.source = source
+        self.stages = stages
+        self.error = None
+        self.stopped = threading.Event()
+        self.wall_time = 0.0
+
+    def put(self, q, item):
+        while not self.stopped.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def get(self, q):
+        while not self.stopped.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return _END
+
+    def ordered(self, q, producers, wait_time):
+        """
+        Items of q in sequence order, until each producer has sent its end marker.
+        Time spent waiting for items is added to wait_time[0].
+        """
+        pending = {}
+        expected = 0
+        ended = 0
+        while ended < producers:
+            start = time.perf_counter()
+            item = self.get(q)
+            wait_time[0] += time.perf_counter() - start
+            if item is _END:
+                if self.stopped.is_set():
+                    return
+                ended += 1
+                continue
+            pending[item[0]] = item
+            while expected in pending:
+                yield pending.pop(expected)
+                expected += 1
+
+    def fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stopped.set()
+
+    def run_source(self, q_out):
+        stage = self.source_stage
+        try:
+            iterator = iter(self.source)
+            seq = 0
+            while not self.stopped.is_set():
+                start = time.perf_counter()
+                item = next(iterator, _END)
+                if item is _END:
+                    break
+                stage.record(time.perf_counter() - start, 0)
+                if not self.put(q_out, (seq, item)):
+                    return
+                seq += 1
+        except Exception as e:
+            self.fail(e)
+        finally:
+            self.put(q_out, _END)
+
+    def run_stage(self, stage, inputs, q_in, q_out):
+        try:
+            if stage.stream:
+                wait_time = inputs.wait_time
+                outputs = stage.function(item for seq, item in inputs)
+                start = time.perf_counter()
+                for seq, output in enumerate(outputs):
+                    # Time blocked on the input queue is not busy time
+                    stage.record(time.perf_counter() - start - wait_time[0], q_in.qsize())
+                    wait_time[0] = 0.0
+                    if q_out is not None and not self.put(q_out, (seq, output)):
+                        return
+                    start = time.perf_counter()
+            else:
+                while not self.stopped.is_set():
+                    with inputs.lock: # workers share the ordered input
+                        seq, item = next(inputs, (None, _END))
+                    if item is _END:
+                        break
+                    depth = q_in.qsize()
+                    start = time.perf_counter()
+                    output = stage.function(item)
+                    stage.record(time.perf_counter() - start, depth)
+                    if q_out is not None and not self.put(q_out, (seq, output)):
+                        return
+        except Exception as e:
+            self.fail(e)
+        finally:
+            if q_out is not None:
+                self.put(q_out, _END) # one end marker per worker
+
+    def inputs(self, q_in, producers):
+        """
+        Ordered input of a stage, shared by all its workers.
+        """
+        wait_time = [0.0]
+        return _Inputs(self.ordered(q_in, producers, wait_time), wait_time)
+
+    def run(self):
+        """
+        Run every stage until the source is exhausted. Errors of any stage are raised here.
+        """
+        start = time.perf_counter()
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        queues.append(None) # the last stage is the sink
+
+        threads = [threading.Thread(target=self.run_source, args=(queues[0],), daemon=True, name=self.source_stage.name)]
+        producers = 1
+        for i, stage in enumerate(self.stages):
+            inputs = self.inputs(queues[i], producers)
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=self.run_stage, args=(stage, inputs, queues[i], queues[i + 1]), daemon=True, name=stage.name))
+            producers = stage.workers
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.perf_counter() - start
+        if self.error is not None:
+            raise self.error
+
+    def stats(self):
+        """
+        Per stage: items processed, busy time (summed over workers), utilisation of its workers,
+        mean and max depth of its input queue.
+        """
+        stats = []
+        for stage in [self.source_stage] + self.stages:
+            stats.append({
+                "stage": stage.name,
+                "workers": stage.workers,
+                "items": stage.items,
+                "busy_time": stage.busy_time,
+                "utilisation": stage.busy_time / (self.wall_time * stage.workers) if self.wall_time > 0 else 0.0,
+                "queue_mean": stage.depth_sum / stage.items if stage.items else 0.0,
+                "queue_max": stage.depth_max,
+            })
+        return stats
+
+    def report(self):
+        print(f"{'stage':>12} {'workers':>8} {'items':>7} {'busy s':>8} {'busy %':>7} {'queue':>6} {'max':>4}")
+        for s in self.stats():
+            print(f"{s['stage']:>12} {s['workers']:>8} {s['items']:>7} {s['busy_time']:>8.2f} {s['utilisation']:>7.1%} {s['queue_mean']:>6.1f} {s['queue_max']:>4}")
@@ -0,0 +1,66 @@
+import queue
+import time
+import cv2
+
+####################################################
+################ PreviewQueue Class ################
+####################################################
+#
+# Messages from a processing thread to the Tk main thread, which is the only one
+# allowed to touch the widgets. The processing thread gives every frame to callback(),
+# only a few progress updates and previews per second go through the queue:
+#   ("progress", progress, frame_index)
+#   ("preview", rgb_image)     downscaled to fit in size
+#   ("done", seconds) / ("error", exception)
+
+class PreviewQueue:
+    def __init__(self, size=(600, 320), interval=0.1):
+        self.size = size # (width, height) the previews must fit in
+        self.interval = interval # minimum seconds between two messages
+        self.queue = queue.Queue()
+        self.last_time = 0.0
+        self.previews = 0
+
+    def callback(self, progress, frame_index, frame):
+        """
+        Detection callback, called by the processing thread for every frame.
+        """
+        now = time.perf_counter()
+        if now - self.last_time < self.interval and progress < 1:
+            return
+        self.last_time = now
+        self.queue.put(("progress", progress, frame_index))
+        if frame is not None:
+            self.queue.put(("preview", self.downscale(frame)))
+            self.previews += 1
+
+    def downscale(self, frame):
+        """
+        Nearest neighbour resize to fit in size (aspect ratio kept), then BGR -> RGB on the small image.
+        """
+        height, width = frame.shape[:2]
+        scale = min(self.size[0] / width, self.size[1] / height, 1.0)
+        small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))), interpolation=cv2.INTER_NEAREST)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+
+    def done(self, seconds):
+        self.queue.put(("done", seconds))
+
+    def fail(self, error):
+        self.queue.put(("error", error))
+
+    def messages(self):
+        """
+        Messages waiting in the queue (called by the Tk main thread, never blocks).
+        Only the last preview is kept: older ones would be replaced before being seen.
+        """
+        messages = []
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "preview":
+                messages = [m for m in messages if m[0] != "preview"]
+            messages.append(message)
+        return messages
@@ -0,0 +1,157 @@
+import json
+import cv2
+import numpy as np
+import torch
+from torchvision.ops import nms
+from ultralytics.engine.results import Results
+from Tracking import downscale
+
+####################################################
+################## Regions Class ###################
+####################################################
+#
+# Fixed cameras: the detector only runs on the areas where people can appear.
+# The active area is the union of the include polygons (the whole frame without any),
+# minus the exclude polygons. Each connected part of it is cropped to its bounding
+# rectangle, and optionally cut into overlapping tiles so that small, distant people
+# are seen at native resolution. Pixels of a crop outside the active area are painted
+# gray, the detections of every crop are moved back to frame coordinates and the
+# duplicates found on overlapping tiles are removed: NMS, then the partial boxes of people
+# cut by a tile edge are dropped when another box contains them.
+# Polygons are lists of [x, y] points in pixels. A JSON file can hold one configuration:
+#   {"include": [[[0, 200], [1920, 200], [1920, 1080], [0, 1080]]], "exclude": [], "tile_size": 640}
+
+FILL = 114 # gray of the ultralytics letterbox
+
+
+class Regions:
+    def __init__(self, include=None, exclude=None, tile_size=None, tile_overlap=0.2, nms_iou=0.5, contained=0.8):
+        self.include = [np.array(polygon, dtype=np.int32) for polygon in include or []]
+        self.exclude = [np.array(polygon, dtype=np.int32) for polygon in exclude or []]
+        self.tile_size = tile_size # longest side of a tile in pixels (None: one crop per area)
+        self.tile_overlap = tile_overlap # fraction of a tile shared with the next one
+        self.nms_iou = nms_iou
+        self.contained = contained # share of a cut box inside another box to drop it
+        self.shape = None
+        self.mask = None
+        self.crops = [] # (x1, y1, x2, y2, crop mask or None when the crop is fully active)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config.get("include"), config.get("exclude"), config.get("tile_size"),
+                   config.get("tile_overlap", 0.2), config.get("nms_iou", 0.5), config.get("contained", 0.8))
+
+    def prepare(self, shape):
+        """
+        Active mask and crops of frames of this shape (computed once per frame size).
+        """
+        if self.shape == shape[:2]:
+            return
+        self.shape = shape[:2]
+        height, width = self.shape
+        if self.include:
+            self.mask = np.zeros((height, width), dtype=np.uint8)
+            cv2.fillPoly(self.mask, self.include, 255)
+        else:
+            self.mask = np.full((height, width), 255, dtype=np.uint8)
+        if self.exclude:
+            cv2.fillPoly(self.mask, self.exclude, 0)
+
+        self.crops = []
+        count, _, stats, _ = cv2.connectedComponentsWithStats(self.mask)
+        for x, y, w, h, _ in stats[1:count]: # component 0 is the inactive area
+            for x1, y1, x2, y2 in self.tiles(x, y, x + w, y + h):
+                crop_mask = self.mask[y1:y2, x1:x2]
+                active = np.count_nonzero(crop_mask)
+                if active == 0:
+                    continue
+                self.crops.append((x1, y1, x2, y2, None if active == crop_mask.size else crop_mask > 0))
+
+    def tiles(self, x1, y1, x2, y2):
+        """
+        Tiles of at most tile_size covering a rectangle, overlapping by tile_overlap.
+        """
+        if self.tile_size is None:
+            return [(x1, y1, x2, y2)]
+        step = max(1, int(self.tile_size * (1 - self.tile_overlap)))
+
+        def starts(low, high):
+            if high - low <= self.tile_size:
+                return [low]
+            positions = list(range(low, high - self.tile_size, step))
+            return positions + [high - self.tile_size] # last tile flush with the edge
+
+        return [(x, y, min(x + self.tile_size, x2), min(y + self.tile_size, y2))
+                for y in starts(y1, y2) for x in starts(x1, x2)]
+
+    def active_fraction(self):
+        """
+        Share of the frame pixels given to the detector.
+        """
+        height, width = self.shape
+        return sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2, _ in self.crops) / (height * width)
+
+    def detect(self, model, frame, inference_size=None, **options):
+        """
+        model.predict on the crops of one frame, as a single batch. Returns one Results with
+        the detections in frame coordinates, frame as orig_img.
+        """
+        self.prepare(frame.shape)
+        images, scales = [], []
+        for x1, y1, x2, y2, crop_mask in self.crops:
+            crop = frame[y1:y2, x1:x2]
+            if crop_mask is not None:
+                crop = crop.copy()
+                crop[~crop_mask] = FILL
+            crop, scale = downscale(crop, inference_size)
+            images.append(crop)
+            scales.append(scale)
+
+        data, cut = [torch.zeros((0, 6))], [torch.zeros(0, dtype=torch.bool)]
+        if images:
+            for crop, scale, result in zip(self.crops, scales, model.predict(images, batch=len(images), **options)):
+                boxes = result.boxes.data.cpu().clone()
+                boxes[:, :4] *= scale
+                boxes[:, [0, 2]] += crop[0]
+                boxes[:, [1, 3]] += crop[1]
+                data.append(boxes)
+                cut.append(self.cut_boxes(boxes, crop))
+        data, cut = torch.cat(data), torch.cat(cut)
+        if len(self.crops) > 1 and len(data) > 1:
+            keep = nms(data[:, :4], data[:, 4], self.nms_iou)
+            data, cut = data[keep], cut[keep]
+            data = data[~self.contained_boxes(data, cut)]
+        return Results(frame, path="", names=model.names, boxes=data)
+
+    def cut_boxes(self, boxes, crop, margin=2):
+        """
+        Boxes touching an edge of the crop that is not an edge of the frame: the person may go on in the next tile.
+        """
+        height, width = self.shape
+        x1, y1, x2, y2 = crop[:4]
+        cut = torch.zeros(len(boxes), dtype=torch.bool)
+        if x1 > 0:
+            cut |= boxes[:, 0] <= x1 + margin
+        if y1 > 0:
+            cut |= boxes[:, 1] <= y1 + margin
+        if x2 < width:
+            cut |= boxes[:, 2] >= x2 - margin
+        if y2 < height:
+            cut |= boxes[:, 3] >= y2 - margin
+        return cut
+
+    def contained_boxes(self, data, cut):
+        """
+        Cut boxes lying for the most part (contained) inside another, larger box.
+        """
+        if not cut.any():
+            return cut
+        boxes = data[:, :4]
+        top_left = torch.maximum(boxes[:, None, :2], boxes[None, :, :2])
+        bottom_right = torch.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+        inter = (bottom_right - top_left).clamp(min=0).prod(dim=2)
+        area = (boxes[:, 2:] - boxes[:, :2]).prod(dim=1)
+        inside = (inter / area.clamp(min=1e-9)[:, None] >= self.contained) & (area[None, :] > area[:, None])
+        return cut & inside.any(dim=1)
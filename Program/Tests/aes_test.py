@@ -0,0 +1,55 @@
+import os
+import sys
+import numpy as np
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import AESCipher
+
+
+def legacy_aes_encrypt(region, key, iv):
+    """
+    Block by block CBC encryption, as written before AESCipher (reference output).
+    """
+    cipher = AES.new(key, AES.MODE_CBC, iv)
+    region_bytes = region.tobytes()
+    num_blocks = len(region_bytes) // 16
+    encrypted_bytes = b''
+    for i in range(num_blocks):
+        encrypted_bytes += cipher.encrypt(region_bytes[i * 16:(i + 1) * 16])
+    encrypted_bytes += region_bytes[num_blocks * 16:]
+    return np.frombuffer(encrypted_bytes, dtype=np.uint8).reshape(region.shape)
+
+
+key = get_random_bytes(16)
+frame = np.random.randint(0, 256, (120, 160, 3), dtype=np.uint8)
+
+# Region sizes with and without a trailing remainder, taken as views like in Detection.blur
+for shape in [(16, 16, 3), (7, 5, 3), (33, 21, 3), (1, 1, 3), (40, 11)]:
+    region = frame[10:10 + shape[0], 20:20 + shape[1]] if len(shape) == 3 else frame[10:10 + shape[0], 20:20 + shape[1], 0]
+    iv = get_random_bytes(16)
+
+    # CBC output is byte-identical to the old per-block loop
+    encrypted_region, _ = AESCipher.aes_encrypt(region, key, "CBC", iv)
+    assert np.array_equal(encrypted_region, legacy_aes_encrypt(region, key, iv)), "CBC output changed!"
+
+    for mode in AESCipher.MODES:
+        encrypted_region, iv = AESCipher.aes_encrypt(region, key, mode)
+        decrypted_region = AESCipher.aes_decrypt(encrypted_region, key, iv, region.shape, mode)
+        assert np.array_equal(region, decrypted_region), f"AES {mode} decryption failed!"
+
+        # Selective CBC only keeps the ciphertext of the region bytes, not of the padding,
+        # so the last partial block is only restored exactly for sizes multiple of 16
+        if mode == "CBC" and region.size % 16 != 0:
+            continue
+        encrypted_region, iv, encrypted_msb = AESCipher.selective_encrypt(region, key, mode)
+        decrypted_region = AESCipher.selective_decrypt(encrypted_region, key, iv, region.shape, encrypted_msb, mode)
+        assert np.array_equal(region, decrypted_region), f"Selective {mode} decryption failed!"
+
+# CTR leaves no byte in clear
+region = frame[:7, :5]
+encrypted_region, iv = AESCipher.aes_encrypt(region, key, "CTR")
+assert np.count_nonzero(encrypted_region.reshape(-1)[-(region.size % 16):] != region.reshape(-1)[-(region.size % 16):]) > 0
+
+print("Test passed!")
@@ -0,0 +1,86 @@
+import os
+import sys
+from types import SimpleNamespace
+import numpy as np
+import torch
+import yaml
+from ultralytics.engine.results import Results
+from ultralytics.trackers.basetrack import BaseTrack
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.trackers.track import on_predict_postprocess_end
+from ultralytics.utils import IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+
+# Batched tracking (track_batches: model.predict on batches, BatchTracker frame by frame) gives
+# the same track IDs and boxes as model.track on every frame, new tracks hidden until confirmed
+# included. model.track is emulated with ultralytics' own tracking callback.
+
+WIDTH, HEIGHT, FRAMES = 320, 240, 40
+
+
+def detections(i):
+    """
+    Raw detections of frame i: x1, y1, x2, y2, confidence, class.
+    """
+    rows = [[10 + 3 * i, 40, 70 + 3 * i, 200, 0.9, 0]] # A crosses the whole video
+    if 5 <= i < 30:
+        rows.append([250 - 2 * i, 30, 300 - 2 * i, 190, 0.8 if i % 6 else 0.2, 0]) # B, weak on some frames
+    if i == 12 or 20 <= i < 23:
+        rows.append([150, 150, 200, 230, 0.7, 0]) # C: a single frame (never confirmed), then three
+    if i % 7 == 3:
+        rows.append([5, 5, 25, 25, 0.05, 0]) # below the tracking threshold
+    return torch.tensor(rows, dtype=torch.float32)
+
+
+class FakeModel:
+    names = {0: "person"}
+
+    def __init__(self):
+        with open(check_yaml("bytetrack.yaml")) as f:
+            cfg = IterableSimpleNamespace(**yaml.safe_load(f))
+        self.predictor = SimpleNamespace(args=SimpleNamespace(mode="track", task="detect"), dataset=SimpleNamespace(mode="video"),
+                                         trackers=[BYTETracker(args=cfg)], vid_path=[None], results=None)
+
+    def predict(self, images, conf=0.25, **options):
+        results = []
+        for image in images:
+            rows = detections(int(image[0, 0, 0]))
+            results.append(Results(image, path="", names=self.names, boxes=rows[rows[:, 4] >= conf]))
+        return results
+
+    def track(self, image, conf=0.1, **options):
+        self.predictor.results = self.predict([image], conf)
+        on_predict_postprocess_end(self.predictor, persist=True)
+        return self.predictor.results
+
+
+def tracks(tracked):
+    output = []
+    for frame, results in tracked:
+        boxes = results[0].boxes
+        ids = [] if boxes.id is None else boxes.id.int().tolist()
+        output.append(sorted(zip(ids, boxes.xyxy.round().int().tolist())))
+    return output
+
+
+frames = [np.full((HEIGHT, WIDTH, 3), i, dtype=np.uint8) for i in range(FRAMES)]
+BaseTrack.reset_id()
+reference = tracks(Detection(None, os.devnull, model=FakeModel()).track_frames(frames))
+
+# The scene is tracked as expected: C's single frame hidden, C then shown once confirmed
+assert all(len(frame) >= 1 for frame in reference)
+assert len(reference[12]) == len(reference[11]) and len(reference[20]) == len(reference[19]), "new track shown before confirmation"
+assert len(reference[21]) == len(reference[19]) + 1
+assert len({track_id for frame in reference for track_id, _ in frame}) == 3
+
+for batch_size in (1, 3, 4, 16):
+    BaseTrack.reset_id()
+    batched = tracks(Detection(None, os.devnull, model=FakeModel()).track_batches(iter(frames), batch_size))
+    assert len(batched) == FRAMES
+    for i, (a, b) in enumerate(zip(reference, batched)):
+        assert a == b, (batch_size, i, a, b)
+
+print("Test passed!")
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Benchmarks"))
+import suite
+
+# Benchmark suite: a quick run gives every measure, saved as JSON, and compare flags
+# the measures slower than the baseline by more than the threshold.
+
+
+def result(seconds):
+    return {"seconds": seconds, "work": 10, "unit": "frames", "rate": 10 / seconds, "spread": 0.0}
+
+
+if __name__ == "__main__":
+    # compare
+    baseline = {"meta": {}, "results": {"a/decode": result(1.0), "a/track": result(2.0), "a/old": result(1.0)}}
+    current = {"meta": {}, "results": {"a/decode": result(1.05), "a/track": result(2.5), "a/new": result(1.0)}}
+    rows, regressions = suite.compare(baseline, current, threshold=0.1)
+    statuses = {key: status for key, _, _, _, status in rows}
+    assert regressions == ["a/track"]
+    assert statuses == {"a/decode": "ok", "a/track": "REGRESSION", "a/new": "new", "a/old": "missing"}
+    _, regressions = suite.compare(current, baseline, threshold=0.1)
+    assert regressions == [] # faster is never a regression
+
+    # Quick run without network, then compare with itself through the command line
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, "baseline.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert suite.main(["run", "--quick", "--no-network", "--output", output]) == 0
+        with open(output) as f:
+            report = json.load(f)
+        names = [name for name, _, _ in suite.measures()]
+        scenario = next(iter(suite.SCENARIOS))
+        assert list(report["results"]) == [f"{scenario}/{name}" for name in names]
+        assert all(r["seconds"] > 0 and r["work"] > 0 for r in report["results"].values())
+        assert report["meta"]["network"] == "none" and report["meta"]["cpu_count"] == os.cpu_count()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert suite.main(["compare", output, output]) == 0
+
+        slower = json.loads(json.dumps(report))
+        slower["results"][f"{scenario}/track"]["seconds"] *= 2
+        slower_path = os.path.join(directory, "slower.json")
+        with open(slower_path, "w") as f:
+            json.dump(slower, f)
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert suite.main(["compare", output, slower_path, "--threshold", "0.2"]) == 1
+
+    print("Test passed!")
@@ -0,0 +1,146 @@
+import multiprocessing
+import os
+import sys
+import tempfile
+import tracemalloc
+import numpy as np
+import cv2
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+import AESCipher
+
+# Detection.blur on synthetic tracked boxes, two of them overlapping.
+
+HEIGHT, WIDTH = 480, 640
+BOXES = [  # x1, y1, x2, y2, track ID
+    [50, 40, 250, 400, 1],
+    [200, 100, 380, 450, 2],  # overlaps box 1
+    [500, 300, 630, 470, 3],
+    [600, 10, 700, 100, 4],   # out of the frame: ignored
+]
+
+
+def make_results(frame):
+    data = torch.tensor([box[:4] + [box[4], 0.9, 0] for box in BOXES], dtype=torch.float32)
+    return [Results(frame, path="", names={0: "person"}, boxes=data)]
+
+
+def make_detection(method, directory):
+    return Detection(None, os.devnull, True, method, model=object(),
+                     frame_data_path=os.path.join(directory, "frame_data.bin"), keys_path=os.path.join(directory, "aes_keys.txt"))
+
+
+def expected_output(detection, frame):
+    """
+    Reference: every box blurred from the original pixels, written back in box order.
+    """
+    output = frame.copy()
+    for x1, y1, x2, y2, _ in BOXES[:3]:
+        region = frame[y1 + 2:y2 - 2, x1 + 2:x2 - 2].copy()
+        blurred = detection.gaussian_blur(region) if detection.censored_method == 'Gaussian' else detection.pixelate(region)
+        output[y1 + 2:y2 - 2, x1 + 2:x2 - 2] = blurred
+    return output
+
+
+# Encryption pools give the same frame and metadata as the serial path, for the same IVs
+# (process pools re-import this script: the whole test runs in the main process only)
+def counter_ivs():
+    counter = iter(range(1 << 30))
+    return lambda: next(counter).to_bytes(16, "big")
+
+
+def compare_pools(original, directory):
+    for method in ["AES", "Selective"]:
+        outputs = []
+        for workers, executor in [(1, "thread"), (4, "thread"), (2, "process")]:
+            detection = make_detection(method, directory)
+            detection.aes_mode = "CTR"
+            detection.aes_keys = {track_id: bytes([track_id]) * 16 for track_id in range(1, 5)}
+            detection.encrypt_workers, detection.encrypt_executor = workers, executor
+            AESCipher.generate_iv = counter_ivs()
+            frame = original.copy()
+            frame_data = detection.blur(frame, make_results(frame), 0)
+            detection.close_encrypt_pool()
+            outputs.append((frame, frame_data))
+
+        for frame, frame_data in outputs[1:]:
+            assert np.array_equal(frame, outputs[0][0]), f"{method}: parallel output differs!"
+            for bbox, reference in zip(frame_data["bboxes"], outputs[0][1]["bboxes"]):
+                assert bbox.keys() == reference.keys()
+                for name in bbox:
+                    assert np.array_equal(bbox[name], reference[name]), f"{method}: parallel metadata differs ({name})!"
+
+
+def pool_worker_executor(directory):
+    """
+    Encryption pool of a Detection asking for processes, inside a (daemonic) pool process.
+    """
+    detection = make_detection("AES", directory)
+    detection.encrypt_workers, detection.encrypt_executor = 2, "process"
+    frame = np.random.randint(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    frame_data = detection.blur(frame, make_results(frame), 0)
+    executor = type(detection.get_encrypt_pool()).__name__
+    detection.close_encrypt_pool()
+    return executor, len(frame_data["bboxes"])
+
+
+if __name__ == "__main__":
+    original = np.random.randint(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for method in ["Gaussian", "Pixelate"]:
+            detection = make_detection(method, directory)
+            frame = original.copy()
+            results = make_results(frame)
+            tracemalloc.start()
+            assert detection.blur(frame, results, 0) is None
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert np.array_equal(frame, expected_output(detection, original)), f"{method} output changed!"
+            assert peak < frame.nbytes, f"{method}: a full frame was allocated ({peak} bytes)"
+
+        for method in ["AES", "Selective"]:
+            for mode in AESCipher.MODES:
+                detection = make_detection(method, directory)
+                detection.aes_mode = mode
+                frame = original.copy()
+                frame_data = detection.blur(frame, make_results(frame), 7)
+                assert frame_data["frame_index"] == 7 and frame_data["mode"] == mode
+                assert [bbox["id"] for bbox in frame_data["bboxes"]] == [1, 2, 3], "Boxes lost or out of order!"
+
+                # Each record holds the encryption of the original pixels of its box
+                for bbox in frame_data["bboxes"]:
+                    x1, y1, x2, y2 = bbox["coords"]
+                    region = original[y1:y2, x1:x2]
+                    if method == "AES":
+                        decrypted = AESCipher.aes_decrypt(bbox["region"], bbox["key"], bbox["iv"], region.shape, mode)
+                        assert np.array_equal(decrypted, region), f"{method} {mode}: box {bbox['id']} not restored!"
+                    elif mode == "CTR" or region.size % 16 == 0:
+                        decrypted = AESCipher.selective_decrypt(bbox["region"], bbox["key"], bbox["iv"], region.shape, bbox["encrypted_msb"], mode)
+                        assert np.array_equal(decrypted, region), f"{method} {mode}: box {bbox['id']} not restored!"
+
+                # The last box wins where boxes overlap
+                x1, y1, x2, y2 = frame_data["bboxes"][1]["coords"]
+                assert np.array_equal(frame[y1:y2, x1:x2], frame_data["bboxes"][1]["region"])
+
+        compare_pools(original, directory)
+
+        # Job workers are daemonic: the process executor falls back to threads there
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            assert pool.apply(pool_worker_executor, (directory,)) == ("ThreadPoolExecutor", 3)
+
+    # Fast Gaussian: close to an exact blur of the same sigma, which grows with the box size
+    detection = Detection(None, os.devnull, True, "Gaussian", model=object(), fast_blur=True)
+    smooth = cv2.resize(original, (WIDTH * 4, HEIGHT * 4), interpolation=cv2.INTER_CUBIC)
+    for height, width in [(3, 2), (30, 12), (300, 120), (1000, 400)]:
+        region = smooth[:height, :width]
+        blurred = detection.gaussian_blur(region)
+        assert blurred.shape == region.shape
+        sigma = max(detection.blur_strength * min(height, width), 2.0)
+        exact = cv2.GaussianBlur(region, (0, 0), sigma)
+        assert np.abs(blurred.astype(np.int16) - exact).mean() < 0.02 * 255, f"Fast blur too far from the exact blur ({width}x{height})"
+
+    print("Test passed!")
@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+from VideoReader import VideoReader
+from FrameData import FrameDataReader
+import AESCipher
+from helpers import RectangleModel, write_video
+
+# A run interrupted in the middle of a segment, then resumed, gives the same boxes,
+# track IDs and metadata as an uninterrupted run.
+
+WIDTH, HEIGHT, FRAMES, SEGMENT = 320, 240, 100, 20
+
+
+def frames():
+    for i in range(FRAMES):
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (10 + i, 20), (50 + i, 120), (255, 255, 255), -1)
+        if i >= 50: # a new person after the crash
+            cv2.rectangle(frame, (250, 100 + i // 2), (290, 200 + i // 2), (255, 255, 255), -1)
+        yield frame
+
+
+def run(directory, name, model, resume=False):
+    detection = Detection(VideoReader(os.path.join(directory, "input.mp4")), os.path.join(directory, name + ".mp4"), True, "AES",
+                          model=model, frame_data_path=os.path.join(directory, name + ".bin"), keys_path=os.path.join(directory, name + "_keys.txt"))
+    detection.process(checkpoint_every=SEGMENT, resume=resume)
+    return detection
+
+
+def load(directory, name):
+    with FrameDataReader(os.path.join(directory, name + ".bin")) as reader:
+        records = [(r["frame_index"], [(b["id"], b["coords"], b["key"], b["iv"], b["region"].copy()) for b in r["bboxes"]]) for r in reader]
+    with open(os.path.join(directory, name + "_keys.txt")) as f:
+        keys = [line.strip() for line in f]
+    return records, keys
+
+
+with tempfile.TemporaryDirectory() as directory:
+    write_video(os.path.join(directory, "input.mp4"), frames())
+    run(directory, "reference", RectangleModel(min_area=100))
+
+    try:
+        run(directory, "resumed", RectangleModel(min_area=100, fail_after=55))
+        raise AssertionError("The run did not crash!")
+    except RuntimeError as e:
+        assert str(e) == "crash"
+    assert os.path.exists(os.path.join(directory, "resumed.mp4.segments", "checkpoint.pkl")), "No checkpoint!"
+
+    model = RectangleModel(min_area=100)
+    detection = run(directory, "resumed", model, resume=True)
+    assert len(model.shapes) == FRAMES - 40, f"Resumed from the wrong frame ({FRAMES - len(model.shapes)})"
+    assert detection.frames_processed == FRAMES - 40
+    assert not os.path.exists(os.path.join(directory, "resumed.mp4.segments")), "Segments not removed!"
+
+    capture = cv2.VideoCapture(os.path.join(directory, "resumed.mp4"))
+    assert int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) == FRAMES, "Frames lost in the output video!"
+    capture.release()
+
+    reference, reference_keys = load(directory, "reference")
+    resumed, resumed_keys = load(directory, "resumed")
+    assert [r[0] for r in resumed] == list(range(FRAMES)), "Frame records lost!"
+    assert {box[0] for r in resumed for box in r[1]} == {1, 2}, "Unexpected track IDs!"
+    assert len(resumed_keys) == 2, "Key table not rebuilt!"
+    keys = {}
+    for line in resumed_keys:
+        track_id, key = line.replace("ID: ", "").split(", Key: ")
+        keys[int(track_id)] = bytes.fromhex(key)
+    for (frame_index, boxes), (_, reference_boxes) in zip(resumed, reference):
+        assert [(b[0], b[1]) for b in boxes] == [(b[0], b[1]) for b in reference_boxes], f"Frame {frame_index}: boxes differ!"
+        for track_id, coords, key, iv, region in boxes:
+            assert key == keys[track_id], "Record key not in the key table!"
+            decrypted = AESCipher.aes_decrypt(region, key, iv, region.shape, "CBC")
+            assert decrypted.mean() > 100, "Region not decrypted!"
+
+print("Test passed!")
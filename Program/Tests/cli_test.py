@@ -0,0 +1,43 @@
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Cli import expand_inputs, job_names, main
+
+# Inputs of the command line tool: files, folders and patterns expanded without duplicates,
+# and output names unique even for inputs with the same file name.
+
+with tempfile.TemporaryDirectory() as directory:
+    files = ["a/x.mp4", "b/x.mp4", "x.mp4", "x.png", "y.MP4", "notes.txt", "a/z.jpg"]
+    for name in files:
+        path = os.path.join(directory, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, "w").close()
+    join = lambda *names: [os.path.join(directory, name) for name in names]
+
+    # Folders give the videos and images directly inside, patterns are expanded, each path once
+    assert expand_inputs([directory]) == join("x.mp4", "x.png", "y.MP4")
+    assert expand_inputs(join("a", "x.mp4", "a/x.mp4") + [os.path.join(directory, "*", "*.mp4")]) == join("a/x.mp4", "a/z.jpg", "x.mp4", "b/x.mp4")
+    assert expand_inputs(join("notes.txt", "missing.mp4")) == []
+
+    # Unique names: path relative to the common folder, then extension
+    paths = join("a/x.mp4", "b/x.mp4", "x.mp4", "x.png", "y.MP4", "a/z.jpg")
+    names = job_names(paths)
+    assert names == [("a_x", ".mp4"), ("b_x", ".mp4"), ("x_mp4", ".mp4"), ("x_png", ".png"), ("y", ".MP4"), ("z", ".jpg")], names
+    assert job_names(join("x.mp4", "x.mp4"), live=True) == [("x_mp4_0", ".mp4"), ("x_mp4_1", ".mp4")] # the same file replayed twice
+    assert job_names(join("a/X.mp4", "b/x.mp4")) == [("a_X", ".mp4"), ("b_x", ".mp4")] # case-insensitive file systems
+    assert job_names([]) == []
+
+    # Live sources: streams are numbered, replayed files keep their name
+    assert job_names(["rtsp://camera/1", "0", os.path.join(directory, "x.mp4")], live=True) == \
+        [("live_0", ".mp4"), ("live_1", ".mp4"), ("x", ".mp4")]
+
+    # Options that can't run together are refused before any job starts
+    output_dir = os.path.join(directory, "out")
+    videos = join("x.mp4", "y.MP4")
+    for options in (["--workers", "2", "--segment-workers", "2"], ["--live", "--threaded"]):
+        assert main(["anonymise", *videos, "--output-dir", output_dir, *options]) == 1, options
+    assert not os.path.exists(output_dir)
+
+print("Test passed!")
@@ -0,0 +1,67 @@
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+from Decrypt import Decrypt
+from VideoReader import VideoReader
+from helpers import BoxesModel, write_video, noise_frames, read_video
+
+# Parallel decryption gives the same frames, in the same order, as the serial one:
+# boxes on a thread or process pool, and time segments in separate processes.
+
+WIDTH, HEIGHT, FRAMES = 320, 240, 40
+
+
+# Three people standing still, the last two overlapping
+PEOPLE = [[10, 20, 90, 200, 1], [120, 30, 200, 220, 2], [170, 40, 260, 230, 3]]
+
+
+def decrypted_frames(directory, method, **options):
+    decrypt = Decrypt(os.path.join(directory, "encrypted.mp4"), os.devnull, os.path.join(directory, f"frame_data_{method}.bin"),
+                      [1, 3], **options)
+    reader = VideoReader(decrypt.video_path)
+    frames = list(decrypt.stream(reader, 0, reader.frame_count))
+    reader.release()
+    decrypt.close_pool()
+    decrypt.frame_data.close()
+    return frames
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.mp4")
+        write_video(source, noise_frames(FRAMES, WIDTH, HEIGHT))
+        for method in ("AES", "Selective"):
+            detection = Detection(VideoReader(source), os.path.join(directory, "encrypted.mp4"), True, method, model=BoxesModel(PEOPLE),
+                                  frame_data_path=os.path.join(directory, f"frame_data_{method}.bin"), keys_path=os.devnull)
+            detection.process()
+
+            serial = decrypted_frames(directory, method)
+            assert [index for index, _ in serial] == list(range(FRAMES))
+            for options in ({"workers": 3, "buffer_size": 4}, {"workers": 2, "executor": "process"}):
+                parallel = decrypted_frames(directory, method, **options)
+                assert [index for index, _ in parallel] == list(range(FRAMES)), options
+                for (_, a), (_, b) in zip(serial, parallel):
+                    assert np.array_equal(a, b), (method, options)
+
+        # Segments: same frames, encoded in two parts then joined
+        encrypted = os.path.join(directory, "encrypted.mp4")
+        frame_data = os.path.join(directory, "frame_data_Selective.bin")
+        outputs = {}
+        # (segments decrypt their boxes on threads even with the process executor)
+        for segment_workers, executor in ((1, "thread"), (2, "thread"), (2, "process")):
+            output = os.path.join(directory, f"decrypted_{segment_workers}_{executor}.mp4")
+            decrypt = Decrypt(encrypted, output, frame_data, workers=2, executor=executor)
+            decrypt.process(start_frame=5, end_frame=35, segment_workers=segment_workers)
+            assert decrypt.frames_written == 30
+            outputs[segment_workers, executor] = read_video(output)
+        reference = outputs[1, "thread"]
+        for key in ((2, "thread"), (2, "process")):
+            assert len(outputs[key]) == len(reference) == 30, key
+            difference = np.mean([np.abs(a.astype(np.int16) - b).mean() for a, b in zip(reference, outputs[key])])
+            assert difference < 8, (key, difference) # same frames, encoded from another keyframe (lossy on noise)
+
+    print("Test passed!")
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Encoder import open_encoder, encode
+from VideoSegments import ffmpeg_path
+from VideoReader import VideoReader
+from Detection import Detection
+from helpers import BoxesModel, read_video
+
+# Both encoder backends write readable videos from any frame iterator, with their options.
+
+WIDTH, HEIGHT, FRAMES = 320, 240, 30
+
+
+def frames(count=FRAMES):
+    """
+    Smooth moving frames, a generator: nothing is kept in memory.
+    """
+    x = np.linspace(0, 255, WIDTH)
+    for i in range(count):
+        gray = np.tile((x + 4 * i) % 256, (HEIGHT, 1)).astype(np.uint8)
+        yield cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
+
+
+def check(path, count=FRAMES):
+    decoded = read_video(path)
+    assert len(decoded) == count, (path, len(decoded))
+    assert decoded[0].shape == (HEIGHT, WIDTH, 3)
+    for original, frame in zip(frames(count), decoded):
+        assert np.abs(original.astype(np.int16) - frame).mean() < 6, path
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        backends = [{"backend": "opencv"}]
+        if ffmpeg_path() is not None:
+            backends += [{"backend": "ffmpeg"},
+                         {"backend": "ffmpeg", "codec": "libx264", "preset": "ultrafast", "threads": 1, "bitrate": "500k"},
+                         {"backend": "ffmpeg", "codec": "mpeg4"}]
+        else:
+            print("ffmpeg not found: only the OpenCV backend is tested")
+
+        for k, options in enumerate(backends):
+            path = os.path.join(directory, f"video_{k}.mp4")
+            assert encode(frames(), path, 25, **options) == FRAMES
+            check(path)
+
+        if ffmpeg_path() is not None:
+            # Views of a larger frame (not contiguous) are accepted
+            path = os.path.join(directory, "views.mp4")
+            out = open_encoder(path, 25, (WIDTH, HEIGHT), "ffmpeg")
+            for frame in frames():
+                padded = np.zeros((HEIGHT + 20, WIDTH + 20, 3), dtype=np.uint8)
+                padded[10:-10, 10:-10] = frame
+                out.write(padded[10:-10, 10:-10])
+            out.release()
+            check(path)
+
+            # Odd sizes are padded to even ones (yuv420p), the picture is kept
+            path = os.path.join(directory, "odd.mp4")
+            odd = [np.full((241, 321, 3), 4 * i, dtype=np.uint8) for i in range(FRAMES)]
+            assert encode(odd, path, 25, backend="ffmpeg") == FRAMES
+            decoded = read_video(path)
+            assert len(decoded) == FRAMES and decoded[0].shape == (242, 322, 3)
+            for original, frame in zip(odd, decoded):
+                assert np.abs(original.astype(np.int16) - frame[:241, :321]).mean() < 6
+
+            # Wrong sizes and unknown codecs are errors
+            out = open_encoder(os.path.join(directory, "size.mp4"), 25, (WIDTH, HEIGHT), "ffmpeg")
+            try:
+                out.write(np.zeros((HEIGHT, WIDTH + 2, 3), dtype=np.uint8))
+                assert False, "wrong size accepted"
+            except ValueError:
+                pass
+            out.release()
+            try:
+                encode(frames(), os.path.join(directory, "codec.mp4"), 25, backend="ffmpeg", codec="no_such_codec")
+                assert False, "unknown codec accepted"
+            except RuntimeError:
+                pass
+
+            # Detection and VideoReader.to_video through the ffmpeg backend
+            source = os.path.join(directory, "video_0.mp4")
+            output = os.path.join(directory, "detection.mp4")
+            Detection(VideoReader(source), output, True, "Pixelate", model=BoxesModel([[40, 40, 120, 200, 1]]), encoder={"backend": "ffmpeg", "preset": "ultrafast"}).process()
+            assert len(read_video(output)) == FRAMES
+            reader = VideoReader(source)
+            output = os.path.join(directory, "to_video.mp4")
+            reader.to_video(frames(), output, backend="ffmpeg")
+            reader.release()
+            check(output)
+
+    print("Test passed!")
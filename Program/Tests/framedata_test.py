@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import tempfile
+import time
+import numpy as np
+from Crypto.Random import get_random_bytes
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from FrameData import FrameDataWriter, FrameDataReader, KeyWriter, ChunkedFile, convert_json, FILE_HEADER, VERSION
+
+
+# random frames, AES and Selective
+frames = []
+for frame_index in range(5):
+    is_selective = frame_index % 2 == 1
+    bboxes = []
+    for track_id in range(frame_index):
+        region = np.random.randint(0, 256, (20 + track_id, 10, 3), dtype=np.uint8)
+        bbox = {
+            "id": track_id,
+            "coords": [track_id, 2, track_id + 10, 22 + track_id],
+            "key": get_random_bytes(16),
+            "iv": get_random_bytes(16),
+            "region": region,
+        }
+        if is_selective:
+            bbox["encrypted_msb"] = region.flatten() & 0xC0
+        bboxes.append(bbox)
+    frames.append({"frame_index": frame_index, "isSelective": is_selective, "bboxes": bboxes})
+
+
+def check(path):
+    with FrameDataReader(path) as reader:
+        loaded = list(reader)
+        assert reader.ids() == [0, 1, 2, 3], "Wrong IDs!"
+    assert len(loaded) == len(frames), "Wrong frame count!"
+    for expected, frame_data in zip(frames, loaded):
+        assert frame_data["frame_index"] == expected["frame_index"]
+        assert frame_data["isSelective"] == expected["isSelective"]
+        for a, b in zip(expected["bboxes"], frame_data["bboxes"]):
+            assert a["id"] == b["id"] and a["coords"] == b["coords"]
+            assert a["key"] == b["key"] and a["iv"] == b["iv"]
+            assert np.array_equal(a["region"], b["region"]), "Region mismatch!"
+            if expected["isSelective"]:
+                assert np.array_equal(a["encrypted_msb"], b["encrypted_msb"]), "MSB mismatch!"
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    # Binary round trip
+    bin_path = os.path.join(tmp, "frame_data.bin")
+    with FrameDataWriter(bin_path) as writer:
+        for frame_data in frames:
+            writer.write(frame_data)
+    check(bin_path)
+
+    # Version 1 files (no index, no CTR flag) are still read, newer versions are refused
+    with open(bin_path, "rb") as f:
+        data = f.read()
+    versioned_path = os.path.join(tmp, "versioned.bin")
+    for version, readable in [(1, True), (VERSION, True), (VERSION + 1, False)]:
+        header = np.frombuffer(data[:FILE_HEADER.itemsize], dtype=FILE_HEADER).copy()
+        header["version"] = version
+        with open(versioned_path, "wb") as f:
+            f.write(header.tobytes() + data[FILE_HEADER.itemsize:])
+        try:
+            check(versioned_path)
+            assert readable, f"Version {version} accepted!"
+        except ValueError:
+            assert not readable, f"Version {version} refused!"
+
+    # Random access and ranges through the index
+    with FrameDataReader(bin_path) as reader:
+        assert len(reader) == len(frames)
+        assert reader.get(3)["frame_index"] == 3 and len(reader.get(3)["bboxes"]) == 3
+        assert reader.get(10) is None
+        assert [fd["frame_index"] for fd in reader.iter_range(1, 4)] == [1, 2, 3]
+
+    # Interrupted run: no index at the end of the file and a truncated last record
+    with open(bin_path, "rb") as f:
+        data = f.read()
+    with FrameDataReader(bin_path) as reader:
+        index_offset = reader.data_end
+    with open(bin_path, "wb") as f:
+        f.write(data[:index_offset - 10])
+    with FrameDataReader(bin_path) as reader:
+        assert [fd["frame_index"] for fd in reader] == [0, 1, 2, 3], "Index rebuild failed!"
+
+    # Chunked writes: before close, the file holds every record but those of the pending chunk
+    chunk_path = os.path.join(tmp, "chunked.bin")
+    writer = FrameDataWriter(chunk_path, chunk_size=4000, flush_interval=3600, fsync=True)
+    for frame_index in range(40):
+        writer.write(dict(frames[frame_index % len(frames)], frame_index=frame_index))
+        with FrameDataReader(chunk_path) as reader: # what a crash would leave
+            on_disk = [fd["frame_index"] for fd in reader]
+        assert on_disk == list(range(len(on_disk))), "Partial record written!"
+        assert writer.file.pending < 4000, "Chunk not flushed!"
+    assert writer.file.chunks > 1, "Nothing flushed before close!"
+    writer.close()
+
+    # Without new records, the timer writes the complete ones within flush_interval, never part of one
+    timed_path = os.path.join(tmp, "timed.bin")
+    timed = ChunkedFile(timed_path, chunk_size=1 << 20, flush_interval=0.2)
+    timed.write(b"record 1;")
+    timed.end_record()
+    timed.write(b"half of record 2")
+    time.sleep(0.5)
+    with open(timed_path, "rb") as f:
+        assert f.read() == b"record 1;", "Complete record not flushed on time, or partial record flushed!"
+    timed.close()
+    with open(timed_path, "rb") as f:
+        assert f.read() == b"record 1;half of record 2"
+    key_path = os.path.join(tmp, "timed_keys.txt")
+    key_writer = KeyWriter(key_path, flush_interval=0.2)
+    key_writer.write(7, bytes(16))
+    time.sleep(0.5)
+    with open(key_path) as f:
+        assert f.read() == f"ID: 7, Key: {bytes(16).hex()}\n", "Key not flushed on time!"
+    key_writer.close()
+
+    with FrameDataReader(chunk_path) as reader:
+        assert reader.index_count == 40 and [fd["frame_index"] for fd in reader] == list(range(40))
+
+    # Key table
+    keys_path = os.path.join(tmp, "aes_keys.txt")
+    keys = {track_id: get_random_bytes(16) for track_id in range(100)}
+    with KeyWriter(keys_path, chunk_size=256) as key_writer:
+        for track_id, key in keys.items():
+            key_writer.write(track_id, key)
+    with open(keys_path) as f:
+        assert f.read() == "".join(f"ID: {i}, Key: {k.hex()}\n" for i, k in keys.items())
+
+    # Old JSON lines format
+    json_path = os.path.join(tmp, "frame_data.json")
+    with open(json_path, "w") as f:
+        for frame_data in frames:
+            line = {"frame_index": frame_data["frame_index"], "isSelective": frame_data["isSelective"], "bboxes": []}
+            for bbox in frame_data["bboxes"]:
+                entry = {"id": bbox["id"], "coords": bbox["coords"], "key": bbox["key"].hex(), "iv": bbox["iv"].hex(), "region": bbox["region"].tolist()}
+                if frame_data["isSelective"]:
+                    entry["encrypted_msb"] = bbox["encrypted_msb"].tolist()
+                line["bboxes"].append(entry)
+            f.write(json.dumps(line) + "\n")
+    converted_path = os.path.join(tmp, "converted.bin")
+    convert_json(json_path, converted_path)
+    check(converted_path)
+
+    print(f"JSON size: {os.path.getsize(json_path)} bytes, binary size: {os.path.getsize(converted_path)} bytes")
+
+print("Test passed!")
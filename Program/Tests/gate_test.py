@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+from VideoReader import VideoReader
+from helpers import RectangleModel, write_video
+
+# Static gate: still frames reuse the last detection, at most max_gap frames in a row,
+# frames where something moves are always detected.
+
+WIDTH, HEIGHT, MAX_GAP = 320, 240, 10
+# (first frame, last frame, person position or None)
+SCENES = [(0, 30, None), (30, 60, "moving"), (60, 90, "still"), (90, 120, None)]
+FRAMES = SCENES[-1][1]
+
+
+def frames():
+    rng = np.random.default_rng(0)
+    background = np.tile(np.linspace(40, 160, WIDTH, dtype=np.uint8), (HEIGHT, 1))
+    for i in range(FRAMES):
+        noise = rng.integers(-3, 4, (HEIGHT, WIDTH))
+        frame = cv2.cvtColor(np.clip(background + noise, 0, 255).astype(np.uint8), cv2.COLOR_GRAY2BGR)
+        for start, end, person in SCENES:
+            if start <= i < end and person is not None:
+                x = 40 + 3 * (min(i, 59) - 30)
+                cv2.rectangle(frame, (x, 60), (x + 40, 180), (255, 255, 255), -1)
+        yield frame
+
+
+def run(video_path, **options):
+    model = RectangleModel(threshold=200) # one white rectangle: track ID 1
+    detection = Detection(VideoReader(video_path), os.devnull, model=model, **options)
+    detected = []
+    boxes = []
+    for frame, results in detection.track(detection.read_frames()):
+        detected.append(len(model.shapes))
+        boxes.append(results[0].boxes.xyxy.cpu().numpy())
+    detection.video.release()
+    return detection, detected, boxes
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "video.mp4")
+        write_video(video_path, frames())
+
+        _, _, reference = run(video_path)
+        detection, calls, boxes = run(video_path, static_threshold=0.002, max_gap=MAX_GAP)
+        detected = [i == 0 or calls[i] > calls[i - 1] for i in range(FRAMES)]
+
+        # Fewer detections, the skipped frames are counted
+        assert detection.frames_skipped == FRAMES - sum(detected) and detection.frames_skipped > FRAMES / 2, detection.frames_skipped
+        # Never more than max_gap frames without detection
+        gap = 0
+        for is_detected in detected:
+            gap = 0 if is_detected else gap + 1
+            assert gap <= MAX_GAP
+        # Every frame where the person moves is detected, with the same boxes as without the gate
+        assert all(detected[30:60])
+        for i in range(FRAMES):
+            assert len(boxes[i]) == len(reference[i]), i
+            assert len(boxes[i]) == 0 or np.abs(boxes[i] - reference[i]).max() <= 2, i
+
+        # Frames without boxes are written as they are, not drawn
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        empty = [Results(frame, path="", names=RectangleModel.names, boxes=torch.zeros((0, 7)))]
+        assert detection.anonymise(frame, empty, 0)[0] is frame
+
+        # The gate runs frame by frame: stride and batches are refused, not ignored
+        for options in ({"stride": 2}, {"batch_size": 4}):
+            try:
+                detection.track(iter([]), **options)
+                assert False, f"gate accepted with {options}"
+            except ValueError:
+                pass
+
+    print("Test passed!")
@@ -0,0 +1,97 @@
+import os
+import sys
+import time
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+
+# Shared by the test scripts: fake detection models (no network weights needed) and
+# synthetic videos. Not a test itself.
+
+NAMES = {0: "person"}
+
+
+class BoxesModel:
+    """
+    The same tracked boxes on every frame, rows of x1, y1, x2, y2, track ID.
+    delay: seconds spent per frame, like a slow detector.
+    """
+    names = NAMES
+
+    def __init__(self, rows, delay=0.0):
+        self.rows = [list(row) + [0.9, 0] for row in rows]
+        self.delay = delay
+
+    def track(self, frame, **options):
+        if self.delay:
+            time.sleep(self.delay)
+        return [Results(frame, path="", names=self.names, boxes=torch.tensor(self.rows, dtype=torch.float32).reshape(-1, 7))]
+
+
+class RectangleModel:
+    """
+    Detects the white rectangles of the images it gets: areas brighter than threshold and
+    larger than min_area pixels, track ID 1 with track(). Records the size of every image
+    (len(shapes) is the number of calls), fails after fail_after images.
+    """
+    names = NAMES
+
+    def __init__(self, threshold=128, min_area=0, fail_after=None):
+        self.threshold = threshold
+        self.min_area = min_area
+        self.fail_after = fail_after
+        self.shapes = []
+
+    def detect(self, image, track_id=False):
+        self.shapes.append(image.shape[:2])
+        if self.fail_after is not None and len(self.shapes) > self.fail_after:
+            raise RuntimeError("crash")
+        mask = (cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) > self.threshold).astype(np.uint8)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        rows = [[x, y, x + w, y + h] + ([1] if track_id else []) + [0.9, 0]
+                for x, y, w, h in map(cv2.boundingRect, contours) if w * h > self.min_area]
+        boxes = torch.tensor(rows, dtype=torch.float32).reshape(-1, 7 if track_id else 6)
+        return Results(image, path="", names=self.names, boxes=boxes)
+
+    def track(self, frame, **options):
+        return [self.detect(frame, track_id=True)]
+
+    def predict(self, images, **options):
+        return [self.detect(image) for image in images]
+
+
+def write_video(path, frames, fps=25, fourcc="mp4v"):
+    """
+    Write the frames of any iterable, at the size of the first one.
+    """
+    out = None
+    for frame in frames:
+        if out is None:
+            out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, frame.shape[1::-1])
+        out.write(frame)
+    out.release()
+
+
+def noise_frames(count, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def read_video(path):
+    """
+    Every frame of a video, decoded.
+    """
+    reader = VideoReader(path)
+    frames = []
+    while True:
+        success, frame = reader.read()
+        if not success:
+            break
+        frames.append(frame)
+    reader.release()
+    return frames
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import LiveReader, is_live_source
+from Detection import Detection
+from helpers import BoxesModel, write_video
+
+# Live sources: a file replayed at its frame rate, unbounded reads, stale frames dropped
+# under a latency bound, latency percentiles and drop rate, Detection.process on a stream.
+
+WIDTH, HEIGHT, FRAMES, FPS = 320, 240, 50, 25
+
+
+def consume(reader, work=0.0):
+    frames = []
+    while True:
+        success, frame = reader.read()
+        if not success:
+            break
+        frames.append(int(frame[0, 0, 0]))
+        time.sleep(work)
+        reader.frame_written()
+    reader.release()
+    return frames
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "source.avi") # lossless: the frame number is read back from a pixel
+    write_video(path, (np.full((HEIGHT, WIDTH, 3), i, dtype=np.uint8) for i in range(FRAMES)), FPS, "FFV1")
+    model = BoxesModel([[40, 40, 120, 200, 1]], delay=0.08) # slower than the 40 ms between frames
+
+    assert is_live_source("rtsp://camera/stream") and is_live_source("http://host/video.mjpg") and is_live_source("0")
+    assert not is_live_source(path)
+    fifo = os.path.join(directory, "pipe")
+    os.mkfifo(fifo)
+    assert is_live_source(fifo)
+    try:
+        LiveReader(os.path.join(directory, "missing.mp4"))
+        assert False, "missing file accepted"
+    except FileNotFoundError:
+        pass
+
+    # Replay at the native rate, fast consumer: every frame, in order, in real time
+    start = time.perf_counter()
+    reader = LiveReader(path, max_latency=0.2)
+    assert reader.frame_count is None and (reader.width, reader.height) == (WIDTH, HEIGHT) and reader.fps == FPS
+    frames = consume(reader)
+    elapsed = time.perf_counter() - start
+    assert frames == list(range(FRAMES)), frames
+    assert elapsed >= (FRAMES - 1) / FPS * 0.95, elapsed
+    stats = reader.latency_stats()
+    assert stats["dropped"] == 0 and stats["frames"] == FRAMES and stats["p99_ms"] < 100, stats
+
+    # Slow consumer without a bound: nothing dropped, the latency keeps growing
+    reader = LiveReader(path, max_latency=None)
+    frames = consume(reader, work=0.08)
+    stats = reader.latency_stats()
+    assert frames == list(range(FRAMES)) and stats["dropped"] == 0
+    assert stats["max_ms"] > 1500, stats
+
+    # Slow consumer with a bound: stale frames dropped, the latency stays close to the bound
+    reader = LiveReader(path, max_latency=0.2)
+    frames = consume(reader, work=0.08)
+    stats = reader.latency_stats()
+    assert frames == sorted(frames) and frames[0] == 0 and frames[-1] == FRAMES - 1
+    assert stats["dropped"] > 0 and stats["frames"] + stats["dropped"] == stats["arrived"] == FRAMES, stats
+    assert stats["drop_rate"] == stats["dropped"] / FRAMES
+    assert stats["p90_ms"] <= 200 + 60, stats
+    print(f"Bounded: {stats['frames']} frames, {stats['drop_rate']:.0%} dropped, p50 {stats['p50_ms']:.0f} ms, p99 {stats['p99_ms']:.0f} ms")
+
+    # Stops after max_frames
+    assert consume(LiveReader(path, max_latency=None, max_frames=10)) == list(range(10))
+
+    # Detection.process on a stream: same latency bound, every processed frame written
+    output = os.path.join(directory, "output.mp4")
+    detection = Detection(LiveReader(path, max_latency=0.25), output, True, "Gaussian", model=model)
+    detection.process()
+    latency = detection.latency
+    assert latency["frames"] == detection.frames_processed == cv2.VideoCapture(output).get(cv2.CAP_PROP_FRAME_COUNT)
+    assert latency["dropped"] > 0 and latency["frames"] + latency["dropped"] == FRAMES, latency
+    assert latency["p90_ms"] <= 250 + 100, latency
+
+    for options in ({"segment_workers": 2}, {"checkpoint_every": 10}, {"threaded": True}):
+        reader = LiveReader(path)
+        try:
+            Detection(reader, output, model=model).process(**options)
+            assert False, f"live source accepted with {options}"
+        except ValueError:
+            pass
+        reader.release()
+
+print("Test passed!")
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Pipeline import Pipeline, Stage
+
+
+def slow_double(x):
+    time.sleep(random.random() * 0.005)
+    return x * 2
+
+
+def increment(items):
+    for x in items:
+        yield x + 1
+
+
+# Multi-worker stages finish out of order, the sink must still get the items in order
+output = []
+pipeline = Pipeline(range(300), [
+    Stage("increment", increment, queue_size=4, stream=True),
+    Stage("double", slow_double, workers=4, queue_size=4),
+    Stage("double again", slow_double, workers=3, queue_size=2),
+    Stage("sink", output.append, queue_size=4),
+])
+pipeline.run()
+pipeline.report()
+assert output == [(x + 1) * 4 for x in range(300)], "Output out of order!"
+assert all(s["items"] == 300 for s in pipeline.stats()), "Items lost!"
+assert all(s["queue_max"] <= 4 for s in pipeline.stats()), "Queue not bounded!"
+
+
+# An error in any stage stops the pipeline and is raised by run()
+def fail(x):
+    if x == 100:
+        raise RuntimeError("stage failure")
+    return x
+
+
+try:
+    Pipeline(range(300), [Stage("fail", fail, workers=2), Stage("sink", lambda x: None)]).run()
+    raise AssertionError("Error not raised!")
+except RuntimeError as e:
+    assert str(e) == "stage failure"
+
+print("Test passed!")
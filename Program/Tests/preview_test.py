@@ -0,0 +1,36 @@
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Preview import PreviewQueue
+
+
+# A processing thread calling back for every frame only sends a few messages per second
+preview = PreviewQueue(size=(600, 320), interval=0.05)
+frame = np.random.randint(0, 256, (1080, 1920, 3), dtype=np.uint8)
+frame_count = 300
+start = time.perf_counter()
+for i in range(frame_count):
+    preview.callback((i + 1) / frame_count, i, frame)
+    time.sleep(0.001)
+elapsed = time.perf_counter() - start
+print(f"{preview.previews} previews for {frame_count} frames, {elapsed / frame_count * 1000 - 1:.3f} ms per callback")
+assert 0 < preview.previews < frame_count / 5, "Previews not throttled!"
+
+messages = preview.messages()
+previews = [m for m in messages if m[0] == "preview"]
+progress = [m for m in messages if m[0] == "progress"]
+assert len(previews) == 1, "Only the last preview must be kept!"
+image = previews[0][1]
+assert image.shape[1] <= 600 and image.shape[0] <= 320 and image.shape[2] == 3, "Preview not downscaled!"
+assert abs(image.shape[1] / image.shape[0] - 1920 / 1080) < 0.02, "Aspect ratio not kept!"
+assert progress[-1][1] == 1.0 and progress[-1][2] == frame_count - 1, "Last progress update lost!"
+assert all(a[2] < b[2] for a, b in zip(progress, progress[1:])), "Progress out of order!"
+
+preview.done(1.5)
+assert preview.messages() == [("done", 1.5)]
+assert preview.messages() == []
+
+print("Test passed!")
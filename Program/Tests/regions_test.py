@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+from VideoReader import VideoReader
+from Regions import Regions, FILL
+from helpers import RectangleModel, write_video
+
+# Detection restricted to regions of interest: excluded areas are never detected,
+# boxes found on crops and tiles come back in frame coordinates, tiles don't duplicate boxes.
+
+WIDTH, HEIGHT, FRAMES = 640, 480, 8
+WHITE = 200 # detection threshold, above the FILL gray of inactive pixels
+
+
+def draw(i):
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    cv2.rectangle(frame, (20, 20), (80, 60), (255, 255, 255), -1) # "sky": excluded
+    cv2.rectangle(frame, (300 + 2 * i, 250), (340 + 2 * i, 400), (255, 255, 255), -1)
+    return frame
+
+
+def boxes_of(result):
+    return sorted(result.boxes.xyxy.int().tolist())
+
+
+if __name__ == "__main__":
+    frame = draw(0)
+
+    # Whole frame: both rectangles
+    regions = Regions()
+    result = regions.detect(RectangleModel(WHITE), frame)
+    assert boxes_of(result) == [[20, 20, 81, 61], [300, 250, 341, 401]]
+    assert result.orig_img is frame
+
+    # Include the lower part only: one crop, the sky is never seen
+    model = RectangleModel(WHITE)
+    regions = Regions(include=[[[0, 200], [WIDTH - 1, 200], [WIDTH - 1, HEIGHT - 1], [0, HEIGHT - 1]]])
+    assert boxes_of(regions.detect(model, frame)) == [[300, 250, 341, 401]]
+    assert model.shapes == [(280, 640)] and regions.active_fraction() < 0.6
+
+    # Exclusion polygon: the crop covers the frame but the excluded pixels are painted over
+    regions = Regions(exclude=[[[0, 0], [100, 0], [100, 100], [0, 100]]])
+    regions.prepare(frame.shape)
+    assert len(regions.crops) == 1 and regions.crops[0][4] is not None
+    assert boxes_of(regions.detect(RectangleModel(WHITE), frame)) == [[300, 250, 341, 401]]
+    assert (frame[20:60, 20:80] == 255).all() # the frame itself is untouched
+    assert FILL < 200
+
+    # Tiles: overlapping tiles see the person twice, NMS keeps one box
+    model = RectangleModel(WHITE)
+    regions = Regions(include=[[[0, 200], [WIDTH - 1, 200], [WIDTH - 1, HEIGHT - 1], [0, HEIGHT - 1]]], tile_size=256, tile_overlap=0.5)
+    assert boxes_of(regions.detect(model, frame)) == [[300, 250, 341, 401]]
+    assert all(max(shape) <= 256 for shape in model.shapes) and len(model.shapes) > 2
+    height, width = frame.shape[:2]
+    x_min = min(x1 for x1, _, _, _, _ in regions.crops)
+    x_max = max(x2 for _, _, x2, _, _ in regions.crops)
+    assert x_min == 0 and x_max == width
+
+    # Through Detection: tracked boxes in frame coordinates on every frame
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "video.mp4")
+        write_video(video_path, (draw(i) for i in range(FRAMES)))
+
+        regions = Regions(include=[[[0, 200], [WIDTH - 1, 200], [WIDTH - 1, HEIGHT - 1], [0, HEIGHT - 1]]], tile_size=320)
+        detection = Detection(VideoReader(video_path), os.devnull, model=RectangleModel(WHITE), regions=regions)
+        tracked = [results[0] for _, results in detection.track(detection.read_frames())]
+        detection.video.release()
+        assert len(tracked) == FRAMES
+        for i, result in enumerate(tracked[1:], 1): # the first frame only starts the track
+            assert len(result.boxes) == 1 and result.boxes.id is not None
+            x1, y1, x2, y2 = result.boxes.xyxy[0].tolist()
+            assert abs(x1 - (300 + 2 * i)) <= 3 and abs(y1 - 250) <= 3 and abs(y2 - 401) <= 3, (i, x1, y1, x2, y2)
+
+    print("Test passed!")
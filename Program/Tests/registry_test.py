@@ -0,0 +1,64 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ModelRegistry import ModelRegistry
+
+# Model cache: least recently used model evicted at capacity, hit / miss counts, load time
+# saved by the hits, and a single load when several threads ask for the same model.
+
+LOAD_TIME = 0.05
+
+
+class StubLoader:
+    def __init__(self):
+        self.loads = []
+        self.lock = threading.Lock()
+
+    def __call__(self, model_path, device):
+        time.sleep(LOAD_TIME)
+        with self.lock:
+            self.loads.append(model_path)
+        return object()
+
+
+loader = StubLoader()
+registry = ModelRegistry(capacity=2, loader=loader)
+a = registry.get("a.pt", "cpu", warm_up=False)
+b = registry.get("b.pt", "cpu", warm_up=False)
+assert registry.get("a.pt", "cpu", warm_up=False) is a # a is now the most recently used
+assert (registry.hits, registry.misses) == (1, 2)
+assert registry.saved_time == registry.load_times[("a.pt", "cpu")] >= LOAD_TIME
+
+# At capacity the least recently used model (b) goes
+registry.get("c.pt", "cpu", warm_up=False)
+assert list(registry.models) == [("a.pt", "cpu"), ("c.pt", "cpu")]
+assert registry.get("b.pt", "cpu", warm_up=False) is not b # loaded again, evicting a
+assert list(registry.models) == [("c.pt", "cpu"), ("b.pt", "cpu")]
+assert loader.loads == ["a.pt", "b.pt", "c.pt", "b.pt"]
+assert (registry.hits, registry.misses) == (1, 4)
+
+# The device is part of the key
+registry.get("c.pt", "cuda:0", warm_up=False)
+assert list(registry.models) == [("b.pt", "cpu"), ("c.pt", "cuda:0")]
+
+# Concurrent first use: one load, the other threads wait for it and share the model
+registry = ModelRegistry(capacity=2, loader=StubLoader())
+models = []
+threads = [threading.Thread(target=lambda: models.append(registry.get("a.pt", "cpu", warm_up=False))) for _ in range(8)]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+assert registry.loader.loads == ["a.pt"]
+assert len(models) == 8 and all(model is models[0] for model in models)
+assert (registry.hits, registry.misses) == (7, 1)
+assert abs(registry.saved_time - 7 * registry.load_times[("a.pt", "cpu")]) < 1e-9
+
+# clear() drops the models, the counters stay
+registry.clear()
+assert not registry.models and registry.misses == 1
+
+print("Test passed!")
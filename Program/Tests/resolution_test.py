@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+from VideoReader import VideoReader
+from Tracking import downscale
+from helpers import RectangleModel, write_video
+
+# Detection on downscaled frames (inference_size) gives boxes in native frame coordinates,
+# and anonymises the native frames.
+
+WIDTH, HEIGHT, FRAMES, SIZE = 640, 480, 10, 320
+
+
+def frames():
+    for i in range(FRAMES):
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (100 + 4 * i, 80), (200 + 4 * i, 400), (255, 255, 255), -1)
+        yield frame
+
+
+def check(video_path, inference_size, batch_size):
+    model = RectangleModel()
+    detection = Detection(VideoReader(video_path), os.devnull, model=model, inference_size=inference_size)
+    boxes = []
+    for frame, results in detection.track(detection.read_frames(), batch_size=batch_size, batch_tracker=batch_size > 1):
+        assert results[0].orig_img.shape == frame.shape == (HEIGHT, WIDTH, 3)
+        boxes.append(results[0].boxes.xyxy.cpu().numpy())
+    detection.video.release()
+    return model.shapes, boxes
+
+
+if __name__ == "__main__":
+    # downscale keeps frames that are already small enough
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    assert downscale(frame, None)[0] is frame and downscale(frame, WIDTH)[0] is frame
+    small, scale = downscale(frame, SIZE)
+    assert small.shape == (240, 320, 3) and scale == 2.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        video_path = os.path.join(directory, "video.mp4")
+        write_video(video_path, frames())
+
+        for batch_size in (1, 4):
+            native_shapes, native_boxes = check(video_path, None, batch_size)
+            shapes, boxes = check(video_path, SIZE, batch_size)
+            assert all(shape == (HEIGHT, WIDTH) for shape in native_shapes)
+            assert all(shape == (240, 320) for shape in shapes)
+            assert len(boxes) == len(native_boxes) == FRAMES
+            for native, small in zip(native_boxes, boxes):
+                assert len(native) == len(small) == 1
+                # boxes found at half resolution are within a couple of native pixels
+                assert np.abs(native - small).max() <= 4, (native, small)
+
+    print("Test passed!")
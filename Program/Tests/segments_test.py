@@ -0,0 +1,45 @@
+import os
+import sys
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ParallelSegments import split_segments, join_tracks
+
+# Track IDs of consecutive segments joined over their overlap frames.
+
+assert split_segments(100, 3) == [(0, 33), (33, 66), (66, 100)]
+assert split_segments(2, 4) == [(0, 1), (1, 2)]
+
+
+def box(x, track_id):
+    return [x, 10, x + 40, 110, track_id, 0.9, 0]
+
+
+def frames(start, end, people):
+    """
+    Boxes of frames [start, end): people are (local ID, first frame, last frame, x offset), moving right.
+    """
+    return [np.array([box(offset + i, track_id) for track_id, first, last, offset in people if first <= i < last], dtype=np.float32).reshape(-1, 7)
+            for i in range(start, end)]
+
+
+OVERLAP = 10
+segments = [
+    # A crosses both boundaries, B leaves during the first segment
+    {"start": 0, "track_start": 0, "boxes": frames(0, 50, [(1, 0, 100, 0), (2, 0, 20, 200)])},
+    # Same people with other local IDs, C appears, D only appears after the overlap
+    {"start": 50, "track_start": 40, "boxes": frames(40, 100, [(3, 40, 150, 300), (5, 40, 100, 0), (4, 70, 100, 400)])},
+    # A again, C left at frame 100
+    {"start": 100, "track_start": 90, "boxes": frames(90, 150, [(1, 90, 150, 0), (2, 90, 100, 300)])},
+]
+segments[1]["boxes"][0] = segments[1]["boxes"][0][:0] # a missed detection in the overlap
+
+mappings = join_tracks(segments)
+assert mappings[0] == {1: 1, 2: 2}
+assert mappings[1][5] == 1, "A not joined across the first boundary!"
+assert mappings[1][3] == 3 and mappings[1][4] == 4, "New tracks must get new IDs in order of appearance"
+assert mappings[2][1] == 1, "A not joined across the second boundary!"
+assert mappings[2][2] == 3, "C not joined!"
+assert len(set(mappings[1].values())) == len(mappings[1]), "Two tracks joined to the same ID!"
+
+print("Test passed!")
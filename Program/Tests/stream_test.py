@@ -0,0 +1,70 @@
+import os
+import sys
+import resource
+import subprocess
+import tempfile
+import numpy as np
+import cv2
+from Crypto.Cipher import AES
+from Crypto.Random import get_random_bytes
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from FrameData import FrameDataWriter
+
+# Peak memory of Decrypt.process must not depend on the length of the video.
+# Each clip is built and decrypted in its own process so ru_maxrss only measures the decryption.
+
+WIDTH, HEIGHT = 320, 240
+SHORT, LONG = 200, 1600
+
+
+def build_clip(directory, frame_count):
+    """
+    Synthetic video with one AES encrypted box per frame, and its frame data file.
+    """
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(os.path.join(directory, "video.mp4"), fourcc, 30, (WIDTH, HEIGHT))
+    key = get_random_bytes(16)
+    with FrameDataWriter(os.path.join(directory, "frame_data.bin")) as writer:
+        for frame_index in range(frame_count):
+            frame = np.random.randint(0, 256, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+            x1, y1, x2, y2 = 40, 30, 140, 210
+            iv = get_random_bytes(16)
+            region_bytes = frame[y1:y2, x1:x2].tobytes()
+            size = len(region_bytes) // 16 * 16
+            encrypted = AES.new(key, AES.MODE_CBC, iv).encrypt(region_bytes[:size]) + region_bytes[size:]
+            region = np.frombuffer(encrypted, dtype=np.uint8).reshape(y2 - y1, x2 - x1, 3)
+            frame[y1:y2, x1:x2] = region
+            out.write(frame)
+            writer.write({"frame_index": frame_index, "isSelective": False, "bboxes": [
+                {"id": 1, "coords": [x1, y1, x2, y2], "key": key, "iv": iv, "region": region}]})
+    out.release()
+
+
+def decrypt_clip(directory):
+    from Decrypt import Decrypt
+    decrypt = Decrypt(os.path.join(directory, "video.mp4"), os.path.join(directory, "decrypted.mp4"), os.path.join(directory, "frame_data.bin"))
+    decrypt.process()
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KiB on Linux
+
+
+def peak_rss(frame_count):
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run([sys.executable, __file__, "build", tmp, str(frame_count)], check=True)
+        output = subprocess.run([sys.executable, __file__, "decrypt", tmp], check=True, capture_output=True, text=True).stdout
+        return int(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_clip(sys.argv[2], int(sys.argv[3]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "decrypt":
+        print("\n" + str(decrypt_clip(sys.argv[2])))
+    else:
+        short_rss = peak_rss(SHORT)
+        long_rss = peak_rss(LONG)
+        print(f"Peak RSS: {SHORT} frames {short_rss / 1024:.1f} MiB, {LONG} frames {long_rss / 1024:.1f} MiB")
+
+        # Test
+        assert long_rss < short_rss * 1.1 + 4096, "Decryption memory grows with the video length!"
+        print("Test passed!")
@@ -0,0 +1,61 @@
+import os
+import sys
+from types import SimpleNamespace
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Detection import Detection
+from Tracking import BatchTracker
+
+# Strided detection: a person first seen on a detection frame is hidden by ByteTrack until
+# a second detection confirms the track, the next frame is detected so that the predictor
+# covers them on the frames in between.
+
+WIDTH, HEIGHT, FRAMES, STRIDE = 320, 240, 16, 4
+APPEARS = 4 # B appears on a detection frame
+
+
+def people(i):
+    boxes = [[20 + i, 40, 80 + i, 200, 0.9, 0]] # A, from the start
+    if i >= APPEARS:
+        boxes.append([200 - i, 30, 260 - i, 190, 0.9, 0]) # B
+    return torch.tensor(boxes, dtype=torch.float32)
+
+
+class FakeModel:
+    """
+    model.track with ByteTrack kept on model.predictor as ultralytics does, people() as detections.
+    """
+    names = {0: "person"}
+
+    def __init__(self):
+        self.batch_tracker = BatchTracker("bytetrack.yaml")
+        self.predictor = SimpleNamespace(trackers=[self.batch_tracker.tracker])
+        self.detected = []
+
+    def track(self, frame, **options):
+        i = int(frame[0, 0, 0])
+        self.detected.append(i)
+        return [self.batch_tracker.update(Results(frame, path="", names=self.names, boxes=people(i)))]
+
+
+def covered(results, box):
+    x1, y1, x2, y2 = box[:4]
+    return any(b[0] <= x1 + 1 and b[1] <= y1 + 1 and b[2] >= x2 - 1 and b[3] >= y2 - 1 for b in results[0].boxes.xyxy.tolist())
+
+
+model = FakeModel()
+detection = Detection(None, os.devnull, model=model)
+frames = [np.full((HEIGHT, WIDTH, 3), i, dtype=np.uint8) for i in range(FRAMES)]
+tracked = list(detection.track_strided(iter(frames), STRIDE))
+
+# One extra detection, right after B's first one, then the stride goes on from there
+assert model.detected == [0, 4, 5, 9, 13], model.detected
+for i, (frame, results) in enumerate(tracked):
+    assert covered(results, people(i)[0].tolist()), f"A exposed on frame {i}"
+    if i > APPEARS: # on its first frame B is hidden as with model.track on every frame
+        assert covered(results, people(i)[1].tolist()), f"B exposed on frame {i}"
+
+print("Test passed!")
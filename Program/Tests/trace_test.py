@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Trace import Tracer, NULL_SPAN, tracer
+from Detection import Detection
+from VideoReader import VideoReader
+from helpers import BoxesModel, write_video, noise_frames
+
+# Tracing: nested spans with their own time, per thread, counters, Chrome trace export,
+# nothing recorded when disabled, and the stages of Detection.process traced.
+
+WIDTH, HEIGHT, FRAMES = 320, 240, 30
+
+
+if __name__ == "__main__":
+    # Disabled: shared no-op span, nothing recorded
+    t = Tracer()
+    assert t.span("a") is NULL_SPAN
+    with t.span("a"):
+        t.count("boxes", 3)
+    assert t.events == [] and not t.counters
+
+    # Nested spans and self time
+    t.enable()
+    with t.span("outer", frame=1):
+        time.sleep(0.01)
+        with t.span("inner"):
+            time.sleep(0.02)
+        t.count("boxes", 2)
+    t.count("boxes", 3)
+
+    def worker():
+        with t.span("thread"):
+            time.sleep(0.005)
+    thread = threading.Thread(target=worker, name="worker")
+    thread.start()
+    thread.join()
+    t.disable()
+
+    summary = t.summary()
+    outer, inner = summary["spans"]["outer"], summary["spans"]["inner"]
+    assert outer["calls"] == inner["calls"] == 1
+    assert outer["total_ms"] >= inner["total_ms"] + 9
+    assert abs(outer["self_ms"] - (outer["total_ms"] - inner["total_ms"])) < 0.01
+    assert inner["self_ms"] == inner["total_ms"] >= 19
+    assert summary["counters"] == {"boxes": 5}
+    assert summary["wall_ms"] >= outer["total_ms"]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "trace.json")
+        t.export_chrome(path)
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+        spans = [e for e in events if e["ph"] == "X"]
+        assert {e["name"] for e in spans} == {"outer", "inner", "thread"}
+        assert len({e["tid"] for e in spans}) == 2
+        assert {e["args"]["name"] for e in events if e["ph"] == "M"} >= {"MainThread", "worker"}
+        outer_event = next(e for e in spans if e["name"] == "outer")
+        inner_event = next(e for e in spans if e["name"] == "inner")
+        assert outer_event["ts"] <= inner_event["ts"] and inner_event["ts"] + inner_event["dur"] <= outer_event["ts"] + outer_event["dur"]
+        assert outer_event["args"] == {"frame": 1}
+        assert [e["args"]["boxes"] for e in events if e["ph"] == "C"] == [2, 5]
+
+        # Profile range entered past its start (resumed run): profiled from the first frame seen
+        resumed_path = os.path.join(directory, "resumed.txt")
+        t = Tracer()
+        t.profile(5, 20, resumed_path)
+        t.frame(10)
+        assert t.profiler is not None
+        time.sleep(0.05)
+        t.frame(15)
+        t.frame(20)
+        assert t.profiler is None and t.profile_range is None and os.path.exists(resumed_path)
+        t.frame(21)
+        assert t.profiler is None
+        t.profile(5, 20, resumed_path)
+        t.frame(30) # past the whole range: nothing to profile
+        assert t.profiler is None
+
+        # Detection.process: every stage traced, profile of a frame range
+        source = os.path.join(directory, "source.mp4")
+        write_video(source, noise_frames(FRAMES, WIDTH, HEIGHT))
+
+        profile_path = os.path.join(directory, "profile.txt")
+        tracer.enable()
+        tracer.profile(5, 20, profile_path)
+        model = BoxesModel([[40, 40, 120, 200, 1], [150, 30, 230, 220, 2]], delay=0.002) # a profiler sample now and then
+        detection = Detection(VideoReader(source), os.path.join(directory, "output.mp4"), True, "AES", model=model,
+                              frame_data_path=os.path.join(directory, "frame_data.bin"), keys_path=os.devnull)
+        detection.process()
+        tracer.disable()
+        summary = tracer.summary()
+        for name in ("decode", "inference", "anonymise/AES", "cipher", "plot", "encode", "metadata"):
+            assert summary["spans"][name]["calls"] == FRAMES, name
+        assert summary["counters"]["boxes"] == 2 * FRAMES
+        assert summary["counters"]["cipher_bytes"] == summary["counters"]["metadata_bytes"] > 0
+        with open(profile_path) as f:
+            lines = f.read().splitlines()
+        assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+        assert any("Detection.py:process" in line for line in lines)
+        assert tracer.profiler is None and tracer.profile_range is None
+
+    # Disabled cost: a call and a test
+    start = time.perf_counter()
+    for _ in range(100000):
+        with tracer.span("decode"):
+            pass
+    per_call = (time.perf_counter() - start) / 100000
+    assert per_call < 5e-6, per_call
+    print(f"Disabled span: {per_call * 1e9:.0f} ns")
+
+    print("Test passed!")
@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from VideoReader import VideoReader
+from helpers import write_video
+
+# Each frame of the synthetic video shows its index as 8 black / white squares.
+
+FRAMES = 120
+
+
+def frames():
+    for i in range(FRAMES):
+        frame = np.zeros((64, 256, 3), dtype=np.uint8)
+        for bit in range(8):
+            if i >> bit & 1:
+                frame[16:48, bit * 32 + 4:bit * 32 + 28] = 255
+        yield frame
+
+
+def index_of(frame):
+    return sum(1 << bit for bit in range(8) if frame[32, bit * 32 + 16].mean() > 128)
+
+
+def read_all(video):
+    indices = []
+    while True:
+        success, frame = video.read()
+        if not success:
+            return indices
+        indices.append(index_of(frame))
+
+
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "video.mp4")
+    write_video(path, frames(), 30)
+
+    # Sequential reads, with and without prefetch
+    video = VideoReader(path)
+    assert read_all(video) == list(range(FRAMES))
+    assert video.read() == (False, None)
+    video.release()
+    video = VideoReader(path)
+    video.start_prefetch(8)
+    assert read_all(video) == list(range(FRAMES)), "Prefetched frames out of order!"
+    assert video.read() == (False, None)
+    video.release()
+
+    # Seeking by frame and timestamp, also while prefetching
+    for prefetch in [0, 8]:
+        video = VideoReader(path)
+        if prefetch:
+            video.start_prefetch(prefetch)
+        for _ in range(10):
+            video.read()
+        video.seek(50)
+        assert index_of(video.read()[1]) == 50 and video.position == 51
+        video.seek_time(2.0)
+        assert index_of(video.read()[1]) == 60
+        video.seek(5)
+        assert read_all(video) == list(range(5, FRAMES))
+        video.release()
+
+    # Random access through the LRU cache, without moving the read position
+    video = VideoReader(path, cache_size=16)
+    video.read()
+    order = [7, 8, 9, 100, 3, 7, 8, 119, 0, 100] + list(range(20, 60))
+    for index in order:
+        frame = video.get_frame(index)
+        assert index_of(frame) == index, f"get_frame({index}) returned frame {index_of(frame)}"
+        assert not frame.flags.writeable, "Cached frames must be read-only"
+    assert video.cache_hits == 3, f"{video.cache_hits} cache hits"
+    assert len(video.cache) == 16, "Cache not bounded!"
+    assert video.get_frame(FRAMES) is None and video.get_frame(-1) is None
+    assert index_of(video.read()[1]) == 1, "get_frame moved the read position!"
+    video.release()
+
+print("Test passed!")
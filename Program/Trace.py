@@ -0,0 +1,239 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+####################################################
+##################### Tracing ######################
+####################################################
+#
+# Nested timers and counters for the processing stages, off by default:
+#   with span("inference"): ...       timer, nested spans are children of the enclosing one
+#   count("boxes", len(boxes))         counter
+# When tracing is disabled, span() returns a shared no-op context manager and count()
+# returns at once: the cost is one call per timer. Once enabled (tracer.enable()), spans are
+# recorded per thread and can be exported as a Chrome trace (chrome://tracing, Perfetto)
+# with tracer.export_chrome(path), or summed up per name with tracer.summary().
+# Only the current process is traced (not the worker processes of the segment modes).
+#
+# Sampling profiler: tracer.profile(start, end, path) samples the Python stacks of every
+# thread while the frames [start, end) are decoded (the processing loop calls tracer.frame(i)),
+# and writes them as collapsed stacks ("a;b;c count" lines, for flamegraph.pl or speedscope).
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.tracer.stack().append(0) # time of the children
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter_ns() - self.start
+        stack = self.tracer.stack()
+        children = stack.pop()
+        if stack:
+            stack[-1] += duration
+        self.tracer.events.append((self.name, threading.get_ident(), self.start, duration, duration - children, self.args))
+        return False
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.events = [] # (name, thread id, start ns, duration ns, self ns, args), list.append is atomic
+        self.counters = Counter()
+        self.counter_events = [] # (name, time ns, value so far)
+        self.counter_lock = threading.Lock()
+        self.thread_names = {}
+        self.local = threading.local()
+        self.start_time = None
+        self.end_time = None
+        self.profiler = None
+        self.profile_range = None # (start frame, end frame, output path)
+
+    def enable(self):
+        """
+        Start a new trace (previous events are dropped).
+        """
+        self.events = []
+        self.counters = Counter()
+        self.counter_events = []
+        self.thread_names = {}
+        self.start_time = time.perf_counter_ns()
+        self.end_time = None
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.end_time = time.perf_counter_ns()
+
+    def stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+            self.thread_names[threading.get_ident()] = threading.current_thread().name
+        return stack
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.counter_lock:
+            self.counters[name] += value
+            self.counter_events.append((name, time.perf_counter_ns(), self.counters[name]))
+
+    ####################################################
+    ##################### Profiler #####################
+
+    def profile(self, start, end, path):
+        """
+        Sample the stacks while the frames [start, end) are processed, write them to path.
+        """
+        self.profile_range = (start, end, path)
+
+    def frame(self, index):
+        """
+        Called by the processing loop before each frame: starts and stops the profiler.
+        """
+        if self.profile_range is None:
+            return
+        start, end, path = self.profile_range
+        if start <= index < end and self.profiler is None: # also when resumed or seeked past start
+            self.profiler = SamplingProfiler()
+            self.profiler.start()
+        elif index >= end and self.profiler is not None:
+            self.stop_profile()
+
+    def stop_profile(self):
+        """
+        Stop the profiler if it runs (end of the range or of the video) and write its samples.
+        """
+        if self.profiler is None:
+            return
+        self.profiler.stop()
+        self.profiler.write_collapsed(self.profile_range[2])
+        print(f"\nProfile of frames {self.profile_range[0]}-{self.profile_range[1]}: "
+              f"{self.profiler.samples} samples saved to {self.profile_range[2]}")
+        self.profiler = None
+        self.profile_range = None
+
+    ####################################################
+    ###################### Output ######################
+
+    def export_chrome(self, path):
+        """
+        Chrome trace event format (JSON), timestamps in microseconds from enable().
+        """
+        pid = os.getpid()
+        origin = self.start_time or 0
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self.thread_names.items()]
+        for name, tid, start, duration, _, args in self.events:
+            event = {"name": name, "ph": "X", "pid": pid, "tid": tid, "ts": (start - origin) / 1000, "dur": duration / 1000}
+            if args:
+                event["args"] = args
+            events.append(event)
+        for name, timestamp, value in self.counter_events:
+            events.append({"name": name, "ph": "C", "pid": pid, "ts": (timestamp - origin) / 1000, "args": {name: value}})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self):
+        """
+        {"spans": {name: {calls, total_ms, self_ms, mean_ms, max_ms}}, "counters": {...}, "wall_ms"}.
+        """
+        spans = defaultdict(lambda: {"calls": 0, "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0})
+        for name, _, _, duration, self_time, _ in self.events:
+            entry = spans[name]
+            entry["calls"] += 1
+            entry["total_ms"] += duration / 1e6
+            entry["self_ms"] += self_time / 1e6
+            entry["max_ms"] = max(entry["max_ms"], duration / 1e6)
+        for entry in spans.values():
+            entry["mean_ms"] = entry["total_ms"] / entry["calls"]
+        end = self.end_time or time.perf_counter_ns()
+        return {"spans": dict(spans), "counters": dict(self.counters), "wall_ms": (end - (self.start_time or end)) / 1e6}
+
+    def print_summary(self):
+        summary = self.summary()
+        wall = max(summary["wall_ms"], 1e-9)
+        print(f"\n{'span':>24} {'calls':>8} {'total ms':>10} {'self ms':>10} {'mean ms':>9} {'max ms':>9} {'self %':>7}")
+        for name, entry in sorted(summary["spans"].items(), key=lambda item: -item[1]["self_ms"]):
+            print(f"{name:>24} {entry['calls']:>8} {entry['total_ms']:>10.1f} {entry['self_ms']:>10.1f} "
+                  f"{entry['mean_ms']:>9.3f} {entry['max_ms']:>9.2f} {entry['self_ms'] / wall:>7.1%}")
+        for name, value in sorted(summary["counters"].items()):
+            print(f"{name:>24} {value:>8g}")
+        print(f"{'wall':>24} {'':>8} {summary['wall_ms']:>10.1f}")
+
+
+####################################################
+################# Sampling profiler ################
+####################################################
+
+class SamplingProfiler:
+    """
+    Stacks of every other thread, sampled every interval seconds (sys._current_frames).
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def run(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(tid, str(tid)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+tracer = Tracer()
+span = tracer.span
+count = tracer.count
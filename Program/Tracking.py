@@ -0,0 +1,176 @@
+import cv2
+import numpy as np
+import torch
+import yaml
+from ultralytics.engine.results import Results
+from ultralytics.trackers.basetrack import BaseTrack
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils import IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+####################################################
+################ BatchTracker Class ################
+####################################################
+
+class BatchTracker:
+    """
+    ByteTrack association run outside of model.track, so that detection can run on
+    batches of frames. Results must be given one by one, in frame order.
+    Same steps as ultralytics' on_predict_postprocess_end for a single video.
+    """
+    def __init__(self, tracker="bytetrack.yaml"):
+        with open(check_yaml(tracker)) as f:
+            cfg = IterableSimpleNamespace(**yaml.safe_load(f))
+        self.tracker = BYTETracker(args=cfg)
+
+    def update(self, result):
+        """
+        Associate the detections of one frame, return the result with track IDs.
+        """
+        det = result.boxes.cpu().numpy()
+        tracks = self.tracker.update(det, result.orig_img)
+        if len(tracks) == 0:
+            if any(not t.is_activated for t in self.tracker.tracked_stracks):
+                return result[:0] # hide new tracks until confirmed
+            return result
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1], device=result.boxes.data.device))
+        return result
+
+    def reset(self):
+        self.tracker.reset()
+
+
+def track_count():
+    """
+    Last track ID given by ultralytics (a global counter, shared by every tracker of the process).
+    """
+    return BaseTrack._count
+
+
+def set_track_count(count):
+    """
+    Restore the track ID counter, e.g. with a tracker loaded from a checkpoint.
+    """
+    BaseTrack._count = count
+
+
+def reset_trackers(model):
+    """
+    Clear the tracks model.track keeps between calls (persist=True), before reusing a model on another video.
+    """
+    predictor = getattr(model, "predictor", None)
+    for tracker in getattr(predictor, "trackers", None) or []:
+        tracker.reset()
+        tracker.reset_id()
+
+
+def unconfirmed_tracks(model=None, batch_tracker=None):
+    """
+    Tracks seen on a single frame so far, hidden by ByteTrack until the next detection confirms them.
+    Tracker of batch_tracker if given, else the one model.track keeps.
+    """
+    if batch_tracker is not None:
+        trackers = [batch_tracker.tracker]
+    else:
+        trackers = getattr(getattr(model, "predictor", None), "trackers", None) or []
+    return sum(not track.is_activated for tracker in trackers for track in tracker.tracked_stracks)
+
+
+def downscale(frame, size):
+    """
+    Frame resized so that its longest side is size (None: unchanged), and the factor from
+    the small frame coordinates back to the frame coordinates.
+    """
+    height, width = frame.shape[:2]
+    if size is None or max(height, width) <= size:
+        return frame, 1.0
+    scale = max(height, width) / size
+    small_size = (max(1, round(width / scale)), max(1, round(height / scale)))
+    small = cv2.resize(frame, small_size, interpolation=cv2.INTER_AREA)
+    return small, width / small_size[0]
+
+
+def rescale_result(result, frame, scale):
+    """
+    Results of a downscaled frame mapped back to the frame: boxes scaled, frame as orig_img
+    (drawing and anonymisation happen at full resolution).
+    """
+    data = result.boxes.data.clone()
+    data[:, :4] *= scale
+    height, width = frame.shape[:2]
+    data[:, [0, 2]] = data[:, [0, 2]].clamp(0, width)
+    data[:, [1, 3]] = data[:, [1, 3]].clamp(0, height)
+    return Results(frame, path=result.path, names=result.names, boxes=data)
+
+
+def frame_signature(frame, size=(64, 36)):
+    """
+    Small grayscale version of a frame, cheap to compare.
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def scene_change(signature, other):
+    """
+    Mean absolute difference between two signatures, in [0, 1].
+    """
+    return float(np.abs(signature - other).mean()) / 255
+
+
+def changed_area(signature, other, pixel_threshold=12):
+    """
+    Share of the signature pixels that differ by more than pixel_threshold, in [0, 1].
+    Unlike scene_change, a small person entering a still scene isn't averaged away.
+    """
+    return float(np.count_nonzero(np.abs(signature - other) > pixel_threshold)) / signature.size
+
+
+####################################################
+############### MotionPredictor Class ##############
+####################################################
+
+class MotionPredictor:
+    """
+    Constant velocity prediction of the tracked boxes, used for the frames where
+    the detector is skipped. Predicted boxes are enlarged by a safety margin.
+    """
+    def __init__(self, margin=0.1):
+        self.margin = margin # fraction of the box size added on each side
+        self.tracks = {} # track ID -> (frame index, box, velocity per frame)
+
+    def update(self, result, frame_index):
+        """
+        Store the boxes of a detected frame. Tracks missing from it are dropped.
+        """
+        tracks = {}
+        boxes = result.boxes
+        if boxes.id is not None:
+            for track_id, box in zip(boxes.id.int().tolist(), boxes.xyxy.cpu().numpy()):
+                velocity = np.zeros(4)
+                if track_id in self.tracks:
+                    last_index, last_box, _ = self.tracks[track_id]
+                    velocity = (box - last_box) / max(frame_index - last_index, 1)
+                tracks[track_id] = (frame_index, box, velocity)
+        self.tracks = tracks
+
+    def predict(self, frame, frame_index, names):
+        """
+        Results with the predicted boxes of every track for a frame without detection.
+        """
+        height, width = frame.shape[:2]
+        data = np.zeros((len(self.tracks), 7), dtype=np.float32)
+        for row, (track_id, (last_index, box, velocity)) in enumerate(self.tracks.items()):
+            elapsed = frame_index - last_index
+            x1, y1, x2, y2 = box + velocity * elapsed
+            # The margin grows with the distance travelled since the detection
+            pad_x = (x2 - x1) * self.margin + abs(velocity[[0, 2]]).mean() * elapsed
+            pad_y = (y2 - y1) * self.margin + abs(velocity[[1, 3]]).mean() * elapsed
+            data[row] = [
+                min(max(x1 - pad_x, 0), width), min(max(y1 - pad_y, 0), height),
+                min(max(x2 + pad_x, 0), width), min(max(y2 + pad_y, 0), height),
+                track_id, 1.0, 0,
+            ]
+        return Results(frame, path="", names=names, boxes=torch.from_numpy(data))
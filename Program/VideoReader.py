@@ -1,18 +1,31 @@
 import cv2
+import numpy as np
 import os
+import queue
+import stat
+import threading
+import time
+from collections import OrderedDict, deque
+from Encoder import encode
 
 ####################################################
 ################ VideoReader Class  ################
 ####################################################
+#
+# Sequential reads with read(), optionally prefetched by a background thread
+# (start_prefetch), seeking by frame or timestamp, and random access with get_frame,
+# which decodes on its own capture and keeps the last cache_size frames (LRU).
+
+_END = object()
 
-class VideoReader:
-    video = None
 
-    frames = []
+class VideoReader:
+    live = False # bounded file (see LiveReader for streams)
 
-    def __init__(self, video_path):
+    def __init__(self, video_path, cache_size=32):
         if not os.path.exists(video_path):
             raise FileNotFoundError(f"The video file at {video_path} does not exist.")
+        self.path = video_path
         self.video = cv2.VideoCapture(video_path)
 
         self.fps = self.video.get(cv2.CAP_PROP_FPS)
@@ -20,28 +33,298 @@ class VideoReader:
         self.height = int(self.video.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.frame_count = int(self.video.get(cv2.CAP_PROP_FRAME_COUNT))
 
+        self.position = 0 # index of the frame the next read() returns
+
+        # Prefetch thread
+        self.prefetch_queue = None
+        self.prefetch_thread = None
+        self.prefetch_stop = None
+
+        # Random access (get_frame)
+        self.cache_size = cache_size
+        self.cache = OrderedDict() # frame index -> read-only frame, least recently used first
+        self.random_access = None
+        self.random_position = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
     def get_frame(self, index):
+        """
+        Frame at index (read-only), None if out of range. Doesn't move the read() position.
+        """
         if index < 0 or index >= self.frame_count:
             return None
-        return self.frames[index]
+        frame = self.cache.get(index)
+        if frame is not None:
+            self.cache.move_to_end(index)
+            self.cache_hits += 1
+            return frame
+
+        self.cache_misses += 1
+        if self.random_access is None:
+            self.random_access = cv2.VideoCapture(self.path)
+        if index != self.random_position: # consecutive indices don't seek
+            self.random_access.set(cv2.CAP_PROP_POS_FRAMES, index)
+        success, frame = self.random_access.read()
+        self.random_position = index + 1
+        if not success:
+            self.random_position = -1
+            return None
+        frame.flags.writeable = False # shared by every caller through the cache
+        self.cache[index] = frame
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return frame
 
     def read(self):
-        return self.video.read()
-    
+        if self.prefetch_queue is None:
+            success, frame = self.video.read()
+        else:
+            item = self.prefetch_queue.get()
+            if item is _END:
+                self.prefetch_queue.put(_END) # next reads fail too
+                success, frame = False, None
+            else:
+                success, frame = True, item
+        if success:
+            self.position += 1
+        return success, frame
+
+    def seek(self, index):
+        """
+        Move to a frame index, the next read() returns this frame.
+        """
+        prefetch = self.stop_prefetch()
+        success = self.video.set(cv2.CAP_PROP_POS_FRAMES, index)
+        self.position = index
+        if prefetch:
+            self.start_prefetch(prefetch)
+        return success
+
+    def seek_time(self, seconds):
+        """
+        Move to the frame shown at a timestamp (seconds).
+        """
+        return self.seek(int(round(seconds * self.fps)))
+
+    def start_prefetch(self, buffer_size=16):
+        """
+        Decode the next frames in a background thread, up to buffer_size frames ahead of read().
+        """
+        if self.prefetch_thread is not None:
+            return
+        self.prefetch_queue = queue.Queue(maxsize=buffer_size)
+        self.prefetch_stop = threading.Event()
+        self.prefetch_thread = threading.Thread(target=self.prefetch, args=(self.prefetch_queue, self.prefetch_stop), daemon=True)
+        self.prefetch_thread.start()
+
+    def prefetch(self, frames, stop):
+        while not stop.is_set():
+            success, frame = self.video.read()
+            item = frame if success else _END
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+            if not success:
+                return
+
+    def stop_prefetch(self):
+        """
+        Stop the prefetch thread and drop its frames, the capture goes back to the read() position.
+        Returns the buffer size it had (0 if it was not running).
+        """
+        if self.prefetch_thread is None:
+            return 0
+        buffer_size = self.prefetch_queue.maxsize
+        self.prefetch_stop.set()
+        self.prefetch_thread.join()
+        self.prefetch_thread = None
+        self.prefetch_queue = None
+        self.video.set(cv2.CAP_PROP_POS_FRAMES, self.position)
+        return buffer_size
+
     def get_fps(self):
         return self.fps
-    
+
     def release(self):
+        self.stop_prefetch()
         self.video.release()
+        if self.random_access is not None:
+            self.random_access.release()
+            self.random_access = None
+        self.cache.clear()
 
-    def to_video(self, frames, output_path):
+    def to_video(self, frames, output_path, **encoder):
+        """
+        Write frames (any iterable, consumed one at a time) at the video's size and frame rate.
+        encoder: options of Encoder.open_encoder (backend, codec, preset, threads, bitrate).
+        """
         print("Writing frames to video...")
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, self.fps, (self.width, self.height))
-        for frame in frames:
-            out.write(frame)
-        out.release()
-        print(f"Video saved to {output_path}")
-    
-        
-    
\ No newline at end of file
+        count = encode(frames, output_path, self.fps, (self.width, self.height), **encoder)
+        print(f"Video saved to {output_path} ({count} frames)")
+
+
+####################################################
+################ LiveReader Class  #################
+####################################################
+#
+# Unbounded sources: RTSP / HTTP URLs, named pipes, camera indices ("0"), or a video file
+# replayed at its native frame rate as a stand-in for a camera (replay=True).
+# A capture thread reads the frames as they arrive and stamps them with their arrival time.
+# read() gives the oldest waiting frame, but drops the frames that would be written after
+# max_latency seconds (their age plus the recent processing time per frame), keeping the
+# newest one: when processing falls behind, frames are skipped instead of queued.
+# The consumer calls frame_written() once a frame is out (Detection.write_frame),
+# latency_stats() gives the end-to-end latency percentiles and the drop rate.
+# frame_count is None: the stream ends with the source, after max_frames or duration seconds.
+
+
+def is_live_source(source):
+    """
+    URL, camera index or named pipe, rather than a video file.
+    """
+    source = str(source)
+    if "://" in source or source.isdigit():
+        return True
+    return os.path.exists(source) and stat.S_ISFIFO(os.stat(source).st_mode)
+
+
+class LiveReader:
+    live = True
+
+    def __init__(self, source, max_latency=0.5, replay=None, fps=None, max_frames=None, duration=None):
+        source = str(source)
+        if replay is None:
+            replay = not is_live_source(source)
+        if replay and not os.path.exists(source):
+            raise FileNotFoundError(f"The video file at {source} does not exist.")
+        self.path = source
+        self.replay = replay # paced at the file's frame rate
+        self.max_latency = max_latency # seconds from arrival to output (None: no frame dropped)
+        self.max_frames = max_frames
+        self.duration = duration
+        self.video = cv2.VideoCapture(int(source) if source.isdigit() else source)
+        if not self.video.isOpened():
+            raise RuntimeError(f"Can't open the stream {source}")
+
+        success, first = self.video.read() # some streams only know their size once a frame arrived
+        if not success:
+            raise RuntimeError(f"No frame received from {source}")
+        arrival = time.perf_counter()
+        reported_fps = self.video.get(cv2.CAP_PROP_FPS)
+        self.fps = fps or (reported_fps if 0 < reported_fps < 1000 else 25.0)
+        self.height, self.width = first.shape[:2]
+        self.frame_count = None
+        self.position = 0 # frames given by read()
+
+        self.lock = threading.Condition()
+        self.frames = deque() # (arrival time, frame) waiting for read()
+        self.ended = False
+        self.stop_event = threading.Event()
+        self.arrived = 1
+        self.dropped = 0
+        self.frame_time = 0.0 # processing time per frame, moving average of the time between reads
+        self.last_read = None
+        self.arrivals = deque() # arrival time of the frames given by read() and not written yet
+        self.latencies = [] # seconds, per written frame
+
+        self.frames.append((arrival, first))
+        self.thread = threading.Thread(target=self.capture, args=(arrival,), daemon=True)
+        self.thread.start()
+
+    def capture(self, start):
+        """
+        Capture thread: read the source as fast as it delivers (replay: one frame every 1 / fps).
+        """
+        index = 1
+        while not self.stop_event.is_set():
+            if self.max_frames is not None and index >= self.max_frames:
+                break
+            if self.duration is not None and time.perf_counter() - start >= self.duration:
+                break
+            success, frame = self.video.read()
+            if not success:
+                break
+            if self.replay:
+                delay = start + index / self.fps - time.perf_counter()
+                if delay > 0 and self.stop_event.wait(delay):
+                    break
+            arrival = time.perf_counter()
+            with self.lock:
+                self.frames.append((arrival, frame))
+                self.arrived += 1
+                if self.max_latency is not None: # the consumer is stuck: don't pile up stale frames
+                    while arrival - self.frames[0][0] > self.max_latency:
+                        self.frames.popleft()
+                        self.dropped += 1
+                self.lock.notify()
+            index += 1
+        with self.lock:
+            self.ended = True
+            self.lock.notify()
+
+    def read(self):
+        """
+        Next frame to process, waits for the source. Stale frames are dropped first.
+        """
+        called = time.perf_counter()
+        if self.last_read is not None: # time spent on the previous frame, without waiting for the source
+            self.frame_time = 0.8 * self.frame_time + 0.2 * (called - self.last_read)
+        with self.lock:
+            while not self.frames and not self.ended:
+                self.lock.wait()
+            if not self.frames:
+                return False, None
+            now = time.perf_counter()
+            if self.max_latency is not None:
+                while len(self.frames) > 1 and now - self.frames[0][0] + self.frame_time > self.max_latency:
+                    self.frames.popleft()
+                    self.dropped += 1
+            arrival, frame = self.frames.popleft()
+        self.last_read = time.perf_counter()
+        self.arrivals.append(arrival)
+        self.position += 1
+        return True, frame
+
+    def frame_written(self):
+        """
+        The oldest frame given by read() and not written yet is out: record its latency.
+        """
+        if self.arrivals:
+            self.latencies.append(time.perf_counter() - self.arrivals.popleft())
+
+    def latency_stats(self):
+        """
+        {"frames", "arrived", "dropped", "drop_rate", "p50_ms", "p90_ms", "p99_ms", "max_ms"}
+        """
+        stats = {"frames": len(self.latencies), "arrived": self.arrived, "dropped": self.dropped,
+                 "drop_rate": self.dropped / max(self.arrived, 1)}
+        latencies = np.array(self.latencies) * 1000
+        for name, q in (("p50_ms", 50), ("p90_ms", 90), ("p99_ms", 99)):
+            stats[name] = float(np.percentile(latencies, q)) if len(latencies) else None
+        stats["max_ms"] = float(latencies.max()) if len(latencies) else None
+        return stats
+
+    def print_latency(self):
+        stats = self.latency_stats()
+        if stats["frames"]:
+            print(f"Latency: p50 {stats['p50_ms']:.0f} ms, p90 {stats['p90_ms']:.0f} ms, p99 {stats['p99_ms']:.0f} ms, "
+                  f"max {stats['max_ms']:.0f} ms; {stats['dropped']}/{stats['arrived']} frames dropped ({stats['drop_rate']:.1%})")
+
+    def start_prefetch(self, buffer_size=16):
+        pass # the capture thread already reads ahead
+
+    def stop_prefetch(self):
+        return 0
+
+    def get_fps(self):
+        return self.fps
+
+    def release(self):
+        self.stop_event.set()
+        self.thread.join()
+        self.frames.clear()
+        self.video.release()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import cv2
+
+####################################################
+################## Video segments ##################
+####################################################
+#
+# Long runs write their output video in segments (see Detection.process_segments).
+# Segments are joined with ffmpeg's concat demuxer, which copies the streams
+# without re-encoding. ffmpeg is taken from the PATH, or from the imageio-ffmpeg
+# package when it is installed; without it the segments are re-encoded with OpenCV.
+
+
+def ffmpeg_path():
+    """
+    ffmpeg executable, None if there is none.
+    """
+    path = shutil.which("ffmpeg")
+    if path is None:
+        try:
+            import imageio_ffmpeg
+            path = imageio_ffmpeg.get_ffmpeg_exe()
+        except (ImportError, RuntimeError):
+            pass
+    return path
+
+
+def segment_paths(directory, index):
+    """
+    (video, frame data) paths of a segment.
+    """
+    return os.path.join(directory, f"segment_{index:05d}.mp4"), os.path.join(directory, f"frame_data_{index:05d}.bin")
+
+
+def concat_videos(paths, output_path):
+    """
+    Join videos with the same codec and size into output_path, without re-encoding when ffmpeg is available.
+    """
+    ffmpeg = ffmpeg_path()
+    if ffmpeg is not None:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            for path in paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+            list_path = f.name
+        try:
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", output_path], check=True)
+        finally:
+            os.remove(list_path)
+        return
+
+    print("ffmpeg not found: segments are re-encoded with OpenCV")
+    out = None
+    for path in paths:
+        video = cv2.VideoCapture(path)
+        if out is None:
+            size = (int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), video.get(cv2.CAP_PROP_FPS), size)
+        while True:
+            success, frame = video.read()
+            if not success:
+                break
+            out.write(frame)
+        video.release()
+    if out is not None:
+        out.release()